@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Static Asset Store
+
+Process-wide store of decoded card assets (background, white box, logos,
+gift images) keyed by (path, size). Each asset is opened, converted to RGBA
+and resized once; callers get the shared image and must treat it as
+read-only, calling .copy() before drawing on it. Use reload_assets() after
+replacing files on disk.
+"""
+
+import os
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_assets: Dict[tuple, Image.Image] = {}
+_assets_lock = threading.Lock()
+_reload_listeners: List[Callable[[], None]] = []
+_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+def _decode(path: str, size: Optional[Tuple[int, int]], thumbnail: bool, resample: Optional[int]) -> Image.Image:
+    img = Image.open(path)
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    if size is not None:
+        if thumbnail:
+            img.thumbnail(size)
+        elif img.size != size:
+            img = img.resize(size) if resample is None else img.resize(size, resample)
+    img.load()
+    return img
+
+def get_asset(path: str, size: Optional[Tuple[int, int]] = None, thumbnail: bool = False,
+              resample: Optional[int] = None) -> Image.Image:
+    """
+    Get a decoded RGBA asset at its final size, shared across the process.
+
+    Args:
+        path: Path to the image file
+        size: Exact size to resize to (or bounding box with thumbnail=True); None keeps the original size
+        thumbnail: Fit within `size` keeping the aspect ratio instead of resizing exactly
+        resample: Resampling filter for exact resizes; None uses Pillow's default
+
+    Returns:
+        Image.Image: The shared image; do not modify it, copy() it first
+
+    Raises:
+        OSError: If the file cannot be opened (failures are not cached)
+    """
+    key = (path, tuple(size) if size is not None else None, thumbnail, resample)
+    img = _assets.get(key)
+    if img is not None:
+        _stats["hits"] += 1
+        return img
+
+    with _assets_lock:
+        img = _assets.get(key)
+        if img is None:
+            _stats["misses"] += 1
+            img = _decode(path, key[1], thumbnail, resample)
+            _assets[key] = img
+        return img
+
+def preload_assets(specs) -> int:
+    """
+    Decode assets ahead of the first card.
+
+    Args:
+        specs: Iterable of (path, size) pairs; missing files are skipped
+
+    Returns:
+        int: Number of assets loaded
+    """
+    loaded = 0
+    for path, size in specs:
+        if not os.path.exists(path):
+            logger.warning(f"Asset not found, skipping preload: {path}")
+            continue
+        try:
+            get_asset(path, size)
+            loaded += 1
+        except Exception as e:
+            logger.warning(f"Failed to preload asset {path}: {e}")
+    return loaded
+
+def add_reload_listener(callback: Callable[[], None]) -> None:
+    """Register a callback run by reload_assets() (e.g. to drop derived caches)."""
+    _reload_listeners.append(callback)
+
+def reload_assets(path: Optional[str] = None) -> int:
+    """
+    Drop cached assets so they are decoded again from disk on next use.
+
+    Args:
+        path: Only drop variants of this file; None drops everything
+
+    Returns:
+        int: Number of cached variants dropped
+    """
+    with _assets_lock:
+        keys = [k for k in _assets if path is None or k[0] == path]
+        for key in keys:
+            del _assets[key]
+        _stats["reloads"] += 1
+
+    for callback in _reload_listeners:
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Asset reload listener failed: {e}")
+    return len(keys)
+
+def get_asset_stats() -> Dict[str, Any]:
+    """Return hit/miss counters, entry count and decoded memory footprint in bytes."""
+    with _assets_lock:
+        memory_bytes = sum(
+            img.width * img.height * len(img.getbands()) for img in _assets.values()
+        )
+        return {**_stats, "entries": len(_assets), "memory_bytes": memory_bytes}
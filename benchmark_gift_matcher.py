@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Gift Matcher Benchmark
+
+Measures per-message gift matching cost on a corpus of chat messages.
+Compares the old linear scan (substring loop plus get_close_matches over
+every alias, tables rebuilt per call) with the prebuilt GiftMatcher index,
+with and without its prefilter, and checks that both return the same
+gifts for every message.
+
+Usage:
+    python benchmark_gift_matcher.py [--corpus messages.txt] [--rounds 5]
+
+The corpus is one chat message per line (e.g. an export of group messages);
+without one, a synthetic corpus of chatter, gift mentions and typos is used.
+"""
+
+import sys
+import time
+import random
+import argparse
+from difflib import get_close_matches
+
+from gift_matcher import GiftMatcher, FALLBACK_GIFT_NAMES, build_aliases
+
+CHATTER = [
+    "gm everyone", "anyone selling?", "floor is dumping again", "lol", "what do you think about this one",
+    "how much is it now", "ok", "thank you so much", "good morning fam", "wen moon",
+    "just bought another one", "price check please", "is the market down today?", "nice",
+    "that's expensive", "who has the cheapest listing", "bro check the chart", "hodl",
+    "does anyone know when the next drop is", "I'm out for today, see you later",
+    "привет всем", "сколько стоит?", "🔥🔥🔥", "+1", "100 ton?", "😂😂", "gm 🚀",
+]
+
+TEMPLATES = [
+    "{gift}", "{gift} price?", "how much is {gift}", "{gift} floor", "anyone selling {gift}",
+    "{part}", "{part}?", "check {gift} pls", "{typo}",
+]
+
+def legacy_find_matching_gifts(query, simplified_names):
+    """The original per-call scan, kept for comparison."""
+    if len(query.strip()) < 2:
+        return []
+
+    query = query.lower().replace('-', ' ').replace("'", '')
+    matching_gifts = []
+
+    common_phrases = [
+        "thank you", "hello there", "how are you", "what's up",
+        "good morning", "good evening", "good night", "see you later"
+    ]
+    if any(phrase in query for phrase in common_phrases):
+        return []
+
+    gift_groups = {
+        "ring": ["Diamond Ring", "Bonded Ring", "Signet Ring"],
+        "hat": ["Jester Hat", "Santa Hat", "Top Hat", "Witch Hat", "Durov's Cap"],
+        "heart": ["Heart Locket", "Cookie Heart", "Trapped Heart"],
+        "candle": ["B-Day Candle", "Eternal Candle", "Love Candle"],
+        "snake": ["Pet Snake", "Lunar Snake", "Snake Box"],
+        "box": ["Berry Box", "Snake Box", "Loot Bag"],
+        "bunny": ["Bunny Muffin", "Jelly Bunny"],
+        "signet": ["Gem Signet", "Signet Ring"],
+        "bell": ["Jingle Bells", "Sleigh Bell"],
+        "pad": ["Star Notepad"],
+        "pepe": ["Plush Pepe"],
+        "peach": ["Precious Peach"],
+        "plush": ["Plush Pepe"]
+    }
+    if query.lower() in gift_groups:
+        return gift_groups[query.lower()]
+
+    if query in simplified_names:
+        matching_gifts.append(simplified_names[query])
+        return matching_gifts
+
+    special_matches = {
+        "pepe": "Plush Pepe", "peach": "Precious Peach", "plush": "Plush Pepe", "precious": "Precious Peach",
+        "pad": "Star Notepad", "notepad": "Star Notepad", "gadget": "Tama Gadget", "tama": "Tama Gadget",
+        "diamond": "Diamond Ring", "locket": "Heart Locket", "jack": "Jack-in-the-Box",
+        "durov": "Durov's Cap", "cap": "Durov's Cap"
+    }
+    for keyword, gift in special_matches.items():
+        if query == keyword or (len(query) >= 3 and keyword.startswith(query)):
+            if gift not in matching_gifts:
+                matching_gifts.append(gift)
+    if matching_gifts:
+        return matching_gifts
+
+    for simple_name, original_name in simplified_names.items():
+        if original_name in matching_gifts:
+            continue
+        if query in simple_name.lower():
+            matching_gifts.append(original_name)
+
+    if not matching_gifts and len(query) >= 3:
+        close_matches = get_close_matches(query, list(simplified_names.keys()), n=3, cutoff=0.75)
+        for match in close_matches:
+            if match in simplified_names and simplified_names[match] not in matching_gifts:
+                matching_gifts.append(simplified_names[match])
+
+    return list(dict.fromkeys(matching_gifts))[:5]
+
+def make_typo(rng, text):
+    chars = list(text)
+    i = rng.randrange(len(chars))
+    op = rng.choice(("drop", "swap", "dup"))
+    if op == "drop" and len(chars) > 3:
+        del chars[i]
+    elif op == "swap" and i < len(chars) - 1:
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        chars.insert(i, chars[i])
+    return "".join(chars)
+
+def synthetic_corpus(names, size, seed=42):
+    """Mostly chatter, the rest gift mentions, name parts and typos."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.7:
+            corpus.append(rng.choice(CHATTER))
+            continue
+        gift = rng.choice(names)
+        corpus.append(rng.choice(TEMPLATES).format(
+            gift=gift if rng.random() < 0.5 else gift.lower(),
+            part=rng.choice(gift.split()).lower(),
+            typo=make_typo(rng, gift.lower()),
+        ))
+    return corpus
+
+def time_per_message(match, corpus, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in corpus:
+            match(message)
+    return (time.perf_counter() - start) / (rounds * len(corpus))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gift name matching per chat message")
+    parser.add_argument("--corpus", help="File with one chat message per line")
+    parser.add_argument("--messages", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    try:
+        from main import names
+    except ImportError:
+        names = FALLBACK_GIFT_NAMES
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        corpus = synthetic_corpus(names, args.messages)
+
+    start = time.perf_counter()
+    matcher = GiftMatcher(names)
+    build_time = time.perf_counter() - start
+    simplified_names = build_aliases(names)
+
+    mismatches = [
+        m for m in corpus
+        if legacy_find_matching_gifts(m, simplified_names) != (matcher.match(m) if matcher.prefilter(m) else [])
+    ]
+    if mismatches:
+        print(f"{len(mismatches)} messages matched differently, e.g. {mismatches[:5]}")
+        return 1
+
+    legacy = time_per_message(lambda m: legacy_find_matching_gifts(m, simplified_names), corpus, args.rounds)
+    indexed = time_per_message(matcher.match, corpus, args.rounds)
+
+    print(f"Corpus: {len(corpus)} messages, {len(names)} gifts, {len(simplified_names)} aliases")
+    print(f"Index build: {build_time * 1000:.1f} ms")
+    print(f"Linear scan: {legacy * 1e6:8.1f} us/message")
+    print(f"Index:       {indexed * 1e6:8.1f} us/message ({legacy / indexed:.1f}x faster)")
+
+    def filtered(message):
+        if matcher.prefilter(message):
+            matcher.match(message)
+
+    prefiltered = time_per_message(filtered, corpus, args.rounds)
+    reject_rate = matcher.get_prefilter_stats()["reject_rate"]
+    print(f"Prefilter:   {prefiltered * 1e6:8.1f} us/message with prefilter + index "
+          f"({reject_rate:.0%} of messages rejected)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
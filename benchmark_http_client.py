@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+HTTP Client Benchmark
+
+Measures card-data fetch throughput against a local stub of the giftcharts API.
+Compares the old pattern (blocking requests.get inside coroutines) with the
+shared pooled async client used by portal_api.
+
+Usage:
+    python benchmark_http_client.py [--cards 50] [--latency 0.1]
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import http_client
+import portal_api
+
+GIFT_NAMES = [f"Stub Gift {i}" for i in range(100)]
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Avoid SYN drops when all cards connect at once
+
+def make_handler(latency):
+    """Build a request handler that simulates upstream latency."""
+    gifts_body = json.dumps([
+        {"name": name, "priceTon": 1.5, "priceUsd": 3.0, "upgradedSupply": 1000 + i}
+        for i, name in enumerate(GIFT_NAMES)
+    ]).encode()
+    chart_body = json.dumps([{"priceTon": 1.5 + i / 100} for i in range(48)]).encode()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = gifts_body if self.path.startswith("/gifts") else chart_body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+async def fetch_card_blocking(base_url, gift_name):
+    """Old pattern: synchronous requests inside the event loop."""
+    gifts = requests.get(f"{base_url}/gifts", timeout=10).json()
+    chart = requests.get(f"{base_url}/weekChart?name={quote(gift_name)}", timeout=10).json()
+    return next(g for g in gifts if g["name"] == gift_name), chart[-24:]
+
+async def fetch_card_pooled(gift_name):
+    """New pattern: portal_api functions on the shared pooled client."""
+    gift = await portal_api._fetch_from_legacy_api(gift_name)
+    chart = await portal_api.fetch_chart_data(gift_name)
+    return gift, chart
+
+async def run_benchmark(base_url, cards):
+    names = [GIFT_NAMES[i % len(GIFT_NAMES)] for i in range(cards)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch_card_blocking(base_url, name) for name in names))
+    blocking_time = time.perf_counter() - start
+
+    portal_api.GIFTS_API = f"{base_url}/gifts"
+    portal_api.CHART_API = f"{base_url}/weekChart?name="
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fetch_card_pooled(name) for name in names))
+    pooled_time = time.perf_counter() - start
+    await http_client.close()
+
+    failures = sum(1 for gift, chart in results if not gift or not chart)
+    print(f"Cards fetched:        {cards}")
+    print(f"Blocking requests:    {blocking_time:.2f}s ({cards / blocking_time:.1f} cards/s)")
+    print(f"Pooled async client:  {pooled_time:.2f}s ({cards / pooled_time:.1f} cards/s)")
+    print(f"Speedup:              {blocking_time / pooled_time:.1f}x")
+    if failures:
+        print(f"WARNING: {failures} pooled fetches returned no data")
+    return failures == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent card data fetches")
+    parser.add_argument("--cards", type=int, default=50, help="Number of concurrent card fetches")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated upstream latency in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        ok = asyncio.run(run_benchmark(base_url, args.cards))
+    finally:
+        server.shutdown()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
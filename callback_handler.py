@@ -4,6 +4,7 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InputMe
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
 from telegram.constants import ParseMode
+from file_id_cache import send_cached_photo
 
 # Configure logging
 logging.basicConfig(
@@ -455,7 +456,7 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                 
                 # Generate a fresh gift card with timestamp to ensure it's new
                 from telegram_bot import generate_timestamped_card
-                card_path = generate_timestamped_card(gift_file_name)
+                card_path = await generate_timestamped_card(gift_file_name)
                 
                 if not card_path:
                     # If we failed to generate the card, update the message
@@ -569,8 +570,9 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
                     caption = f"{gift_name}\n\nJoin @The01Studio\nTry @CollectibleKITbot"
                 
                 # Send the photo with the appropriate keyboard
-                sent_message = await query.message.reply_photo(
-                    photo=open(card_path, 'rb'),
+                sent_message = await send_cached_photo(
+                    query.message.reply_photo,
+                    card_path,
                     caption=caption,
                     parse_mode='Markdown',
                     reply_markup=InlineKeyboardMarkup(keyboard)
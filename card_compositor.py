@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Layered Card Compositor
+
+Splits card rendering into an immutable base layer (gradient background,
+shadowed white box, gift/sticker name, static icons, watermark) and the
+dynamic layer drawn per refresh (prices, chart, timestamp). Base layers are
+built once per item and kept in an in-memory LRU plus a content-addressed
+on-disk cache keyed by card kind, layout version and the caller's inputs
+(names, dominant color, source and font file versions), so a refresh only
+copies the base and draws the values that changed. Disk entries are named
+per item, so storing a new layer for an item removes its superseded ones,
+and the directory is capped at MAX_DISK_ENTRIES on startup.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+LAYER_CACHE_DIR = os.path.join(script_dir, "card_layers")
+MEMORY_CACHE_SIZE = 16  # A 1600x1000 RGBA layer is ~6 MB in memory
+MAX_DISK_ENTRIES = 2000  # Least recently used layers beyond this are pruned on startup
+
+_memory_cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+_cache_lock = threading.Lock()
+_build_locks: Dict[str, threading.Lock] = {}
+_stats = {"memory_hits": 0, "disk_hits": 0, "builds": 0, "pruned": 0}
+_disk_pruned = False
+
+# Current disk entry names: <kind>_<item hash>_<key>.png
+_LAYER_NAME = re.compile(r"^[a-z_]+_[0-9a-f]{12}_[0-9a-f]{40}\.png$")
+
+def file_version(path: Optional[str]) -> Optional[int]:
+    """Return a file's mtime (ns) for use in layer inputs, or None if it is missing."""
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+def _cache_key(kind: str, version: int, inputs: tuple) -> str:
+    """Content address for a base layer: hash of kind, layout version and inputs."""
+    raw = f"{kind}:v{version}:{inputs!r}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def _item_prefix(kind: str, item: str) -> str:
+    """Filename prefix shared by every layer version of one item."""
+    return f"{kind}_{hashlib.sha1(item.encode()).hexdigest()[:12]}_"
+
+def _layer_path(prefix: str, key: str) -> str:
+    return os.path.join(LAYER_CACHE_DIR, f"{prefix}{key}.png")
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+def _prune_disk_cache() -> None:
+    """
+    Once per process: drop entries from the old unprefixed naming and cap
+    the directory at MAX_DISK_ENTRIES, least recently used first.
+    """
+    global _disk_pruned
+    if _disk_pruned:
+        return
+    _disk_pruned = True
+    try:
+        filenames = [f for f in os.listdir(LAYER_CACHE_DIR) if f.endswith(".png")]
+    except OSError:
+        return
+
+    entries = []
+    for filename in filenames:
+        path = os.path.join(LAYER_CACHE_DIR, filename)
+        if not _LAYER_NAME.match(filename):
+            _stats["pruned"] += _remove(path)
+            continue
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except OSError:
+            pass
+
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - MAX_DISK_ENTRIES)]:
+        _stats["pruned"] += _remove(path)
+    if _stats["pruned"]:
+        logger.info(f"[Card Layers] Pruned {_stats['pruned']} stale layers from disk")
+
+def _load_from_disk(prefix: str, key: str) -> Optional[Image.Image]:
+    path = _layer_path(prefix, key)
+    try:
+        if os.path.exists(path):
+            layer = Image.open(path)
+            layer.load()
+            # Mark as recently used for the startup size cap
+            os.utime(path)
+            return layer if layer.mode == 'RGBA' else layer.convert('RGBA')
+    except Exception as e:
+        logger.warning(f"[Card Layers] Discarding unreadable layer {key}: {e}")
+        _remove(path)
+    return None
+
+def _save_to_disk(prefix: str, key: str, layer: Image.Image) -> None:
+    path = _layer_path(prefix, key)
+    try:
+        os.makedirs(LAYER_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial layer
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        layer.save(tmp_path, format="PNG", compress_level=1)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"[Card Layers] Failed to store layer {key}: {e}")
+        return
+
+    # Layers built from older inputs for this item can never be hit again
+    for filename in os.listdir(LAYER_CACHE_DIR):
+        if filename.startswith(prefix) and filename.endswith(".png") and filename != os.path.basename(path):
+            _stats["pruned"] += _remove(os.path.join(LAYER_CACHE_DIR, filename))
+
+def _remember(key: str, layer: Image.Image) -> None:
+    with _cache_lock:
+        _memory_cache[key] = layer
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+def get_base_layer(kind: str, version: int, item: str, inputs: tuple,
+                   build: Callable[[], Image.Image], persist: bool = True) -> Image.Image:
+    """
+    Get the base layer for a card, building it only on a cache miss.
+
+    Args:
+        kind: Card family ("gift", "sticker", "plus_premarket"); prefixes disk entries
+        version: Layout version; bump it when the base drawing code changes
+        item: The gift or sticker the layer is for; older layers of the same item are pruned
+        inputs: Everything the base depends on (names, color, file_version() of sources and fonts)
+        build: Callable rendering the base layer as an RGBA image
+        persist: Also keep the layer in the on-disk cache
+
+    Returns:
+        Image.Image: A private copy of the base layer to draw the dynamic layer on
+    """
+    key = _cache_key(kind, version, inputs)
+    prefix = _item_prefix(kind, item)
+
+    with _cache_lock:
+        cached = _memory_cache.get(key)
+        if cached is not None:
+            _memory_cache.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return cached.copy()
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    # One build per key at a time; concurrent callers wait and reuse its result
+    with build_lock:
+        with _cache_lock:
+            cached = _memory_cache.get(key)
+        if cached is None:
+            if persist:
+                _prune_disk_cache()
+            cached = _load_from_disk(prefix, key) if persist else None
+            if cached is not None:
+                _stats["disk_hits"] += 1
+            else:
+                cached = build()
+                if cached.mode != 'RGBA':
+                    cached = cached.convert('RGBA')
+                _stats["builds"] += 1
+                if persist:
+                    _save_to_disk(prefix, key, cached)
+            _remember(key, cached)
+
+    with _cache_lock:
+        _build_locks.pop(key, None)
+    return cached.copy()
+
+def clear_layer_cache(disk: bool = False) -> None:
+    """Drop cached base layers from memory (and optionally from disk)."""
+    with _cache_lock:
+        _memory_cache.clear()
+    if disk and os.path.isdir(LAYER_CACHE_DIR):
+        for filename in os.listdir(LAYER_CACHE_DIR):
+            if filename.endswith(".png"):
+                try:
+                    os.remove(os.path.join(LAYER_CACHE_DIR, filename))
+                except OSError:
+                    pass
+    logger.info("[Card Layers] Cleared")
+
+def get_layer_cache_stats() -> Dict[str, Any]:
+    """Return hit/build counters and memory cache size."""
+    with _cache_lock:
+        return {**_stats, "memory_entries": len(_memory_cache)}
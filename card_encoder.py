@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Card Output Encoder
+
+Single place where finished cards are written to disk. The primary file
+keeps the path and PNG format callers (and the CDN) expect, but is encoded
+faster: the alpha channel is dropped when the card is fully opaque and the
+zlib level is tuned for speed. Optional sibling variants (WebP, JPEG) and a
+small JPEG thumbnail for inline results can be enabled, and encode time and
+output size are recorded per format.
+
+Configuration (environment variables):
+    CARD_PNG_COMPRESS_LEVEL  zlib level for the primary PNG (default 3)
+    CARD_EXTRA_FORMATS       comma separated variants to write, e.g. "webp,jpeg"
+    CARD_THUMBNAILS          "1" to write <name>_thumb.jpg next to each card
+"""
+
+import os
+import io
+import time
+import logging
+import threading
+from typing import Dict, Any, Iterable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+PNG_COMPRESS_LEVEL = int(os.getenv("CARD_PNG_COMPRESS_LEVEL", "3"))
+EXTRA_FORMATS = tuple(f.strip().lower() for f in os.getenv("CARD_EXTRA_FORMATS", "").split(",") if f.strip())
+WRITE_THUMBNAILS = os.getenv("CARD_THUMBNAILS", "0") == "1"
+
+JPEG_QUALITY = 88
+WEBP_QUALITY = 85
+THUMBNAIL_SIZE = (320, 200)
+THUMBNAIL_QUALITY = 80
+
+# Variant format -> (PIL format, file extension)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "jpg": ("JPEG", ".jpg"),
+}
+
+_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+def _record(fmt: str, seconds: float, size: int) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(fmt, {"count": 0, "seconds": 0.0, "bytes": 0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["bytes"] += size
+
+def _is_opaque(img: Image.Image) -> bool:
+    if img.mode not in ('RGBA', 'LA', 'PA'):
+        return 'transparency' not in img.info
+    return img.getchannel('A').getextrema()[0] == 255
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB version of a card, composited over white where it is transparent."""
+    if img.mode == 'RGB':
+        return img
+    if img.mode == 'RGBA' and not _is_opaque(img):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+def _write(img: Image.Image, path: str, fmt: str, label: str, **params) -> None:
+    """Encode to memory, then replace the file atomically so readers never see a partial card."""
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **params)
+    elapsed = time.perf_counter() - start
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getbuffer())
+    os.replace(tmp_path, path)
+    _record(label, elapsed, buffer.tell())
+
+def variant_path(output_path: str, fmt: str) -> str:
+    """Path of a card's variant ("webp", "jpeg" or "thumbnail") next to the primary file."""
+    stem = os.path.splitext(output_path)[0]
+    if fmt == "thumbnail":
+        return f"{stem}_thumb.jpg"
+    return stem + VARIANT_FORMATS[fmt][1]
+
+def save_card(card: Image.Image, output_path: str, formats: Optional[Iterable[str]] = None,
+              thumbnail: Optional[bool] = None) -> str:
+    """
+    Write a finished card: the primary file plus any configured variants.
+
+    Args:
+        card: Rendered card
+        output_path: Primary output path; its extension picks the format (normally .png)
+        formats: Extra variants to write (defaults to CARD_EXTRA_FORMATS)
+        thumbnail: Also write a small JPEG thumbnail (defaults to CARD_THUMBNAILS)
+
+    Returns:
+        str: output_path
+    """
+    # Cards are normally opaque; RGB PNGs encode faster and are a quarter smaller
+    primary = card.convert('RGB') if card.mode != 'RGB' and _is_opaque(card) else card
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        _write(_flatten(primary), output_path, "JPEG", "jpeg", quality=JPEG_QUALITY, optimize=False)
+    elif ext == '.webp':
+        _write(primary, output_path, "WEBP", "webp", quality=WEBP_QUALITY, method=4)
+    else:
+        _write(primary, output_path, "PNG", "png", compress_level=PNG_COMPRESS_LEVEL)
+
+    flat = None
+    for fmt in (EXTRA_FORMATS if formats is None else formats):
+        if fmt not in VARIANT_FORMATS:
+            logger.warning(f"[Card Encoder] Unknown output format: {fmt}")
+            continue
+        pil_format, _ = VARIANT_FORMATS[fmt]
+        try:
+            if pil_format == "JPEG":
+                if flat is None:
+                    flat = _flatten(primary)
+                _write(flat, variant_path(output_path, fmt), "JPEG", "jpeg", quality=JPEG_QUALITY)
+            else:
+                _write(primary, variant_path(output_path, fmt), "WEBP", "webp", quality=WEBP_QUALITY, method=4)
+        except Exception as e:
+            logger.warning(f"[Card Encoder] Failed to write {fmt} variant of {output_path}: {e}")
+
+    if WRITE_THUMBNAILS if thumbnail is None else thumbnail:
+        try:
+            thumb = (flat if flat is not None else _flatten(primary)).copy()
+            thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+            _write(thumb, variant_path(output_path, "thumbnail"), "JPEG", "thumbnail", quality=THUMBNAIL_QUALITY)
+        except Exception as e:
+            logger.warning(f"[Card Encoder] Failed to write thumbnail of {output_path}: {e}")
+
+    return output_path
+
+def get_encoder_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-format encode metrics for this process.
+
+    Returns:
+        dict: format -> count, total seconds, total bytes, avg_ms and avg_kb
+    """
+    with _stats_lock:
+        stats = {
+            fmt: {**entry,
+                  "avg_ms": round(entry["seconds"] * 1000 / entry["count"], 2),
+                  "avg_kb": round(entry["bytes"] / 1024 / entry["count"], 1)}
+            for fmt, entry in _stats.items()
+        }
+        if reset:
+            _stats.clear()
+    return stats
+
+def merge_encoder_stats(total: Dict[str, Dict[str, Any]], stats: Dict[str, Dict[str, Any]]) -> None:
+    """Add another process's get_encoder_stats() into a running total (in place)."""
+    for fmt, entry in stats.items():
+        current = total.setdefault(fmt, {"count": 0, "seconds": 0.0, "bytes": 0})
+        current["count"] += entry["count"]
+        current["seconds"] += entry["seconds"]
+        current["bytes"] += entry["bytes"]
+        current["avg_ms"] = round(current["seconds"] * 1000 / current["count"], 2)
+        current["avg_kb"] = round(current["bytes"] / 1024 / current["count"], 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Card Pre-Uploader
+
+Pushes freshly generated cards to a storage chat right after
+pregeneration and records the returned file_ids in file_id_cache, so the
+first user to ask for a card after a refresh gets an instant file_id send
+instead of paying for the upload. Uploads run with bounded concurrency and
+honour Telegram's flood-control retry hints.
+
+Configure the storage chat (a private channel the bot can post to) with
+CARD_STORAGE_CHAT_ID in bot_config.py or the environment.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Concurrent uploads; Telegram throttles bursts per chat, so keep this small
+UPLOAD_CONCURRENCY = 4
+
+# Flood-control retries per card
+MAX_RETRIES = 3
+
+def get_uploader_config():
+    """Return (bot token, storage chat id); either may be None when not configured."""
+    try:
+        from bot_config import BOT_TOKEN
+    except ImportError:
+        BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
+    try:
+        from bot_config import CARD_STORAGE_CHAT_ID
+    except ImportError:
+        CARD_STORAGE_CHAT_ID = os.environ.get("CARD_STORAGE_CHAT_ID")
+    return BOT_TOKEN, CARD_STORAGE_CHAT_ID
+
+async def upload_cards(paths: Iterable[str], concurrency: int = UPLOAD_CONCURRENCY,
+                       token: Optional[str] = None, chat_id=None) -> Dict[str, int]:
+    """
+    Upload cards that have no file_id for their current content yet.
+
+    Args:
+        paths: Card files to make available as file_ids
+        concurrency: Uploads in flight at once
+        token: Bot token (defaults to the configured one)
+        chat_id: Storage chat (defaults to CARD_STORAGE_CHAT_ID)
+
+    Returns:
+        dict: Counts of uploaded, already cached and failed cards
+    """
+    from telegram import Bot
+    from telegram.error import RetryAfter, TelegramError
+    from file_id_cache import get_file_id, send_cached_photo
+
+    default_token, default_chat_id = get_uploader_config()
+    token = token or default_token
+    chat_id = chat_id or default_chat_id
+    counts = {"uploaded": 0, "cached": 0, "failed": 0}
+    if not token or not chat_id:
+        logger.info("[Card Upload] No bot token or CARD_STORAGE_CHAT_ID configured, skipping pre-upload")
+        return counts
+
+    pending = []
+    for path in dict.fromkeys(paths):
+        if get_file_id(path):
+            counts["cached"] += 1
+        elif os.path.exists(path):
+            pending.append(path)
+    if not pending:
+        return counts
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with Bot(token) as bot:
+        async def upload(path):
+            async with semaphore:
+                for attempt in range(MAX_RETRIES + 1):
+                    try:
+                        await send_cached_photo(bot.send_photo, path, chat_id=chat_id,
+                                                caption=os.path.basename(path), disable_notification=True)
+                        counts["uploaded"] += 1
+                        return
+                    except RetryAfter as e:
+                        if attempt == MAX_RETRIES:
+                            break
+                        retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                        logger.info(f"[Card Upload] Flood control, waiting {retry_after}s")
+                        await asyncio.sleep(retry_after)
+                    except (TelegramError, OSError) as e:
+                        logger.warning(f"[Card Upload] Failed to upload {path}: {e}")
+                        break
+                counts["failed"] += 1
+
+        await asyncio.gather(*(upload(path) for path in pending))
+
+    logger.info(f"[Card Upload] {counts['uploaded']} uploaded, {counts['cached']} already cached, "
+                f"{counts['failed']} failed")
+    return counts
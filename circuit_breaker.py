@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker for Upstream Market APIs
+
+Tracks the health of each upstream (Portal, MRKT, Quant, Tonnel, giftcharts).
+After repeated failures a breaker opens and callers skip straight to their
+fallback or cached value instead of paying retry latency on every request.
+Once the reset timeout elapses a single probe request is let through
+(half-open); its outcome closes or re-opens the breaker.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Per-upstream settings: (consecutive failures before opening, seconds before a probe)
+BREAKER_SETTINGS = {
+    "portal": (3, 60),
+    "mrkt": (3, 60),
+    "quant": (3, 60),
+    "tonnel": (3, 60),
+    "giftcharts": (3, 30),
+}
+DEFAULT_SETTINGS = (5, 60)
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the upstream's breaker is open."""
+    pass
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    def is_open(self) -> bool:
+        """Check whether requests would currently be refused (does not reserve a probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self.state == HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a request may go to the upstream.
+
+        In the half-open state only one probe is allowed at a time; the caller
+        must report its outcome via record_success() or record_failure().
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"[Circuit] {self.name} | Half-open, probing upstream")
+            # A probe whose outcome was never reported is abandoned after the reset timeout
+            probe_stale = time.monotonic() - self._probe_started >= self.reset_timeout
+            if self.state == HALF_OPEN and (not self._probe_in_flight or probe_stale):
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Report a successful upstream call."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"[Circuit] {self.name} | Upstream recovered, closing breaker")
+            self.state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Report a failed upstream call (timeouts, connection errors, 5xx)."""
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"[Circuit] {self.name} | Opening breaker after {self._failures} failures "
+                                   f"(retry in {self.reset_timeout}s)")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state for status reporting."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.total_rejected,
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get the shared breaker for an upstream, creating it from BREAKER_SETTINGS."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            threshold, timeout = BREAKER_SETTINGS.get(name, DEFAULT_SETTINGS)
+            breaker = CircuitBreaker(name, threshold, timeout)
+            _breakers[name] = breaker
+        return breaker
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Return stats for every breaker in use."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
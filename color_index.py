@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Dominant Color Index
+
+Persistent SQLite index of dominant colors for gift images, sticker images
+and sticker templates, shared by all card generators. Entries are keyed by
+file path and algorithm and validated against the file's mtime and size,
+so a color is computed once per image version instead of on every render.
+
+Rebuild the whole index in parallel with:
+    python color_index.py --rebuild [--workers N]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import colorsys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+INDEX_DB_PATH = os.path.join(script_dir, "color_index.db")
+
+DEFAULT_COLOR = (128, 128, 128)
+
+# Mean of opaque pixels (sticker and plus premarket cards)
+AVERAGE = "average"
+# Mean of opaque pixels with saturation boosted by 50% (regular gift cards)
+SATURATED = "saturated"
+
+# Image directories indexed by --rebuild and the algorithms their generators use
+INDEX_SOURCES = [
+    (os.path.join(script_dir, "downloaded_images"), (SATURATED, AVERAGE)),
+    (os.path.join(script_dir, "sticker_collections"), (AVERAGE,)),
+    (os.path.join(script_dir, "sticker_templates"), (AVERAGE,)),
+]
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", "_png", "_jpg")
+
+_local = threading.local()
+_memo: Dict[Tuple[str, str], Tuple[int, int, Tuple[int, int, int]]] = {}
+_memo_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    """Get this thread's connection, creating the schema on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(INDEX_DB_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS colors (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                r INTEGER NOT NULL,
+                g INTEGER NOT NULL,
+                b INTEGER NOT NULL,
+                PRIMARY KEY (path, algorithm)
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def compute_dominant_color(image_path: str, algorithm: str = AVERAGE) -> Tuple[int, int, int]:
+    """
+    Compute the dominant color of an image from its opaque pixels.
+
+    Raises:
+        OSError: If the image cannot be read
+        ValueError: For an unknown algorithm
+    """
+    img = Image.open(image_path)
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    img.thumbnail((100, 100))
+
+    pixels = np.asarray(img)
+    pixels = pixels[pixels[:, :, 3] > 128][:, :3]
+    if len(pixels) == 0:
+        return DEFAULT_COLOR
+
+    if algorithm == AVERAGE:
+        r, g, b = (pixels.sum(axis=0, dtype=np.int64) // len(pixels)).tolist()
+        return (r, g, b)
+
+    if algorithm == SATURATED:
+        avg_color = pixels.mean(axis=0).astype(int)
+        h, s, v = colorsys.rgb_to_hsv(avg_color[0]/255, avg_color[1]/255, avg_color[2]/255)
+        s = min(s * 1.5, 1.0)
+        r, g, b = colorsys.hsv_to_rgb(h, s, v)
+        return (int(r*255), int(g*255), int(b*255))
+
+    raise ValueError(f"Unknown dominant color algorithm: {algorithm}")
+
+def _lookup(path: str, algorithm: str, mtime_ns: int, size: int) -> Optional[Tuple[int, int, int]]:
+    try:
+        row = _connect().execute(
+            "SELECT mtime_ns, size, r, g, b FROM colors WHERE path = ? AND algorithm = ?",
+            (path, algorithm),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[Color Index] Lookup failed for {path}: {e}")
+        return None
+    if row is None or row[0] != mtime_ns or row[1] != size:
+        return None
+    return (row[2], row[3], row[4])
+
+def _store_many(entries: Iterable[Tuple[str, str, int, int, Tuple[int, int, int]]]) -> None:
+    try:
+        conn = _connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO colors (path, algorithm, mtime_ns, size, r, g, b) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, algorithm, mtime_ns, size, *color) for path, algorithm, mtime_ns, size, color in entries],
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[Color Index] Store failed: {e}")
+
+def get_dominant_color(image_path: str, algorithm: str = AVERAGE,
+                       default: Tuple[int, int, int] = DEFAULT_COLOR) -> Tuple[int, int, int]:
+    """
+    Get an image's dominant color from the index, computing and storing it if missing or stale.
+
+    Args:
+        image_path: Path to the image
+        algorithm: AVERAGE or SATURATED
+        default: Returned when the image cannot be read
+
+    Returns:
+        tuple: (r, g, b)
+    """
+    path = os.path.abspath(image_path)
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        logger.error(f"Error getting dominant color from {image_path}: {e}")
+        return default
+
+    key = (path, algorithm)
+    cached = _memo.get(key)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    color = _lookup(path, algorithm, st.st_mtime_ns, st.st_size)
+    if color is None:
+        try:
+            color = compute_dominant_color(path, algorithm)
+        except Exception as e:
+            logger.error(f"Error getting dominant color from {image_path}: {e}")
+            return default
+        _store_many([(path, algorithm, st.st_mtime_ns, st.st_size, color)])
+
+    with _memo_lock:
+        _memo[key] = (st.st_mtime_ns, st.st_size, color)
+    return color
+
+def _iter_images(directory: str) -> Iterable[str]:
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.abspath(os.path.join(root, name))
+
+def _index_job(job: Tuple[str, str, int, int]):
+    """Worker: compute one (path, algorithm) entry; returns None on failure."""
+    path, algorithm, mtime_ns, size = job
+    try:
+        return (path, algorithm, mtime_ns, size, compute_dominant_color(path, algorithm))
+    except Exception as e:
+        logger.warning(f"[Color Index] Skipping {path}: {e}")
+        return None
+
+def rebuild_index(sources=None, workers: Optional[int] = None, force: bool = False) -> Dict[str, int]:
+    """
+    Index every image under the source directories using a process pool.
+
+    Args:
+        sources: List of (directory, algorithms) pairs; defaults to INDEX_SOURCES
+        workers: Worker processes (defaults to the CPU count)
+        force: Recompute entries that are already up to date
+
+    Returns:
+        dict: Counts of computed, up-to-date and failed entries
+    """
+    jobs: List[Tuple[str, str, int, int]] = []
+    up_to_date = 0
+    for directory, algorithms in (sources or INDEX_SOURCES):
+        if not os.path.isdir(directory):
+            logger.warning(f"[Color Index] Source directory not found: {directory}")
+            continue
+        for path in _iter_images(directory):
+            st = os.stat(path)
+            for algorithm in algorithms:
+                if not force and _lookup(path, algorithm, st.st_mtime_ns, st.st_size) is not None:
+                    up_to_date += 1
+                    continue
+                jobs.append((path, algorithm, st.st_mtime_ns, st.st_size))
+
+    computed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for entry in pool.map(_index_job, jobs, chunksize=16):
+                if entry is not None:
+                    computed.append(entry)
+        _store_many(computed)
+
+    with _memo_lock:
+        _memo.clear()
+    return {"computed": len(computed), "up_to_date": up_to_date, "failed": len(jobs) - len(computed)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared dominant color index")
+    parser.add_argument("--rebuild", action="store_true", help="Index all gift, sticker and template images")
+    parser.add_argument("--force", action="store_true", help="Recompute entries that are already up to date")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if not args.rebuild:
+        parser.print_help()
+        return 1
+
+    start = time.time()
+    result = rebuild_index(workers=args.workers, force=args.force)
+    logger.info(f"[Color Index] {result['computed']} computed, {result['up_to_date']} up to date, "
+                f"{result['failed']} failed in {time.time() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
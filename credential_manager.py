@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Credential Manager
+
+Central store for upstream auth tokens (Portal, MRKT, Quant). Each source
+registers an async refresh function and its TTL; a single background thread
+runs an event loop that refreshes every token shortly before it expires, so
+request handlers read the current token without doing any I/O. Only a cold
+start (or a token invalidated after an auth error) makes a caller wait, and
+concurrent waiters share one refresh.
+
+Usable from async code (await get_async(name)) and synchronous code
+(get(name)); refresh functions always run on the manager's own loop.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scheduling configuration
+RETRY_BASE_DELAY = 5  # Seconds before retrying a failed refresh (doubles per failure)
+MAX_RETRY_DELAY = 5 * 60
+MAX_SLEEP = 60  # Re-check the schedule at least this often
+DEFAULT_WAIT_TIMEOUT = 60  # Longest a caller blocks on a cold-start refresh
+
+class Credential:
+    """One auth token with its refresh function and TTL metadata."""
+
+    def __init__(self, name: str, refresh: Callable[[], Awaitable[Any]], ttl: float,
+                 refresh_margin: float, max_age: float, idle_timeout: Optional[float]):
+        self.name = name
+        self.refresh = refresh
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.value = None
+        self.obtained_at = 0.0
+        self.last_used = time.time()
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self.refresh_count = 0
+        self.in_flight: Optional[asyncio.Future] = None
+
+    def age(self, now: float) -> float:
+        return now - self.obtained_at
+
+    def is_usable(self, now: float) -> bool:
+        """Whether the current value may be handed out without waiting."""
+        return self.value is not None and self.age(now) < self.max_age
+
+    def is_idle(self, now: float) -> bool:
+        return self.idle_timeout is not None and now - self.last_used > self.idle_timeout
+
+    def next_refresh_at(self) -> float:
+        """When the scheduler should next refresh this credential."""
+        if self.failures:
+            return self.retry_at
+        if self.value is None:
+            return 0.0
+        return self.obtained_at + self.ttl - self.refresh_margin
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "has_value": self.value is not None,
+            "age_seconds": round(self.age(now), 1) if self.value is not None else None,
+            "expires_in": round(self.obtained_at + self.ttl - now, 1) if self.value is not None else None,
+            "refreshes": self.refresh_count,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "idle": self.is_idle(now),
+        }
+
+class CredentialManager:
+    """Owns the refresher thread/loop and the registered credentials."""
+
+    def __init__(self):
+        self._credentials: Dict[str, Credential] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._shutdown_hooks = []
+
+    def register(self, name: str, refresh: Callable[[], Awaitable[Any]], ttl: float,
+                 refresh_margin: float = 0, max_age: Optional[float] = None,
+                 idle_timeout: Optional[float] = None) -> Credential:
+        """
+        Register a credential (idempotent per name).
+
+        Args:
+            refresh: Async callable returning a fresh token, or None on failure
+            ttl: Seconds a token is considered current
+            refresh_margin: Refresh this many seconds before the TTL runs out
+            max_age: Seconds a token may still be handed out while refreshes fail (defaults to ttl)
+            idle_timeout: Stop proactive refreshes after this long without a get()
+        """
+        with self._lock:
+            credential = self._credentials.get(name)
+            if credential is None:
+                credential = Credential(name, refresh, ttl, refresh_margin,
+                                        max_age if max_age is not None else ttl, idle_timeout)
+                self._credentials[name] = credential
+        self._wake_scheduler()
+        return credential
+
+    def seed(self, name: str, value: Any, obtained_at: float) -> None:
+        """Provide a previously persisted token so startup does not need a refresh."""
+        credential = self._credentials[name]
+        with self._lock:
+            if value and credential.value is None:
+                credential.value = value
+                credential.obtained_at = obtained_at
+        self._wake_scheduler()
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Run an async cleanup function on the manager loop when stop() is called."""
+        if hook not in self._shutdown_hooks:
+            self._shutdown_hooks.append(hook)
+
+    def start(self) -> None:
+        """Start the refresher thread (no-op if already running)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_thread, name="credential-refresher", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Run shutdown hooks and stop the refresher thread."""
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None or not thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logger.warning(f"[Credentials] Error during shutdown: {e}")
+        thread.join(timeout)
+
+    def peek(self, name: str) -> Optional[Any]:
+        """Return the current token regardless of age, without I/O (None if absent)."""
+        credential = self._credentials.get(name)
+        return credential.value if credential is not None else None
+
+    def get(self, name: str, timeout: float = DEFAULT_WAIT_TIMEOUT) -> Optional[Any]:
+        """
+        Return the current token for synchronous callers.
+
+        Blocks only when no usable token exists yet.
+        """
+        credential = self._touch(name)
+        if credential.is_usable(time.time()):
+            return credential.value
+        self._check_not_on_loop()
+        future = asyncio.run_coroutine_threadsafe(self._refresh_now(credential), self._loop)
+        try:
+            return future.result(timeout)
+        except Exception as e:
+            logger.error(f"[Credentials] {name} | Waiting for refresh failed: {e}")
+            return None
+
+    async def get_async(self, name: str, timeout: float = DEFAULT_WAIT_TIMEOUT) -> Optional[Any]:
+        """Return the current token for async callers, awaiting a refresh only when none is usable."""
+        credential = self._touch(name)
+        if credential.is_usable(time.time()):
+            return credential.value
+        self._check_not_on_loop()
+        future = asyncio.run_coroutine_threadsafe(self._refresh_now(credential), self._loop)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except Exception as e:
+            logger.error(f"[Credentials] {name} | Waiting for refresh failed: {e}")
+            return None
+
+    def invalidate(self, name: str) -> None:
+        """Drop a token the upstream rejected; the next get() waits for a replacement."""
+        credential = self._credentials.get(name)
+        if credential is None:
+            return
+        with self._lock:
+            credential.value = None
+            credential.obtained_at = 0.0
+            credential.failures = 0
+        logger.info(f"[Credentials] {name} | Invalidated, refreshing")
+        self._wake_scheduler()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return TTL/refresh state for every credential."""
+        now = time.time()
+        with self._lock:
+            credentials = list(self._credentials.values())
+        return {credential.name: credential.stats(now) for credential in credentials}
+
+    def _touch(self, name: str) -> Credential:
+        credential = self._credentials.get(name)
+        if credential is None:
+            raise KeyError(f"Unknown credential: {name}")
+        was_idle = credential.is_idle(time.time())
+        credential.last_used = time.time()
+        self.start()
+        if was_idle:
+            self._wake_scheduler()
+        return credential
+
+    def _check_not_on_loop(self) -> None:
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Refresh functions must not wait on credentials")
+
+    def _wake_scheduler(self) -> None:
+        loop = self._loop
+        if loop is not None and self._wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def _run_thread(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._ready.set()
+        try:
+            loop.run_until_complete(self._schedule())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+            self._loop = None
+            self._wake = None
+
+    async def _schedule(self) -> None:
+        """Refresh each credential at obtained_at + ttl - margin, sleeping until the next one is due."""
+        logger.info("[Credentials] Background refresher started")
+        while True:
+            now = time.time()
+            next_wake = now + MAX_SLEEP
+            with self._lock:
+                credentials = list(self._credentials.values())
+            for credential in credentials:
+                if credential.in_flight is not None:
+                    continue
+                if credential.is_idle(now):
+                    # Unused tokens are left to expire; the next get() refreshes on demand
+                    continue
+                due = credential.next_refresh_at()
+                if due <= now:
+                    asyncio.ensure_future(self._refresh_now(credential))
+                else:
+                    next_wake = min(next_wake, due)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, next_wake - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh_now(self, credential: Credential) -> Optional[Any]:
+        """Refresh a credential, joining a refresh that is already running."""
+        if credential.in_flight is None:
+            credential.in_flight = asyncio.ensure_future(self._do_refresh(credential))
+        return await asyncio.shield(credential.in_flight)
+
+    async def _do_refresh(self, credential: Credential) -> Optional[Any]:
+        started = time.time()
+        try:
+            value = await credential.refresh()
+            error = None if value else "refresh returned no token"
+        except Exception as e:
+            value, error = None, str(e)
+        finally:
+            credential.in_flight = None
+
+        with self._lock:
+            if value:
+                credential.value = value
+                credential.obtained_at = started
+                credential.failures = 0
+                credential.last_error = None
+                credential.refresh_count += 1
+            else:
+                credential.failures += 1
+                credential.last_error = error
+                credential.retry_at = time.time() + min(MAX_RETRY_DELAY,
+                                                        RETRY_BASE_DELAY * 2 ** (credential.failures - 1))
+        if value:
+            logger.info(f"[Credentials] {credential.name} | Refreshed in {time.time() - started:.2f}s")
+        else:
+            logger.warning(f"[Credentials] {credential.name} | Refresh failed ({credential.failures} in a row): {error}")
+        self._wake.set()
+        return credential.value if credential.is_usable(time.time()) else None
+
+    async def _shutdown(self) -> None:
+        for hook in self._shutdown_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.warning(f"[Credentials] Shutdown hook failed: {e}")
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+_manager = CredentialManager()
+
+register = _manager.register
+seed = _manager.seed
+add_shutdown_hook = _manager.add_shutdown_hook
+start = _manager.start
+stop = _manager.stop
+peek = _manager.peek
+get = _manager.get
+get_async = _manager.get_async
+invalidate = _manager.invalidate
+
+def get_credential_stats() -> Dict[str, Dict[str, Any]]:
+    """Return TTL/refresh state for every registered credential."""
+    return _manager.stats()
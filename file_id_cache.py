@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Telegram File ID Cache
+
+Persistent store of Telegram file_ids for uploaded card images, keyed by
+card path and validated by a hash of the file's content. Once a card has
+been uploaded, later sends reuse its file_id instead of uploading the PNG
+again, until the card is regenerated with different content. Survives
+restarts (SQLite), and a file_id Telegram rejects is dropped and the card
+re-uploaded. The database is shared with the pregeneration process, so
+the async helpers do their hashing and SQLite work in worker threads and a
+locked database counts as a miss.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+FILE_ID_DB_PATH = os.path.join(script_dir, "telegram_file_ids.db")
+
+# Seconds to wait for a write lock held by the other process
+BUSY_TIMEOUT = 0.5
+
+_local = threading.local()
+# path -> (mtime_ns, size, content hash), so unchanged files are not re-read
+_hash_memo: Dict[str, Tuple[int, int, str]] = {}
+_stats = {"hits": 0, "uploads": 0, "rejected": 0}
+
+def _connect() -> sqlite3.Connection:
+    """Get this thread's connection, creating the schema on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(FILE_ID_DB_PATH, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_ids (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def content_hash(path: str) -> Optional[str]:
+    """sha1 of a file's content (memoized by mtime and size), or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cached = _hash_memo.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _hash_memo[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def get_file_id(path: str, digest: Optional[str] = None) -> Optional[str]:
+    """Return the cached file_id for a card if its content hasn't changed since upload."""
+    path = os.path.abspath(path)
+    if digest is None:
+        digest = content_hash(path)
+    if digest is None:
+        return None
+    try:
+        row = _connect().execute(
+            "SELECT content_hash, file_id FROM file_ids WHERE path = ?", (path,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[File ID Cache] Lookup failed for {path}: {e}")
+        return None
+    if row is None or row[0] != digest:
+        return None
+    return row[1]
+
+def remember_file_id(path: str, file_id: str, digest: Optional[str] = None) -> None:
+    """
+    Store the file_id Telegram assigned to an uploaded card.
+
+    Pass the digest taken before the upload: the card may be regenerated
+    while it is in flight, and the file_id belongs to the content sent.
+    """
+    path = os.path.abspath(path)
+    if digest is None:
+        digest = content_hash(path)
+    if digest is None or not file_id:
+        return
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO file_ids (path, content_hash, file_id, updated_at) VALUES (?, ?, ?, ?)",
+            (path, digest, file_id, time.time()),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[File ID Cache] Store failed for {path}: {e}")
+
+def forget_file_id(path: str) -> None:
+    """Drop a card's file_id (e.g. after Telegram rejected it)."""
+    try:
+        conn = _connect()
+        conn.execute("DELETE FROM file_ids WHERE path = ?", (os.path.abspath(path),))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[File ID Cache] Delete failed for {path}: {e}")
+
+def _is_file_id_error(error: BadRequest) -> bool:
+    # e.g. "Wrong file identifier/http url specified", "Wrong remote file identifier specified"
+    return "file" in str(error).lower()
+
+def _lookup(path: str) -> Tuple[Optional[str], Optional[str]]:
+    digest = content_hash(path)
+    return digest, get_file_id(path, digest) if digest else None
+
+async def _remember_from_message(path: str, message: Any, digest: Optional[str]) -> None:
+    # Inline edits return True instead of a Message; there is nothing to remember then
+    photos = getattr(message, "photo", None)
+    if photos:
+        await asyncio.to_thread(remember_file_id, path, photos[-1].file_id, digest)
+
+async def send_cached_photo(send: Callable[..., Awaitable[Any]], card_path: str, **kwargs) -> Any:
+    """
+    Send a card, reusing its cached file_id and uploading the file only when needed.
+
+    Args:
+        send: Bound send method taking photo=..., e.g. update.message.reply_photo or bot.send_photo
+        card_path: Card image on disk
+        **kwargs: Passed through to send (caption, reply_markup, chat_id, ...)
+
+    Returns:
+        The Message returned by send
+    """
+    # Taken before the upload: the card may be regenerated while it is in flight
+    digest, file_id = await asyncio.to_thread(_lookup, card_path)
+    if file_id:
+        try:
+            message = await send(photo=file_id, **kwargs)
+            _stats["hits"] += 1
+            return message
+        except BadRequest as e:
+            if not _is_file_id_error(e):
+                raise
+            _stats["rejected"] += 1
+            logger.warning(f"[File ID Cache] Cached file_id rejected for {card_path}, re-uploading: {e}")
+            await asyncio.to_thread(forget_file_id, card_path)
+
+    with open(card_path, 'rb') as photo_file:
+        message = await send(photo=photo_file, **kwargs)
+    _stats["uploads"] += 1
+    await _remember_from_message(card_path, message, digest)
+    return message
+
+async def edit_cached_media(edit: Callable[..., Awaitable[Any]], card_path: str,
+                            caption: Optional[str] = None, parse_mode: Optional[str] = None, **kwargs) -> Any:
+    """
+    Replace a message's photo with a card, reusing its cached file_id when possible.
+
+    Args:
+        edit: Bound edit method taking media=..., e.g. bot.edit_message_media
+        card_path: Card image on disk
+        caption: Caption for the new photo
+        parse_mode: Caption parse mode
+        **kwargs: Passed through to edit (chat_id, message_id, reply_markup, ...)
+    """
+    # Taken before the upload: the card may be regenerated while it is in flight
+    digest, file_id = await asyncio.to_thread(_lookup, card_path)
+    if file_id:
+        try:
+            message = await edit(media=InputMediaPhoto(media=file_id, caption=caption, parse_mode=parse_mode), **kwargs)
+            _stats["hits"] += 1
+            return message
+        except BadRequest as e:
+            if not _is_file_id_error(e):
+                raise
+            _stats["rejected"] += 1
+            logger.warning(f"[File ID Cache] Cached file_id rejected for {card_path}, re-uploading: {e}")
+            await asyncio.to_thread(forget_file_id, card_path)
+
+    with open(card_path, 'rb') as photo_file:
+        message = await edit(media=InputMediaPhoto(media=photo_file, caption=caption, parse_mode=parse_mode), **kwargs)
+    _stats["uploads"] += 1
+    await _remember_from_message(card_path, message, digest)
+    return message
+
+def get_file_id_stats() -> Dict[str, Any]:
+    """Return hit/upload/rejection counters and the number of stored file_ids."""
+    try:
+        entries = _connect().execute("SELECT COUNT(*) FROM file_ids").fetchone()[0]
+    except sqlite3.Error:
+        entries = None
+    return {**_stats, "entries": entries}
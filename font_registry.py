@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Font Registry
+
+Process-wide pool of FreeTypeFont instances shared by all card generators,
+so each (font file, size) pair is parsed once per process instead of on
+every card. Also memoizes text metrics for strings that repeat across cards
+(watermark lines, "$", digits, placeholder widths).
+"""
+
+import os
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_FONT_PATH = os.path.join(script_dir, "Typekiln - EloquiaDisplay-ExtraBold.otf")
+
+METRICS_CACHE_SIZE = 4096
+
+_fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+_fonts_lock = threading.Lock()
+
+def get_font(font_path: str = DEFAULT_FONT_PATH, size: int = 12) -> ImageFont.FreeTypeFont:
+    """
+    Get the shared FreeTypeFont for a font file and size (drop-in for ImageFont.truetype).
+
+    Raises:
+        OSError: If the font file cannot be loaded (failures are not cached)
+    """
+    key = (font_path, size)
+    font = _fonts.get(key)
+    if font is None:
+        with _fonts_lock:
+            font = _fonts.get(key)
+            if font is None:
+                font = ImageFont.truetype(font_path, size)
+                _fonts[key] = font
+    return font
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _cached_length(font_path: str, size: int, text: str) -> float:
+    return get_font(font_path, size).getlength(text)
+
+@lru_cache(maxsize=METRICS_CACHE_SIZE)
+def _cached_bbox(font_path: str, size: int, text: str) -> Tuple[int, int, int, int]:
+    return get_font(font_path, size).getbbox(text)
+
+def _registry_key(font):
+    """Return (path, size) if the font came from the registry, else None."""
+    path, size = getattr(font, "path", None), getattr(font, "size", None)
+    if path is not None and _fonts.get((path, size)) is font:
+        return path, size
+    return None
+
+def get_text_length(text: str, font) -> float:
+    """Memoized equivalent of ImageDraw.textlength(text, font=font)."""
+    key = _registry_key(font)
+    if key is None:
+        return font.getlength(text)
+    return _cached_length(key[0], key[1], text)
+
+def get_text_bbox(text: str, font) -> Tuple[int, int, int, int]:
+    """Memoized equivalent of font.getbbox(text) / ImageDraw.textbbox((0, 0), text, font=font)."""
+    key = _registry_key(font)
+    if key is None:
+        return font.getbbox(text)
+    return _cached_bbox(key[0], key[1], text)
+
+def get_font_stats() -> Dict[str, Any]:
+    """Return the number of pooled fonts and metric memo hit rates."""
+    length_info = _cached_length.cache_info()
+    bbox_info = _cached_bbox.cache_info()
+    return {
+        "fonts": len(_fonts),
+        "length_hits": length_info.hits,
+        "length_misses": length_info.misses,
+        "bbox_hits": bbox_info.hits,
+        "bbox_misses": bbox_info.misses,
+    }
@@ -12,6 +12,7 @@ import json
 import logging
 import argparse
 from PIL import Image, ImageDraw, ImageFont
+from font_registry import get_font
 import mrkt_api_improved as mrkt_api
 
 # Configure logging
@@ -212,8 +213,8 @@ def generate_price_card(collection, sticker, price, output_dir):
         
         # Load fonts
         try:
-            price_font = ImageFont.truetype(FONT_PATH, 140)  # For USD price
-            ton_price_font = ImageFont.truetype(FONT_PATH, 50)  # For TON and Star prices
+            price_font = get_font(FONT_PATH, 140)  # For USD price
+            ton_price_font = get_font(FONT_PATH, 50)  # For TON and Star prices
         except Exception as e:
             logger.error(f"Error loading font: {e}")
             # Fallback to default font
@@ -255,7 +256,7 @@ def generate_price_card(collection, sticker, price, output_dir):
             card = Image.new('RGBA', (1600, 1000), (148, 68, 143, 255))
             draw = ImageDraw.Draw(card)
             try:
-                font = ImageFont.truetype(FONT_PATH, 80)
+                font = get_font(FONT_PATH, 80)
             except Exception:
                 font = ImageFont.load_default()
             draw.text((100, 100), f"{collection}", fill=(255,255,255), font=font)
@@ -12,6 +12,9 @@ import json
 import logging
 import argparse
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
+from icon_cache import get_icon
+from font_registry import get_font, get_text_length
+import color_index
 import stickers_tools_api as sticker_api
 
 # Configure logging
@@ -78,35 +81,8 @@ def get_sticker_price(price_data, collection, sticker):
     return None
 
 def get_dominant_color(image_path):
-    """Get the dominant color from an image"""
-    try:
-        img = Image.open(image_path)
-        # Convert to RGBA if needed
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        # Create a smaller version for faster processing
-        img.thumbnail((100, 100))
-        
-        # Get color data
-        pixels = list(img.getdata())
-        
-        # Filter out transparent pixels
-        pixels = [p for p in pixels if p[3] > 128]
-        
-        if not pixels:
-            return (128, 128, 128)  # Default gray if all pixels are transparent
-        
-        # Simple average color
-        r_sum = sum(p[0] for p in pixels)
-        g_sum = sum(p[1] for p in pixels)
-        b_sum = sum(p[2] for p in pixels)
-        
-        count = len(pixels)
-        return (r_sum // count, g_sum // count, b_sum // count)
-    except Exception as e:
-        logger.error(f"Error getting dominant color: {e}")
-        return (128, 128, 128)  # Default gray on error
+    """Get the dominant color from an image (via the shared color index)"""
+    return color_index.get_dominant_color(image_path, color_index.AVERAGE)
 
 def generate_price_card(collection, sticker, price, output_dir):
     """Generate a price card for a sticker using the template"""
@@ -151,8 +127,8 @@ def generate_price_card(collection, sticker, price, output_dir):
         
         # Load fonts
         try:
-            price_font = ImageFont.truetype(FONT_PATH, 140)
-            ton_price_font = ImageFont.truetype(FONT_PATH, 50)
+            price_font = get_font(FONT_PATH, 140)
+            ton_price_font = get_font(FONT_PATH, 50)
         except Exception as e:
             logger.error(f"Error loading font: {e}")
             # Fallback to default font
@@ -171,45 +147,15 @@ def generate_price_card(collection, sticker, price, output_dir):
         # Draw USD price
         draw.text((dollar_x + 100, dollar_y), f"{price_usd:,.0f}".replace(",", " "), fill=price_color, font=price_font)
         
-        # Load and colorize TON logo
-        ton_logo = Image.open(TON_LOGO_PATH)
-        if ton_logo.mode != 'RGBA':
-            ton_logo = ton_logo.convert('RGBA')
-        
-        # Resize TON logo
-        ton_logo.thumbnail((70, 70))
-        
-        # Colorize TON logo with dominant color
-        ton_logo_colored = Image.new('RGBA', ton_logo.size, (0, 0, 0, 0))
-        for y in range(ton_logo.height):
-            for x in range(ton_logo.width):
-                r, g, b, a = ton_logo.getpixel((x, y))
-                if a > 0:  # If not fully transparent
-                    # Replace black with the dominant color, keeping alpha
-                    ton_logo_colored.putpixel((x, y), dominant_color + (a,))
-        
-        # Load and colorize Star logo
-        star_logo = Image.open(STAR_LOGO_PATH)
-        if star_logo.mode != 'RGBA':
-            star_logo = star_logo.convert('RGBA')
-        
-        # Resize Star logo
-        star_logo.thumbnail((70, 70))
-        
-        # Colorize Star logo with dominant color
-        star_logo_colored = Image.new('RGBA', star_logo.size, (0, 0, 0, 0))
-        for y in range(star_logo.height):
-            for x in range(star_logo.width):
-                r, g, b, a = star_logo.getpixel((x, y))
-                if a > 0:  # If not fully transparent
-                    # Replace black with the dominant color, keeping alpha
-                    star_logo_colored.putpixel((x, y), dominant_color + (a,))
+        # TON and Star logos colorized with the dominant color (cached per size and color)
+        ton_logo_colored = get_icon(TON_LOGO_PATH, size=(70, 70), color=dominant_color)
+        star_logo_colored = get_icon(STAR_LOGO_PATH, size=(70, 70), color=dominant_color)
         
         # Position and draw TON logo and price - use exact positions from gift card
         ton_y = y_center + 480
         
         # Calculate logo center point
-        ton_logo_center_y = (ton_y - 15) + (ton_logo.height // 2)
+        ton_logo_center_y = (ton_y - 15) + (ton_logo_colored.height // 2)
         
         # Move text up to properly center with logo
         text_center_offset = ton_price_font.size // 2
@@ -219,7 +165,7 @@ def generate_price_card(collection, sticker, price, output_dir):
         template.paste(ton_logo_colored, (dollar_x, ton_y - 15), ton_logo_colored)
         
         # Get the width of the TON value text for centering
-        ton_text_width = draw.textlength(f"{price:.1f}".replace(".", ",").replace(",0", ""), font=ton_price_font)
+        ton_text_width = get_text_length(f"{price:.1f}".replace(".", ",").replace(",0", ""), ton_price_font)
         
         # Position TON value
         ton_text_x = dollar_x + 80
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Gift Name Matcher
+
+Precomputed index for matching chat messages and inline queries to gift
+names, built once at startup. Returns exactly what the original linear
+scan did, but every step is a lookup:
+
+- exact aliases (lowercased names, hyphen/apostrophe variants, name parts)
+  and the disambiguation groups are plain dict lookups;
+- the special partial-word keywords are expanded into a prefix table;
+- "query is part of a name" uses an index of every substring of every alias;
+- the fuzzy fallback first bounds every alias's difflib ratio at once from
+  a character-count (1-gram) matrix and only scores aliases that can still
+  reach the cutoff, instead of running get_close_matches over every alias.
+
+prefilter() is an exact, much cheaper rejection stage for chat messages.
+A message that is too long for any alias to fuzzy-match, contains a common
+phrase, or is neither an indexed alias/substring nor close enough in
+characters to any alias (e.g. other scripts, emoji, numbers) can never
+match, so it is dropped before any per-message work.
+"""
+
+from difflib import get_close_matches
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+# Fallback names list if main.names can't be imported
+FALLBACK_GIFT_NAMES = [
+    "Heart Locket", "Lush Bouquet", "Astral Shard", "B-Day Candle", "Berry Box",
+    "Big Year", "Bonded Ring", "Bow Tie", "Bunny Muffin", "Candy Cane",
+    "Cookie Heart", "Crystal Ball", "Desk Calendar", "Diamond Ring", "Durov's Cap",
+    "Easter Egg", "Electric Skull", "Eternal Candle", "Eternal Rose", "Evil Eye",
+    "Flying Broom", "Gem Signet", "Genie Lamp", "Ginger Cookie", "Hanging Star",
+    "Heroic Helmet", "Hex Pot", "Holiday Drink", "Homemade Cake", "Hypno Lollipop",
+    "Ion Gem", "Jack-in-the-Box", "Jelly Bunny", "Jester Hat", "Jingle Bells",
+    "Kissed Frog", "Light Sword", "Lol Pop", "Loot Bag", "Love Candle",
+    "Love Potion", "Lunar Snake", "Mad Pumpkin", "Magic Potion", "Mini Oscar",
+    "Nail Bracelet", "Neko Helmet", "Party Sparkler", "Perfume Bottle", "Pet Snake",
+    "Plush Pepe", "Precious Peach", "Record Player", "Restless Jar", "Sakura Flower",
+    "Santa Hat", "Scared Cat", "Sharp Tongue", "Signet Ring", "Skull Flower",
+    "Sleigh Bell", "Snake Box", "Snow Globe", "Snow Mittens", "Spiced Wine",
+    "Spy Agaric", "Star Notepad", "Swiss Watch", "Tama Gadget", "Top Hat",
+    "Toy Bear", "Trapped Heart", "Vintage Cigar", "Voodoo Doll", "Winter Wreath",
+    "Witch Hat", "Xmas Stocking"
+]
+
+# Only exclude these very common words as parts
+EXCLUDE_WORDS = frozenset(["the", "and", "of", "for", "with", "in", "on", "at", "by"])
+
+# Skip common phrases
+COMMON_PHRASES = (
+    "thank you", "hello there", "how are you", "what's up",
+    "good morning", "good evening", "good night", "see you later"
+)
+
+# Gift groups for disambiguation
+GIFT_GROUPS = {
+    "ring": ["Diamond Ring", "Bonded Ring", "Signet Ring"],
+    "hat": ["Jester Hat", "Santa Hat", "Top Hat", "Witch Hat", "Durov's Cap"],
+    "heart": ["Heart Locket", "Cookie Heart", "Trapped Heart"],
+    "candle": ["B-Day Candle", "Eternal Candle", "Love Candle"],
+    "snake": ["Pet Snake", "Lunar Snake", "Snake Box"],
+    "box": ["Berry Box", "Snake Box", "Loot Bag"],
+    "bunny": ["Bunny Muffin", "Jelly Bunny"],
+    "signet": ["Gem Signet", "Signet Ring"],
+    "bell": ["Jingle Bells", "Sleigh Bell"],
+    "pad": ["Star Notepad"],
+    "pepe": ["Plush Pepe"],
+    "peach": ["Precious Peach"],
+    "plush": ["Plush Pepe"]
+}
+
+# Special prioritized partial matches (more accurate); order sets result order
+SPECIAL_MATCHES = {
+    "pepe": "Plush Pepe",
+    "peach": "Precious Peach",
+    "plush": "Plush Pepe",
+    "precious": "Precious Peach",
+    "pad": "Star Notepad",
+    "notepad": "Star Notepad",
+    "gadget": "Tama Gadget",
+    "tama": "Tama Gadget",
+    "diamond": "Diamond Ring",
+    "locket": "Heart Locket",
+    "jack": "Jack-in-the-Box",
+    "durov": "Durov's Cap",
+    "cap": "Durov's Cap"
+}
+
+MAX_RESULTS = 5
+FUZZY_RESULTS = 3
+FUZZY_CUTOFF = 0.75
+
+def simplify(text: str) -> str:
+    """Lowercase and drop hyphens/apostrophes the way aliases are stored."""
+    return text.lower().replace('-', ' ').replace("'", '')
+
+def build_aliases(names: Iterable[str]) -> Dict[str, str]:
+    """Map every lowercase/simplified variant and name part to its gift name."""
+    aliases = {}
+    for name in names:
+        # Create variations of the name for matching
+        simple_name = simplify(name)
+        aliases[simple_name] = name
+
+        # Add hyphenated variations if applicable
+        if "-" in name:
+            aliases[name.lower().replace("-", " ")] = name
+
+        # Add apostrophe variations if applicable
+        if "'" in name:
+            aliases[name.lower().replace("'", "")] = name
+
+        # Add individual parts of names for better partial matching
+        for part in simple_name.split():
+            # Only add substantial parts (3+ chars) that aren't common words.
+            # Parts shared by several gifts point at the last one added.
+            if len(part) >= 3 and part not in EXCLUDE_WORDS:
+                aliases[part] = name
+    return aliases
+
+class GiftMatcher:
+    """Index over gift aliases; build once and call match() per message."""
+
+    def __init__(self, names: Iterable[str]):
+        self.aliases = build_aliases(names)
+
+        # Every query the special keywords can match (a 3+ char prefix or the keyword itself)
+        # -> the gifts it would collect, in keyword order
+        prefixes = set()
+        for keyword in SPECIAL_MATCHES:
+            prefixes.add(keyword)
+            prefixes.update(keyword[:end] for end in range(3, len(keyword) + 1))
+        self._special: Dict[str, List[str]] = {
+            prefix: list(dict.fromkeys(
+                gift for keyword, gift in SPECIAL_MATCHES.items()
+                if prefix == keyword or (len(prefix) >= 3 and keyword.startswith(prefix))
+            ))
+            for prefix in prefixes
+        }
+
+        # Every substring of every alias -> gifts in alias order
+        self._substrings: Dict[str, List[str]] = {}
+        for alias, gift in self.aliases.items():
+            seen = set()
+            for start in range(len(alias)):
+                for end in range(start + 1, len(alias) + 1):
+                    sub = alias[start:end]
+                    if sub in seen:
+                        continue
+                    seen.add(sub)
+                    gifts = self._substrings.setdefault(sub, [])
+                    if gift not in gifts:
+                        gifts.append(gift)
+        self._all_gifts = list(dict.fromkeys(self.aliases.values()))
+        self._max_alias_length = max((len(a) for a in self.aliases), default=0)
+
+        # Character counts per alias for the fuzzy upper bound
+        self._alias_list = list(self.aliases)
+        self._alphabet = {ch: i for i, ch in enumerate(sorted(set("".join(self._alias_list))))}
+        self._char_counts = np.zeros((len(self._alias_list), len(self._alphabet)), dtype=np.int32)
+        for row, alias in enumerate(self._alias_list):
+            for ch in alias:
+                self._char_counts[row, self._alphabet[ch]] += 1
+        self._alias_lengths = np.array([len(a) for a in self._alias_list], dtype=np.float64)
+
+        # Longest simplified message match() can return anything for: exact and substring hits
+        # need len <= an alias/keyword, fuzzy hits need 2*len(alias)/(len + len(alias)) >= cutoff
+        longest = max([len(k) for k in GIFT_GROUPS] + [len(k) for k in SPECIAL_MATCHES] + [self._max_alias_length])
+        self.max_query_length = longest
+        while 2.0 * self._max_alias_length / (self.max_query_length + 1 + self._max_alias_length) >= FUZZY_CUTOFF:
+            self.max_query_length += 1
+
+        # Per character, the most times it occurs in any one alias, for the prefilter's fuzzy bound
+        self._max_char_counts: Dict[str, int] = {}
+        for alias in self._alias_list:
+            for ch in set(alias):
+                self._max_char_counts[ch] = max(self._max_char_counts.get(ch, 0), alias.count(ch))
+        self._alias_length_set = sorted({len(a) for a in self._alias_list})
+
+        # chat id -> {"passed": n, "rejected": n}
+        self._prefilter_stats: Dict[Any, Dict[str, int]] = {}
+
+    def _fuzzy_candidates(self, query: str) -> List[str]:
+        # difflib's ratio is 2*M/(len(a)+len(b)), and the matched characters M can't exceed the
+        # characters the two strings share (its quick_ratio), so aliases whose shared-character
+        # bound is under the cutoff can never be returned and are skipped
+        query_counts = np.zeros(len(self._alphabet), dtype=np.int32)
+        for ch in query:
+            column = self._alphabet.get(ch)
+            if column is not None:
+                query_counts[column] += 1
+        shared = np.minimum(self._char_counts, query_counts).sum(axis=1)
+        bound = 2.0 * shared / (self._alias_lengths + len(query))
+        return [self._alias_list[i] for i in np.flatnonzero(bound >= FUZZY_CUTOFF)]
+
+    def _indexed(self, query: str) -> bool:
+        """True if match() would answer from a group, alias, special or substring hit."""
+        return (query == "" or query in GIFT_GROUPS or query in self.aliases
+                or query in self._special or query in self._substrings)
+
+    def _could_fuzzy_match(self, query: str) -> bool:
+        """Upper bound of the fuzzy step: can any alias length reach the cutoff with these characters?"""
+        if len(query) < 3:
+            return False
+        counts: Dict[str, int] = {}
+        for ch in query:
+            counts[ch] = counts.get(ch, 0) + 1
+        shared = sum(min(n, self._max_char_counts.get(ch, 0)) for ch, n in counts.items())
+        return any(2.0 * min(shared, length) / (len(query) + length) >= FUZZY_CUTOFF
+                   for length in self._alias_length_set)
+
+    def prefilter(self, text: str, chat_id=None) -> bool:
+        """
+        Cheap pre-check for chat messages, counted per chat.
+
+        Returns:
+            bool: False only if match(text) is certainly empty; True means run match()
+        """
+        query = simplify(text)
+        passed = (
+            len(text.strip()) >= 2
+            and len(query) <= self.max_query_length
+            and not any(phrase in query for phrase in COMMON_PHRASES)
+            and (self._indexed(query) or self._could_fuzzy_match(query))
+        )
+        stats = self._prefilter_stats.setdefault(chat_id, {"passed": 0, "rejected": 0})
+        stats["passed" if passed else "rejected"] += 1
+        return passed
+
+    def get_prefilter_stats(self) -> Dict[str, Any]:
+        """Return overall and per-chat pass/reject counts and rates."""
+        def with_rate(counts):
+            total = counts["passed"] + counts["rejected"]
+            return {**counts, "reject_rate": round(counts["rejected"] / total, 3) if total else 0.0}
+
+        totals = {"passed": 0, "rejected": 0}
+        for counts in self._prefilter_stats.values():
+            totals["passed"] += counts["passed"]
+            totals["rejected"] += counts["rejected"]
+        return {
+            **with_rate(totals),
+            "chats": {chat_id: with_rate(counts) for chat_id, counts in self._prefilter_stats.items()},
+        }
+
+    def match(self, query: str) -> List[str]:
+        """Gift names matching a message or query (same results as the original scan)."""
+        # Ignore extremely short queries to avoid false matches
+        if len(query.strip()) < 2:
+            return []
+
+        query = simplify(query)
+
+        if any(phrase in query for phrase in COMMON_PHRASES):
+            return []
+
+        # Check if query exactly matches a gift group
+        if query in GIFT_GROUPS:
+            return list(GIFT_GROUPS[query])  # Return the whole group for disambiguation
+
+        # Check for exact matches in simplified names first
+        if query in self.aliases:
+            return [self.aliases[query]]
+
+        # Check for special partial matches, returned first if found
+        special = self._special.get(query)
+        if special:
+            return list(special)
+
+        # Then try partial word matching (query contained in an alias)
+        if query == "":
+            matching_gifts = list(self._all_gifts)
+        elif len(query) <= self._max_alias_length:
+            matching_gifts = list(self._substrings.get(query, ()))
+        else:
+            matching_gifts = []
+
+        # If still no matches, try fuzzy matching with a moderate threshold
+        if not matching_gifts and len(query) >= 3:
+            close_matches = get_close_matches(query, self._fuzzy_candidates(query), n=FUZZY_RESULTS, cutoff=FUZZY_CUTOFF)
+            for match in close_matches:
+                if self.aliases[match] not in matching_gifts:
+                    matching_gifts.append(self.aliases[match])
+
+        # Remove any duplicates and limit results to avoid overwhelming the user
+        return list(dict.fromkeys(matching_gifts))[:MAX_RESULTS]
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Radial Gradient Engine
+
+Vectorized replacement for the per-card gradient drawing shared by the gift,
+sticker and plus-premarket card generators. The multi-stop radial gradient
+(darker edge -> base -> hue-shifted accent -> lighter centre) is computed for
+the whole canvas in one NumPy pass, and results are kept in an in-memory LRU
+plus a content-addressed on-disk cache keyed by size and dominant color, so
+repeated cards for the same gift skip background synthesis entirely.
+"""
+
+import os
+import hashlib
+import logging
+import colorsys
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+GRADIENT_CACHE_DIR = os.path.join(script_dir, "gradient_cache")
+GRADIENT_VERSION = 1  # Bump when the gradient formula changes to invalidate disk entries
+MEMORY_CACHE_SIZE = 16  # A 1600x1000 gradient is ~6 MB in memory
+
+# The gradient is defined on the same normalized canvas the original
+# ellipse-drawing code used (a 200x200 square stretched to the card size)
+_REFERENCE_SIZE = 200
+_MAX_RADIUS = int(((_REFERENCE_SIZE // 2) ** 2 + (_REFERENCE_SIZE // 2) ** 2) ** 0.5)
+
+# Gradient stops by distance factor (0 at the edge, 1 at the centre)
+_STOP_POSITIONS = (0.0, 0.25, 0.5, 1.0)
+_LUT_LEVELS = 1024
+
+_memory_cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "renders": 0}
+
+def gradient_stops(color: Tuple[int, int, int]) -> Tuple[Tuple[int, int, int], ...]:
+    """Return the (darker, base, accent, lighter) colors for a dominant color."""
+    r, g, b = color
+
+    # Darker shade for the edges, lighter shade for the centre
+    darker = (max(0, int(r * 0.65)), max(0, int(g * 0.65)), max(0, int(b * 0.65)))
+    lighter = (min(255, int(r * 1.15)), min(255, int(g * 1.15)), min(255, int(b * 1.15)))
+
+    # Slightly different hue for added depth
+    h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
+    h = (h + 0.05) % 1.0
+    s = min(1.0, s * 1.2)
+    accent_r, accent_g, accent_b = colorsys.hsv_to_rgb(h, s, v)
+    accent = (int(accent_r*255), int(accent_g*255), int(accent_b*255))
+
+    return darker, (r, g, b), accent, lighter
+
+def render_radial_gradient(width: int, height: int, color: Tuple[int, int, int]) -> np.ndarray:
+    """
+    Compute the radial gradient for a canvas (uncached).
+
+    Returns:
+        np.ndarray: (height, width, 3) uint8 RGB array
+    """
+    # The gradient is symmetric about both axes: compute the top-left quadrant only
+    half_w, half_h = (width + 1) // 2, (height + 1) // 2
+
+    # Distance of every pixel centre from the canvas centre, in reference units
+    xs = ((np.arange(half_w, dtype=np.float32) + 0.5) * (_REFERENCE_SIZE / width)) - _REFERENCE_SIZE / 2
+    ys = ((np.arange(half_h, dtype=np.float32) + 0.5) * (_REFERENCE_SIZE / height)) - _REFERENCE_SIZE / 2
+    distance = np.sqrt(ys[:, None] ** 2 + xs[None, :] ** 2)
+    levels = np.clip((1.0 - distance / _MAX_RADIUS) * (_LUT_LEVELS - 1), 0, _LUT_LEVELS - 1).astype(np.intp)
+
+    # Interpolate the color stops once into a lookup table, then index it per pixel
+    stops = np.array(gradient_stops(color), dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, _LUT_LEVELS)
+    lut = np.stack([np.interp(positions, _STOP_POSITIONS, stops[:, channel]) for channel in range(3)], axis=1)
+    quadrant = lut.astype(np.uint8)[levels]
+
+    gradient = np.empty((height, width, 3), dtype=np.uint8)
+    gradient[:half_h, :half_w] = quadrant
+    gradient[:half_h, half_w:] = quadrant[:, :width - half_w][:, ::-1]
+    gradient[half_h:] = gradient[:height - half_h][::-1]
+    return gradient
+
+def _cache_key(width: int, height: int, color: Tuple[int, int, int]) -> str:
+    """Content address for a gradient: hash of formula version, size and color."""
+    raw = f"v{GRADIENT_VERSION}:{width}x{height}:{color[0]},{color[1]},{color[2]}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def _load_from_disk(key: str):
+    path = os.path.join(GRADIENT_CACHE_DIR, f"{key}.npy")
+    try:
+        if os.path.exists(path):
+            return np.load(path)
+    except Exception as e:
+        logger.warning(f"[Gradient Cache] Discarding unreadable entry {key}: {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return None
+
+def _save_to_disk(key: str, gradient: np.ndarray) -> None:
+    path = os.path.join(GRADIENT_CACHE_DIR, f"{key}.npy")
+    try:
+        os.makedirs(GRADIENT_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, gradient)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"[Gradient Cache] Failed to store entry {key}: {e}")
+
+def radial_gradient(width: int, height: int, color: Tuple[int, int, int]) -> Image.Image:
+    """
+    Get the radial gradient background for a size and dominant color.
+
+    Served from the memory LRU, then the disk cache, and only rendered on a
+    miss. The returned image is a private copy the caller may draw on.
+
+    Returns:
+        Image.Image: Opaque RGBA gradient of the requested size
+    """
+    color = tuple(int(c) for c in color[:3])
+    key = _cache_key(width, height, color)
+
+    with _cache_lock:
+        cached = _memory_cache.get(key)
+        if cached is not None:
+            _memory_cache.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return cached.copy()
+
+    gradient = _load_from_disk(key)
+    if gradient is not None and gradient.shape == (height, width, 3):
+        _stats["disk_hits"] += 1
+    else:
+        gradient = render_radial_gradient(width, height, color)
+        _stats["renders"] += 1
+        _save_to_disk(key, gradient)
+
+    image = Image.fromarray(gradient, "RGB").convert("RGBA")
+    with _cache_lock:
+        _memory_cache[key] = image
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return image.copy()
+
+def clear_gradient_cache(disk: bool = False) -> None:
+    """Drop cached gradients from memory (and optionally from disk)."""
+    with _cache_lock:
+        _memory_cache.clear()
+    if disk and os.path.isdir(GRADIENT_CACHE_DIR):
+        for filename in os.listdir(GRADIENT_CACHE_DIR):
+            if filename.endswith(".npy"):
+                try:
+                    os.remove(os.path.join(GRADIENT_CACHE_DIR, filename))
+                except OSError:
+                    pass
+    logger.info("[Gradient Cache] Cleared")
+
+def get_gradient_cache_stats() -> Dict[str, Any]:
+    """Return hit/render counters and memory cache size."""
+    with _cache_lock:
+        return {**_stats, "memory_entries": len(_memory_cache)}
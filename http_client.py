@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Shared Async HTTP Client
+
+Provides a pooled, keep-alive HTTP client shared by all upstream API modules
+(giftcharts, MRKT, CoinMarketCap, ...). One httpx.AsyncClient is kept per event
+loop so concurrent card requests reuse TCP/TLS connections instead of opening
+a new blocking connection for every call.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Try to import httpx (installed with python-telegram-bot)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+    import requests
+    logging.warning("httpx not available - falling back to requests in worker threads")
+
+# Connection pool configuration
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60  # Seconds an idle connection is kept open
+DEFAULT_TIMEOUT = 10
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; GiftChartsBot/1.0)',
+}
+
+# One client per event loop (clients cannot be shared across loops)
+_clients = weakref.WeakKeyDictionary()
+
+def _get_client() -> "httpx.AsyncClient":
+    """Get (or lazily create) the pooled client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        client = httpx.AsyncClient(limits=limits, headers=DEFAULT_HEADERS, follow_redirects=True)
+        _clients[loop] = client
+        logger.debug("Created pooled HTTP client for event loop")
+    return client
+
+async def request(method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                  json: Any = None, timeout: float = DEFAULT_TIMEOUT, limiter=None):
+    """
+    Perform an HTTP request through the shared connection pool.
+
+    The returned response exposes status_code, text and json() like a
+    requests.Response, so callers can switch over without other changes.
+
+    Args:
+        limiter: Optional upstream_limiter.TokenBucket to acquire before sending;
+            it is penalized on 429 responses and credited on success.
+    """
+    if limiter is not None:
+        await limiter.acquire()
+
+    if not HTTPX_AVAILABLE:
+        response = await asyncio.to_thread(
+            requests.request, method, url, headers=headers, json=json, timeout=timeout
+        )
+    else:
+        client = _get_client()
+        response = await client.request(method, url, headers=headers, json=json, timeout=timeout)
+
+    if limiter is not None:
+        if response.status_code == 429:
+            import upstream_limiter
+            limiter.penalize(upstream_limiter.parse_retry_after(response))
+        elif response.status_code < 500:
+            limiter.record_success()
+    return response
+
+async def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT,
+              limiter=None):
+    """Perform a GET request through the shared connection pool."""
+    return await request("GET", url, headers=headers, timeout=timeout, limiter=limiter)
+
+async def get_cached(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT,
+                     limiter=None, breaker=None):
+    """
+    GET through the persistent response cache (see response_cache.ENDPOINT_TTLS).
+
+    Fresh entries are served from disk. Expired entries are revalidated with
+    ETag/Last-Modified, and served stale if the upstream is unreachable or its
+    circuit breaker is open.
+
+    Raises:
+        circuit_breaker.CircuitOpenError: If the breaker is open and nothing is cached
+    """
+    import response_cache
+
+    # SQLite calls run off the loop; the database is shared with the pregeneration process
+    entry = await asyncio.to_thread(response_cache.lookup, url)
+    if response_cache.is_fresh(entry, url):
+        return response_cache.to_response(url, entry)
+
+    if breaker is not None and not breaker.allow_request():
+        if entry is not None:
+            logger.info(f"[HTTP Client] {breaker.name} circuit open, serving stale cached copy of {url}")
+            return response_cache.to_response(url, entry)
+        from circuit_breaker import CircuitOpenError
+        raise CircuitOpenError(f"{breaker.name} circuit open and no cached copy of {url}")
+
+    try:
+        response = await get(url, headers=response_cache.conditional_headers(entry, headers), timeout=timeout,
+                             limiter=limiter)
+    except Exception:
+        if breaker is not None:
+            breaker.record_failure()
+        if entry is not None:
+            logger.warning(f"[HTTP Client] Upstream error, serving stale cached copy of {url}")
+            return response_cache.to_response(url, entry)
+        raise
+
+    if breaker is not None:
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    if response.status_code >= 500 and entry is not None:
+        logger.warning(f"[HTTP Client] Upstream HTTP {response.status_code}, serving stale cached copy of {url}")
+        return response_cache.to_response(url, entry)
+    return await asyncio.to_thread(response_cache.resolve, url, entry, response)
+
+async def post(url: str, headers: Optional[Dict[str, str]] = None, json: Any = None,
+               timeout: float = DEFAULT_TIMEOUT, limiter=None):
+    """Perform a POST request through the shared connection pool."""
+    return await request("POST", url, headers=headers, json=json, timeout=timeout, limiter=limiter)
+
+async def close():
+    """Close the pooled client for the running event loop (call on shutdown)."""
+    if not HTTPX_AVAILABLE:
+        return
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.debug("Closed pooled HTTP client")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Colorized Icon Cache
+
+Shared cache of resized and recolored card icons (TON logo, Star logo, ...)
+keyed by (icon, size, color). Recoloring uses the icon's alpha channel as a
+mask for a solid color layer instead of per-pixel getpixel/putpixel loops,
+and each variant is built once per process.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+from asset_store import get_asset, add_reload_listener
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_ICONS = 256
+
+_icon_cache: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _build_icon(icon_path: str, size: Optional[Tuple[int, int]], exact: bool,
+                color: Optional[Tuple[int, int, int]]) -> Image.Image:
+    icon = get_asset(icon_path)
+    if size is not None:
+        if exact:
+            icon = icon.resize(size)
+        else:
+            icon = icon.copy()
+            icon.thumbnail(size)
+    if color is None:
+        return icon.copy()
+
+    # Solid color layer masked by the icon's alpha: same result as replacing
+    # every visible pixel with the color while keeping its alpha
+    colored_icon = Image.new('RGBA', icon.size, color + (0,))
+    colored_icon.putalpha(icon.getchannel('A'))
+    return colored_icon
+
+def get_icon(icon_path: str, size: Optional[Tuple[int, int]] = None,
+             color: Optional[Tuple[int, int, int]] = None, exact: bool = False) -> Image.Image:
+    """
+    Get an icon resized and optionally recolored, from cache when possible.
+
+    Args:
+        icon_path: Path to the icon image
+        size: Bounding box for thumbnail() (or exact size with exact=True); None keeps the original size
+        color: RGB color to fill the icon with, keeping its alpha; None keeps the original colors
+        exact: Resize to exactly `size` instead of fitting within it
+
+    Returns:
+        Image.Image: A private RGBA copy the caller may modify
+    """
+    if color is not None:
+        color = tuple(int(c) for c in color[:3])
+    key = (icon_path, tuple(size) if size is not None else None, exact, color)
+
+    with _cache_lock:
+        cached = _icon_cache.get(key)
+        if cached is not None:
+            _icon_cache.move_to_end(key)
+            _stats["hits"] += 1
+            return cached.copy()
+
+        _stats["misses"] += 1
+        icon = _build_icon(icon_path, key[1], exact, color)
+        _icon_cache[key] = icon
+        while len(_icon_cache) > MAX_CACHED_ICONS:
+            _icon_cache.popitem(last=False)
+        return icon.copy()
+
+def clear_icon_cache() -> None:
+    """Drop all cached icon variants."""
+    with _cache_lock:
+        _icon_cache.clear()
+
+# Recolored variants are derived from the store's sources, so drop them on reload
+add_reload_listener(clear_icon_cache)
+
+def get_icon_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and cache size."""
+    with _cache_lock:
+        return {**_stats, "entries": len(_icon_cache)}
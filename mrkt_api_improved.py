@@ -14,6 +14,10 @@ import time
 import re
 from datetime import datetime
 from fuzzywuzzy import fuzz
+import asyncio
+import upstream_limiter
+import credential_manager
+from mrkt_snapshot import CollectionSnapshot
 
 # Configure logging
 logging.basicConfig(
@@ -26,8 +30,21 @@ logger = logging.getLogger("mrkt_api_improved")
 STICKER_PRICE_CACHE = {}
 CHARACTER_CACHE = []
 CHARACTER_CACHE_EXPIRY = 0
-DATA_CACHE = {}
 CACHE_DURATION = 1920  # 32 minutes in seconds (changed from 3600)
+TOKEN_REFRESH_INTERVAL = 1920  # Auth tokens are renewed every 32 minutes
+TOKEN_REFRESH_MARGIN = 120  # Refresh in the background 2 minutes before expiry
+
+# Sticker characters snapshot, indexed by (collection ID, character ID), name and collection
+CHARACTER_SNAPSHOT = CollectionSnapshot(
+    "mrkt_sticker_characters", ttl=CACHE_DURATION, max_staleness=CACHE_DURATION * 2,
+    indexes={
+        "id": lambda char: (char.get('stickerCollectionId'), char.get('id')),
+        "name": lambda char: char.get('name') or None,
+    },
+    group_indexes={
+        "collection": lambda char: char.get('stickerCollectionId'),
+    },
+)
 
 # Configure API base URL and endpoints
 API_BASE_URL = "https://api.tgmrkt.io"
@@ -272,6 +289,17 @@ class MRKTApiException(Exception):
     """Exception raised for MRKT API errors."""
     pass
 
+def _mrkt_post(url, **kwargs):
+    """POST to the MRKT API through the shared MRKT rate limit budget."""
+    limiter = upstream_limiter.get_limiter("mrkt")
+    limiter.acquire_sync()
+    response = requests.post(url, **kwargs)
+    if response.status_code == 429:
+        limiter.penalize(upstream_limiter.parse_retry_after(response))
+    elif response.status_code < 500:
+        limiter.record_success()
+    return response
+
 def authenticate():
     """
     Authenticate with the MRKT API.
@@ -282,7 +310,7 @@ def authenticate():
     try:
         logger.info("Authenticating with MRKT API")
         
-        response = requests.post(
+        response = _mrkt_post(
             AUTH_ENDPOINT,
             headers=DEFAULT_HEADERS,
             json=AUTH_DATA,
@@ -308,7 +336,7 @@ def authenticate():
         logger.warning(f"Authentication error: {e}")
         return None
 
-def get_working_token():
+def find_working_token():
     """
     Try to get a working API token using multiple methods:
     1. Direct authentication
@@ -330,7 +358,7 @@ def get_working_token():
             headers["Authorization"] = token
             
             # Make a simple request to test the token
-            response = requests.post(
+            response = _mrkt_post(
                 STICKER_SETS_ENDPOINT,
                 headers=headers,
                 json={"count": 1},
@@ -346,6 +374,22 @@ def get_working_token():
     logger.error("All API tokens failed")
     return None
 
+async def _refresh_token():
+    return await asyncio.to_thread(find_working_token)
+
+# Tokens are refreshed in the background by credential_manager, never on the request path
+credential_manager.register("mrkt_stickers", _refresh_token, ttl=TOKEN_REFRESH_INTERVAL,
+                            refresh_margin=TOKEN_REFRESH_MARGIN)
+
+def get_working_token():
+    """
+    Get the current API token without re-authenticating
+    
+    Returns:
+        str: Working API token or None if none is available
+    """
+    return credential_manager.get("mrkt_stickers")
+
 def get_auth_headers():
     """
     Get headers with authentication token
@@ -361,32 +405,20 @@ def get_auth_headers():
     headers["Authorization"] = token
     return headers
 
-def fetch_characters(use_cache=True):
+def _load_characters():
     """
-    Fetch all characters from the API
+    Download every sticker character (used to refresh the snapshot)
     
-    Args:
-        use_cache (bool): Whether to use cached data
-        
     Returns:
-        list: List of characters
+        list: List of characters, or None on failure
     """
-    # Check cache first
-    current_time = time.time()
-    
-    if use_cache and "characters" in DATA_CACHE:
-        cache_entry = DATA_CACHE["characters"]
-        if current_time < cache_entry.get("expires_at", 0):
-            logger.info("Using cached character data")
-            return cache_entry["data"]
-    
     logger.info("Fetching character data from API")
     
     # Authenticate
-    token = authenticate()
+    token = get_working_token()
     if not token:
         logger.error("Failed to authenticate")
-        return []
+        return None
     
     # Make API request
     try:
@@ -401,7 +433,7 @@ def fetch_characters(use_cache=True):
             "collections": COLLECTION_IDS
         }
         
-        response = requests.post(
+        response = _mrkt_post(
             CHARACTERS_ENDPOINT,
             headers=headers,
             json=payload,
@@ -411,20 +443,29 @@ def fetch_characters(use_cache=True):
         if response.status_code == 200:
             characters = response.json()
             logger.info(f"Successfully fetched {len(characters)} characters")
-            
-            # Cache the data
-            DATA_CACHE["characters"] = {
-                "data": characters,
-                "expires_at": current_time + CACHE_DURATION
-            }
-            
             return characters
         else:
             logger.error(f"Failed to fetch characters: {response.status_code} {response.text}")
-            return []
+            if response.status_code == 401:
+                credential_manager.invalidate("mrkt_stickers")
+            return None
     except Exception as e:
         logger.error(f"Error fetching characters: {e}")
+        return None
+
+def fetch_characters(use_cache=True):
+    """
+    Fetch all characters from the API
+    
+    Args:
+        use_cache (bool): Whether to use cached data
+        
+    Returns:
+        list: List of characters
+    """
+    if not CHARACTER_SNAPSHOT.ensure(_load_characters, force=not use_cache):
         return []
+    return CHARACTER_SNAPSHOT.items
 
 def convert_nano_ton(nano_ton):
     """
@@ -481,16 +522,11 @@ def find_character_by_direct_id(sticker_name):
         collection_id, character_id = CHARACTER_ID_MAPPING[sticker_name]
         logger.info(f"Using direct ID mapping: {sticker_name} -> ({collection_id}, {character_id})")
         
-        # Get all characters
-        characters = fetch_characters()
-        if not characters:
+        # Make sure the character snapshot is loaded
+        if not fetch_characters():
             return None
         
-        # Find the character with matching collection_id and character_id
-        for char in characters:
-            if (char.get('stickerCollectionId') == collection_id and 
-                char.get('id') == character_id):
-                return char
+        return CHARACTER_SNAPSHOT.get("id", (collection_id, character_id))
     
     return None
 
@@ -525,9 +561,9 @@ def find_character_by_name(sticker_name):
             return direct_match
         
         # Look for the mapped name in characters
-        for char in characters:
-            if char.get('name', '') == mapped_name:
-                return char
+        direct_match = CHARACTER_SNAPSHOT.get("name", mapped_name)
+        if direct_match:
+            return direct_match
     
     # Check if we have a collection ID mapping
     collection_id = COLLECTION_ID_MAPPING.get(sticker_name)
@@ -535,7 +571,7 @@ def find_character_by_name(sticker_name):
         logger.info(f"Using collection ID mapping: {sticker_name} -> Collection {collection_id}")
         
         # Find characters in this collection
-        collection_chars = [c for c in characters if c.get('stickerCollectionId') == collection_id]
+        collection_chars = list(CHARACTER_SNAPSHOT.group("collection", collection_id))
         
         # If we found characters in this collection, return the first one
         if collection_chars:
@@ -708,6 +744,7 @@ def clear_cache():
     STICKER_PRICE_CACHE = {}
     CHARACTER_CACHE = None
     CHARACTER_CACHE_EXPIRY = 0
+    CHARACTER_SNAPSHOT.invalidate()
     logger.info("All caches cleared")
 
 def test():
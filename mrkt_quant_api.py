@@ -9,8 +9,14 @@ import sys
 import json
 import logging
 import asyncio
-import requests
 import urllib.parse
+import http_client
+import credential_manager
+import response_cache
+import upstream_limiter
+import circuit_breaker
+from swr_cache import SWRCache
+from mrkt_snapshot import CollectionSnapshot
 from typing import Optional, Dict, Any
 from plus_premarket_gifts import PLUS_PREMARKET_GIFTS, is_mrkt_gift, get_gift_id
 
@@ -56,140 +62,169 @@ TELEGRAM_SESSION_NAME = os.getenv('TELEGRAM_SESSION_NAME', 'mrkt_session')
 
 # Import TON price utility
 try:
-    from ton_price_utils import get_ton_price_usd
+    from ton_price_utils import get_ton_price_usd, get_ton_price_usd_async
 except ImportError:
     # Fallback if module not available
     def get_ton_price_usd():
         return 2.10  # Fallback value
 
-# Cache for auth tokens
-_mrkt_jwt_token = None
-_mrkt_token_timestamp = 0
-_quant_init_data = None
-_quant_init_data_timestamp = 0
+    async def get_ton_price_usd_async():
+        return 2.10  # Fallback value
 
 # Token refresh intervals
 MRKT_TOKEN_REFRESH_INTERVAL = 45  # Refresh every 45 seconds
 QUANT_TOKEN_REFRESH_INTERVAL = 300  # Refresh every 5 minutes
 
-# Cache for gift data
-_gift_cache = {}
-_cache_expiry = {}
-CACHE_DURATION = 60  # 1 minute cache
+# Tokens are renewed by credential_manager ahead of the interval while in use;
+# requests only wait when a token is older than its max age
+TOKEN_REFRESH_MARGIN = 10  # Seconds before the interval to refresh
+TOKEN_IDLE_TIMEOUT = 10 * 60  # Stop refreshing tokens unused for 10 minutes
+MRKT_TOKEN_MAX_AGE = 5 * 60
+QUANT_TOKEN_MAX_AGE = 15 * 60
+
+# Persistent Telethon session (one per event loop) and resolved bot peers
+_telethon_client = None
+_telethon_loop = None
+_bot_entities = {}
+
+# Cache for gift data (stale-while-revalidate)
+CACHE_DURATION = 60  # 1 minute until a background refresh is triggered
+PRICE_MAX_STALENESS = 15 * 60  # Older prices wait for the upstream
+_price_cache = SWRCache("plus_premarket_prices", ttl=CACHE_DURATION, max_staleness=PRICE_MAX_STALENESS)
+
+# Whole MRKT collections list, indexed by gift ID and lowercase title
+_mrkt_collections = CollectionSnapshot(
+    "mrkt_gift_collections", ttl=CACHE_DURATION, max_staleness=PRICE_MAX_STALENESS,
+    indexes={
+        "id": lambda gift: gift.get('name'),
+        "title": lambda gift: (gift.get('title') or '').lower() or None,
+    },
+)
 
 # Use shared TON price utility
 get_ton_price_from_coinmarketcap = get_ton_price_usd
 
-async def get_mrkt_init_data() -> Optional[str]:
-    """Get fresh initData from MRKT bot using Telethon"""
+async def get_telethon_client():
+    """
+    Get the long-lived Telethon client for this event loop, connecting it on first use.
+    
+    Returns:
+        TelegramClient or None if Telethon/credentials are unavailable or the session is not authorized
+    """
+    global _telethon_client, _telethon_loop
+    
     if not TELETHON_AVAILABLE:
-        logger.error("Telethon not available - cannot get MRKT initData")
+        logger.error("Telethon not available - cannot get initData")
         return None
     
     if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
         logger.error("TELEGRAM_API_ID and TELEGRAM_API_HASH must be set")
         return None
     
-    client = None
-    try:
-        client = TelegramClient(TELEGRAM_SESSION_NAME, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
-        await client.connect()
-        
-        if not await client.is_user_authorized():
-            logger.error("Telethon session not authorized. Run setup_mrkt_session.py")
-            return None
-        
-        bot = await client.get_entity(MRKT_BOT_USERNAME)
-        
-        result = await client(functions.messages.RequestWebViewRequest(
-            peer=bot,
-            bot=bot,
-            platform="ios",
-            url=f"{MRKT_API_BASE}/api/v1/auth",
-        ))
-        
-        if not result or not hasattr(result, 'url'):
-            return None
-        
-        webview_url = result.url
-        parsed = urllib.parse.urlparse(webview_url)
-        
-        # Check query params
-        query_params = urllib.parse.parse_qs(parsed.query)
-        if 'tgWebAppData' in query_params:
-            init_data = urllib.parse.unquote(query_params['tgWebAppData'][0])
-            return init_data
-        
-        # Check fragment
-        fragment = parsed.fragment
-        if fragment and 'tgWebAppData=' in fragment:
-            init_data_encoded = fragment.split('tgWebAppData=')[1]
-            if '&' in init_data_encoded:
-                init_data_encoded = init_data_encoded.split('&')[0]
-            init_data = urllib.parse.unquote(init_data_encoded)
-            return init_data
-        
-        return None
-        
-    except Exception as e:
-        logger.error(f"Error getting MRKT initData: {e}")
+    loop = asyncio.get_running_loop()
+    if _telethon_client is not None and _telethon_loop is loop:
+        if not _telethon_client.is_connected():
+            await _telethon_client.connect()
+        return _telethon_client
+    
+    if _telethon_client is not None:
+        # Client belongs to a finished event loop: release its session file lock
+        try:
+            _telethon_client.session.close()
+        except Exception:
+            pass
+        _telethon_client = None
+        _bot_entities.clear()
+    
+    client = TelegramClient(TELEGRAM_SESSION_NAME, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
+    await client.connect()
+    
+    if not await client.is_user_authorized():
+        logger.error("Telethon session not authorized. Run setup_mrkt_session.py")
+        await client.disconnect()
         return None
-    finally:
-        if client:
-            await client.disconnect()
+    
+    _telethon_client = client
+    _telethon_loop = loop
+    api_logger.info("[Telethon] Persistent session connected")
+    return client
 
-async def get_quant_init_data() -> Optional[str]:
-    """Get fresh initData from Quant bot using Telethon"""
-    if not TELETHON_AVAILABLE:
-        logger.error("Telethon not available - cannot get Quant initData")
+async def close_telethon_client():
+    """Disconnect the persistent Telethon client (call on shutdown)."""
+    global _telethon_client, _telethon_loop
+    if _telethon_client is not None:
+        try:
+            await _telethon_client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting Telethon client: {e}")
+    _telethon_client = None
+    _telethon_loop = None
+    _bot_entities.clear()
+
+def _extract_init_data(webview_url: str) -> Optional[str]:
+    """Extract tgWebAppData from a WebView URL's query string or fragment."""
+    parsed = urllib.parse.urlparse(webview_url)
+    
+    # Check query params
+    query_params = urllib.parse.parse_qs(parsed.query)
+    if 'tgWebAppData' in query_params:
+        return urllib.parse.unquote(query_params['tgWebAppData'][0])
+    
+    # Check fragment
+    fragment = parsed.fragment
+    if fragment and 'tgWebAppData=' in fragment:
+        init_data_encoded = fragment.split('tgWebAppData=')[1]
+        if '&' in init_data_encoded:
+            init_data_encoded = init_data_encoded.split('&')[0]
+        return urllib.parse.unquote(init_data_encoded)
+    
+    return None
+
+async def _request_init_data(bot_username: str, url: str) -> Optional[str]:
+    """Request WebView initData from a bot over the persistent Telethon session."""
+    client = await get_telethon_client()
+    if client is None:
         return None
     
-    if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
-        logger.error("TELEGRAM_API_ID and TELEGRAM_API_HASH must be set")
+    # Resolve the bot once per session; later requests reuse the input peer
+    bot = _bot_entities.get(bot_username)
+    if bot is None:
+        bot = await client.get_input_entity(bot_username)
+        _bot_entities[bot_username] = bot
+    
+    result = await client(functions.messages.RequestWebViewRequest(
+        peer=bot,
+        bot=bot,
+        platform="ios",
+        url=url,
+    ))
+    
+    if not result or not hasattr(result, 'url'):
         return None
     
-    client = None
+    return _extract_init_data(result.url)
+
+async def get_mrkt_init_data() -> Optional[str]:
+    """Get fresh initData from MRKT bot using Telethon"""
     try:
-        client = TelegramClient(TELEGRAM_SESSION_NAME, int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
-        await client.connect()
-        
-        if not await client.is_user_authorized():
-            logger.error("Telethon session not authorized")
-            return None
-        
-        bot = await client.get_entity(QUANT_BOT_USERNAME)
-        
-        result = await client(functions.messages.RequestWebViewRequest(
-            peer=bot,
-            bot=bot,
-            platform="ios",
-            url=QUANT_API_BASE,
-        ))
-        
-        if not result or not hasattr(result, 'url'):
-            return None
-        
-        webview_url = result.url
-        parsed = urllib.parse.urlparse(webview_url)
-        fragment = parsed.fragment
-        
-        if fragment and 'tgWebAppData=' in fragment:
-            init_data_encoded = fragment.split('tgWebAppData=')[1]
-            if '&' in init_data_encoded:
-                init_data_encoded = init_data_encoded.split('&')[0]
-            init_data = urllib.parse.unquote(init_data_encoded)
-            return init_data
-        
+        return await _request_init_data(MRKT_BOT_USERNAME, f"{MRKT_API_BASE}/api/v1/auth")
+    except Exception as e:
+        logger.error(f"Error getting MRKT initData: {e}")
+        if "database is locked" in str(e).lower():
+            raise
+        await close_telethon_client()
         return None
-        
+
+async def get_quant_init_data() -> Optional[str]:
+    """Get fresh initData from Quant bot using Telethon"""
+    try:
+        return await _request_init_data(QUANT_BOT_USERNAME, QUANT_API_BASE)
     except Exception as e:
         logger.error(f"Error getting Quant initData: {e}")
+        await close_telethon_client()
         return None
-    finally:
-        if client:
-            await client.disconnect()
 
-def get_mrkt_jwt_token(init_data: str) -> Optional[str]:
+async def get_mrkt_jwt_token(init_data: str) -> Optional[str]:
     """Exchange initData for JWT token from MRKT API"""
     try:
         headers = {
@@ -199,7 +234,8 @@ def get_mrkt_jwt_token(init_data: str) -> Optional[str]:
         
         payload = {'data': init_data}
         
-        response = requests.post(f"{MRKT_API_BASE}/api/v1/auth", headers=headers, json=payload, timeout=15)
+        response = await http_client.post(f"{MRKT_API_BASE}/api/v1/auth", headers=headers, json=payload, timeout=15,
+                                          limiter=upstream_limiter.get_limiter("mrkt"))
         
         if response.status_code == 200:
             data = response.json()
@@ -215,21 +251,12 @@ def get_mrkt_jwt_token(init_data: str) -> Optional[str]:
         logger.error(f"MRKT auth error: {e}")
         return None
 
-async def ensure_mrkt_token() -> Optional[str]:
-    """Ensure we have a valid MRKT JWT token"""
-    global _mrkt_jwt_token, _mrkt_token_timestamp
-    
-    import time
-    current_time = time.time()
-    
-    # Check if token needs refresh
-    if _mrkt_jwt_token and (current_time - _mrkt_token_timestamp) < MRKT_TOKEN_REFRESH_INTERVAL:
-        return _mrkt_jwt_token
-    
-    # Get fresh initData and exchange for JWT
+async def _refresh_mrkt_token() -> Optional[str]:
+    """Fetch fresh initData and exchange it for a new MRKT JWT token."""
     api_logger.info("[MRKT] Refreshing JWT token...")
     
     # Retry logic for database lock issues
+    init_data = None
     max_retries = 3
     for attempt in range(max_retries):
         try:
@@ -249,98 +276,115 @@ async def ensure_mrkt_token() -> Optional[str]:
         logger.error("Could not get MRKT initData")
         return None
     
-    jwt_token = get_mrkt_jwt_token(init_data)
+    jwt_token = await get_mrkt_jwt_token(init_data)
     
     if jwt_token:
-        _mrkt_jwt_token = jwt_token
-        _mrkt_token_timestamp = current_time
         api_logger.info("[MRKT] JWT token refreshed successfully")
-        return jwt_token
-    
-    return None
+    return jwt_token
 
-async def ensure_quant_init_data() -> Optional[str]:
-    """Ensure we have valid Quant initData"""
-    global _quant_init_data, _quant_init_data_timestamp
-    
-    import time
-    current_time = time.time()
-    
-    # Check if initData needs refresh
-    if _quant_init_data and (current_time - _quant_init_data_timestamp) < QUANT_TOKEN_REFRESH_INTERVAL:
-        return _quant_init_data
-    
-    # Get fresh initData
+async def _refresh_quant_init_data() -> Optional[str]:
+    """Fetch fresh Quant initData."""
     api_logger.info("[Quant] Refreshing initData...")
     init_data = await get_quant_init_data()
     
     if init_data:
-        _quant_init_data = init_data
-        _quant_init_data_timestamp = current_time
         api_logger.info("[Quant] initData refreshed successfully")
-        return init_data
+    else:
+        logger.error("Could not get Quant initData")
+    return init_data
+
+def register_credentials() -> None:
+    """Hand MRKT and Quant auth to the background credential refresher (idempotent)."""
+    credential_manager.register("mrkt_jwt", _refresh_mrkt_token, ttl=MRKT_TOKEN_REFRESH_INTERVAL,
+                                refresh_margin=TOKEN_REFRESH_MARGIN, max_age=MRKT_TOKEN_MAX_AGE,
+                                idle_timeout=TOKEN_IDLE_TIMEOUT)
+    credential_manager.register("quant_init_data", _refresh_quant_init_data, ttl=QUANT_TOKEN_REFRESH_INTERVAL,
+                                refresh_margin=TOKEN_REFRESH_MARGIN, max_age=QUANT_TOKEN_MAX_AGE,
+                                idle_timeout=TOKEN_IDLE_TIMEOUT)
+    # The Telethon client and auth HTTP connections live on the credential manager's loop
+    credential_manager.add_shutdown_hook(close_telethon_client)
+    credential_manager.add_shutdown_hook(http_client.close)
+
+register_credentials()
+
+async def ensure_mrkt_token() -> Optional[str]:
+    """Get the current MRKT JWT token (kept fresh in the background)"""
+    return await credential_manager.get_async("mrkt_jwt")
+
+async def ensure_quant_init_data() -> Optional[str]:
+    """Get the current Quant initData (kept fresh in the background)"""
+    return await credential_manager.get_async("quant_init_data")
+
+async def _load_mrkt_collections() -> Optional[list]:
+    """Download the full MRKT gift collections list (used to refresh the snapshot)."""
+    breaker = circuit_breaker.get_breaker("mrkt")
+    if breaker.is_open():
+        # Only the cached response can be served; skip the Telethon token round trip
+        api_logger.warning("[MRKT] Circuit open, serving cached collections")
+        token = credential_manager.peek("mrkt_jwt") or ""
+    else:
+        token = await ensure_mrkt_token()
+        if not token:
+            return None
     
-    logger.error("Could not get Quant initData")
-    return None
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Accept': 'application/json',
+    }
+    
+    endpoint = f"{MRKT_API_BASE}/api/v1/gifts/collections"
+    response = await http_client.get_cached(endpoint, headers=headers, timeout=15,
+                                            limiter=upstream_limiter.get_limiter("mrkt"),
+                                            breaker=breaker)
+    
+    if response.status_code != 200:
+        api_logger.error(f"[MRKT] API request failed: {response.status_code}")
+        return None
+    
+    return response.json()
 
 async def fetch_from_mrkt(gift_id: str, gift_name: str) -> Optional[Dict[str, Any]]:
     """Fetch gift data from MRKT API"""
     try:
-        token = await ensure_mrkt_token()
-        if not token:
+        if not await _mrkt_collections.ensure_async(_load_mrkt_collections):
             return None
         
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Accept': 'application/json',
-        }
-        
-        endpoint = f"{MRKT_API_BASE}/api/v1/gifts/collections"
-        response = requests.get(endpoint, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Find gift by ID (name field in MRKT contains the numeric ID)
-            for gift in data:
-                if gift.get('name') == gift_id or gift.get('title', '').lower() == gift_name.lower():
-                    # Extract price from nanoTons
-                    floor_price_nano = gift.get('floorPriceNanoTons', 0)
-                    floor_price_ton = floor_price_nano / 1_000_000_000  # Convert nanoTons to TON
-                    
-                    # Calculate 24h change if available
-                    prev_price_nano = gift.get('previousDayFloorPriceNanoTons')
-                    change_percentage = 0
-                    if prev_price_nano and prev_price_nano > 0:
-                        change_percentage = ((floor_price_nano - prev_price_nano) / prev_price_nano) * 100
-                    
-                    api_logger.info(f"[MRKT] Found {gift_name} - Price: {floor_price_ton} TON")
-                    
-                    # Get real TON price from CoinMarketCap
-                    ton_price_usd = get_ton_price_from_coinmarketcap()
-                    price_usd = floor_price_ton * ton_price_usd
-                    
-                    # Get supply from gift data
-                    from plus_premarket_gifts import get_gift_supply
-                    supply = get_gift_supply(gift_name)
-                    
-                    return {
-                        "name": gift_name,
-                        "priceUsd": price_usd,
-                        "priceTon": floor_price_ton,
-                        "changePercentage": change_percentage,
-                        "model": "",
-                        "backdrop": "",
-                        "symbol": "",
-                        "upgradedSupply": supply if supply else "N/A"
-                    }
-            
+        # Find gift by ID (name field in MRKT contains the numeric ID)
+        gift = _mrkt_collections.get("id", gift_id) or _mrkt_collections.get("title", gift_name.lower())
+        if gift is None:
             api_logger.warning(f"[MRKT] Gift {gift_name} (ID: {gift_id}) not found in API response")
             return None
-            
-        else:
-            api_logger.error(f"[MRKT] API request failed: {response.status_code}")
-            return None
+        
+        # Extract price from nanoTons
+        floor_price_nano = gift.get('floorPriceNanoTons', 0)
+        floor_price_ton = floor_price_nano / 1_000_000_000  # Convert nanoTons to TON
+        
+        # Calculate 24h change if available
+        prev_price_nano = gift.get('previousDayFloorPriceNanoTons')
+        change_percentage = 0
+        if prev_price_nano and prev_price_nano > 0:
+            change_percentage = ((floor_price_nano - prev_price_nano) / prev_price_nano) * 100
+        
+        api_logger.info(f"[MRKT] Found {gift_name} - Price: {floor_price_ton} TON")
+        
+        # Get real TON price from CoinMarketCap
+        ton_price_usd = await get_ton_price_usd_async()
+        price_usd = floor_price_ton * ton_price_usd
+        
+        # Get supply from gift data
+        from plus_premarket_gifts import get_gift_supply
+        supply = get_gift_supply(gift_name)
+        
+        return {
+            "name": gift_name,
+            "priceUsd": price_usd,
+            "priceTon": floor_price_ton,
+            "changePercentage": change_percentage,
+            "model": "",
+            "backdrop": "",
+            "symbol": "",
+            "upgradedSupply": supply if supply else "N/A"
+        }
             
     except Exception as e:
         api_logger.error(f"[MRKT] Error fetching {gift_name}: {e}")
@@ -353,9 +397,15 @@ async def fetch_from_quant(gift_id: str, gift_name: str) -> Optional[Dict[str, A
         return None
     
     try:
-        init_data = await ensure_quant_init_data()
-        if not init_data:
-            return None
+        breaker = circuit_breaker.get_breaker("quant")
+        if breaker.is_open():
+            # Only the cached response can be served; skip the Telethon initData round trip
+            api_logger.warning(f"[Quant] Circuit open, serving cached gifts for {gift_name}")
+            init_data = credential_manager.peek("quant_init_data") or ""
+        else:
+            init_data = await ensure_quant_init_data()
+            if not init_data:
+                return None
         
         # Create cloudscraper
         scraper = cloudscraper.create_scraper(
@@ -374,7 +424,8 @@ async def fetch_from_quant(gift_id: str, gift_name: str) -> Optional[Dict[str, A
         }
         
         url = f"{QUANT_API_BASE}/api/gifts"
-        response = scraper.get(url, headers=headers, timeout=20)
+        response = await asyncio.to_thread(response_cache.cached_get_sync, scraper.get, url, headers, 20,
+                                           upstream_limiter.get_limiter("quant"), breaker)
         
         if response.status_code == 200:
             data = response.json()
@@ -398,7 +449,7 @@ async def fetch_from_quant(gift_id: str, gift_name: str) -> Optional[Dict[str, A
                     api_logger.info(f"[Quant] Found {gift_name} - Price: {floor_price} TON")
                     
                     # Get real TON price from CoinMarketCap
-                    ton_price_usd = get_ton_price_from_coinmarketcap()
+                    ton_price_usd = await get_ton_price_usd_async()
                     price_usd = floor_price * ton_price_usd
                     
                     # Get supply from API or gift data
@@ -428,56 +479,56 @@ async def fetch_from_quant(gift_id: str, gift_name: str) -> Optional[Dict[str, A
         api_logger.error(f"[Quant] Error fetching {gift_name}: {e}")
         return None
 
+async def _fetch_from_upstream(gift_id: str, gift_name: str) -> Optional[Dict[str, Any]]:
+    """Fetch fresh gift data from the MRKT or Quant API based on gift ID (None on failure)."""
+    api_logger.info(f"Fetching {gift_name} (ID: {gift_id})")
+    
+    if is_mrkt_gift(gift_id):
+        api_logger.info(f"[{gift_name}] Using MRKT API (special gift with numeric ID)")
+        return await fetch_from_mrkt(gift_id, gift_name)
+    
+    api_logger.info(f"[{gift_name}] Using Quant API")
+    return await fetch_from_quant(gift_id, gift_name)
+
 async def fetch_gift_data(gift_name: str) -> Optional[Dict[str, Any]]:
     """
     Fetch gift data for plus premarket gifts from MRKT or Quant API.
     Automatically determines which API to use based on gift ID.
     
+    Served stale-while-revalidate: expired prices are returned immediately
+    and refreshed in the background; only prices older than
+    PRICE_MAX_STALENESS (or missing) wait for the upstream.
+    
     Args:
         gift_name: Display name of the gift
         
     Returns:
         dict: Gift data with price information or None if not found
     """
-    # Check cache first
-    import time
-    current_time = time.time()
-    
-    if gift_name in _gift_cache and current_time - _cache_expiry.get(gift_name, 0) < CACHE_DURATION:
-        api_logger.info(f"[Cache] Returning cached data for {gift_name}")
-        return _gift_cache[gift_name]
-    
     # Get gift ID
     gift_id = get_gift_id(gift_name)
     if not gift_id:
         api_logger.error(f"Gift {gift_name} not found in plus premarket gifts")
         return None
     
-    api_logger.info(f"Fetching {gift_name} (ID: {gift_id})")
-    
     # Check if credentials are available
     if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
         api_logger.warning(f"[{gift_name}] No Telegram credentials - using mock data")
-        return _generate_mock_data(gift_name)
+        return await _generate_mock_data(gift_name)
     
-    # Determine which API to use
-    if is_mrkt_gift(gift_id):
-        api_logger.info(f"[{gift_name}] Using MRKT API (special gift with numeric ID)")
-        result = await fetch_from_mrkt(gift_id, gift_name)
-    else:
-        api_logger.info(f"[{gift_name}] Using Quant API")
-        result = await fetch_from_quant(gift_id, gift_name)
-    
-    # Fallback to mock data if API fails
-    if not result:
-        api_logger.warning(f"[{gift_name}] API failed - using mock data")
-        result = _generate_mock_data(gift_name)
-    
-    # Cache the result if successful
+    result = await _price_cache.get(gift_name, lambda: _fetch_from_upstream(gift_id, gift_name))
     if result:
-        _gift_cache[gift_name] = result
-        _cache_expiry[gift_name] = current_time
+        return result
+    
+    # Serve the last known value if the API fails, then mock data
+    last_known = _price_cache.peek(gift_name)
+    if last_known:
+        api_logger.warning(f"[{gift_name}] API failed - using last known data")
+        return last_known
     
+    api_logger.warning(f"[{gift_name}] API failed - using mock data")
+    result = await _generate_mock_data(gift_name)
+    _price_cache.set(gift_name, result)
     return result
 
 async def fetch_chart_data(gift_name: str) -> Optional[list]:
@@ -510,7 +561,7 @@ async def fetch_chart_data(gift_name: str) -> Optional[list]:
     
     return chart_data
 
-def _generate_mock_data(gift_name: str) -> Dict[str, Any]:
+async def _generate_mock_data(gift_name: str) -> Dict[str, Any]:
     """Generate mock data for testing when API is not available"""
     import random
     from plus_premarket_gifts import get_gift_supply
@@ -519,7 +570,7 @@ def _generate_mock_data(gift_name: str) -> Dict[str, Any]:
     base_price = (hash(gift_name) % 500 + 100) / 100  # 1.00 to 6.00 TON
     price_ton = round(base_price, 2)
     # Get real TON price from CoinMarketCap for mock data too
-    ton_price_usd = get_ton_price_from_coinmarketcap()
+    ton_price_usd = await get_ton_price_usd_async()
     price_usd = round(price_ton * ton_price_usd, 2)
     
     # Generate random change percentage
@@ -544,17 +595,14 @@ def _generate_mock_data(gift_name: str) -> Dict[str, Any]:
 # Cache clearing functions
 def clear_all_caches():
     """Clear all caches to force fresh API calls"""
-    global _gift_cache, _cache_expiry, _mrkt_jwt_token, _quant_init_data
-    _gift_cache.clear()
-    _cache_expiry.clear()
-    _mrkt_jwt_token = None
-    _quant_init_data = None
+    _price_cache.clear()
+    _mrkt_collections.invalidate()
+    credential_manager.invalidate("mrkt_jwt")
+    credential_manager.invalidate("quant_init_data")
     api_logger.info("🧹 CLEARED: All caches cleared")
 
 def clear_price_cache():
     """Clear only the price cache"""
-    global _gift_cache, _cache_expiry
-    _gift_cache.clear()
-    _cache_expiry.clear()
+    _price_cache.clear()
     api_logger.info("🧹 CLEARED: Price cache cleared")
 
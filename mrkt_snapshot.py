@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+MRKT Collection Snapshots
+
+In-memory snapshot of a whole MRKT list endpoint (gift collections, sticker
+characters) with lookup indexes built once per refresh. Per-gift and
+per-sticker lookups are answered from memory instead of downloading and
+scanning the full list each time; a refresh window's worth of lookups costs
+one upstream call.
+
+Async callers use ensure_async() (coalesced, serves stale data while a
+background refresh runs); synchronous callers use ensure() (one thread
+refreshes, the others wait for it).
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import request_coalescer
+
+logger = logging.getLogger(__name__)
+
+class CollectionSnapshot:
+    """One upstream list plus unique and grouped indexes over its items."""
+
+    def __init__(self, name: str, ttl: float, max_staleness: float,
+                 indexes: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+                 group_indexes: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self._index_keys = indexes or {}
+        self._group_keys = group_indexes or {}
+        self._items: List[Dict[str, Any]] = []
+        self._indexes: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self._groups: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"lookups": 0, "refreshes": 0, "refresh_failures": 0}
+
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        return self._items
+
+    def age(self) -> float:
+        return time.time() - self._fetched_at
+
+    def has_data(self) -> bool:
+        return self._fetched_at > 0
+
+    def is_fresh(self) -> bool:
+        return self.has_data() and self.age() < self.ttl
+
+    def load(self, items: List[Dict[str, Any]]) -> None:
+        """Replace the snapshot and rebuild every index."""
+        indexes = {name: {} for name in self._index_keys}
+        groups = {name: {} for name in self._group_keys}
+        for item in items:
+            for name, key_func in self._index_keys.items():
+                key = key_func(item)
+                if key is not None and key not in indexes[name]:
+                    indexes[name][key] = item
+            for name, key_func in self._group_keys.items():
+                key = key_func(item)
+                if key is not None:
+                    groups[name].setdefault(key, []).append(item)
+        # Swap everything at once so readers never see a half-built index
+        self._items, self._indexes, self._groups = items, indexes, groups
+        self._fetched_at = time.time()
+        logger.info(f"[MRKT Snapshot] {self.name} | Indexed {len(items)} items")
+
+    def get(self, index: str, key: Any) -> Optional[Dict[str, Any]]:
+        """Look up one item by a unique index."""
+        self.stats["lookups"] += 1
+        return self._indexes.get(index, {}).get(key)
+
+    def group(self, index: str, key: Any) -> List[Dict[str, Any]]:
+        """Look up all items sharing a grouped index key."""
+        self.stats["lookups"] += 1
+        return self._groups.get(index, {}).get(key, [])
+
+    def invalidate(self) -> None:
+        """Force the next ensure call to refresh (current data is kept as a fallback)."""
+        self._fetched_at = min(self._fetched_at, time.time() - self.ttl) if self.has_data() else 0.0
+
+    def _store_result(self, items: Optional[List[Dict[str, Any]]]) -> bool:
+        self.stats["refreshes"] += 1
+        if items is None:
+            self.stats["refresh_failures"] += 1
+            return False
+        self.load(items)
+        return True
+
+    def ensure(self, loader: Callable[[], Optional[List[Dict[str, Any]]]], force: bool = False) -> bool:
+        """
+        Make sure the snapshot is fresh for synchronous callers.
+
+        Args:
+            loader: Returns the full item list, or None on failure
+            force: Refresh even if the snapshot is fresh
+
+        Returns:
+            bool: True if any data (fresh or a previous snapshot) is available
+        """
+        if not force and self.is_fresh():
+            return True
+        fetched_at = self._fetched_at
+        with self._lock:
+            # Another thread refreshed while we waited for the lock
+            if self._fetched_at != fetched_at and self.is_fresh():
+                return True
+            self._store_result(loader())
+        return self.has_data()
+
+    async def ensure_async(self, loader: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]) -> bool:
+        """
+        Make sure the snapshot is usable for async callers.
+
+        Stale data within max_staleness is served immediately while one
+        background task refreshes it; otherwise the refresh is awaited.
+
+        Returns:
+            bool: True if any data is available
+        """
+        if self.is_fresh():
+            return True
+        if self.has_data() and self.age() < self.max_staleness:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_async(loader))
+            return True
+        await self._refresh_async(loader)
+        return self.has_data()
+
+    async def _refresh_async(self, loader: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]) -> bool:
+        async def load_and_store():
+            try:
+                return self._store_result(await loader())
+            except Exception as e:
+                self.stats["refresh_failures"] += 1
+                logger.warning(f"[MRKT Snapshot] {self.name} | Refresh failed: {e}")
+                return False
+        return await request_coalescer.coalesce("mrkt_snapshot", self.name, load_and_store)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return snapshot size, age and hit counters."""
+        return {
+            "items": len(self._items),
+            "age_seconds": round(self.age(), 1) if self.has_data() else None,
+            **self.stats,
+        }
@@ -1,19 +1,29 @@
 import os
 import random
 from PIL import Image, ImageDraw, ImageFont, ImageColor, ImageStat, ImageEnhance, ImageFilter, ImageOps
-import colorsys
-import numpy as np
 import datetime
 import requests
 import json
 from urllib.parse import quote
 from difflib import get_close_matches
+from functools import lru_cache
 import math
 import logging
 
 # Import our Portal API module (replaces Tonnel API)
 import portal_api
 import asyncio
+import request_coalescer
+import circuit_breaker
+from swr_cache import SWRCache
+from gradient_engine import radial_gradient
+from icon_cache import get_icon
+from asset_store import get_asset, preload_assets
+from font_registry import get_font, get_text_length, get_text_bbox
+import color_index
+import card_compositor
+from card_compositor import file_version
+from card_encoder import save_card
 
 # Get the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -41,131 +51,50 @@ ton_logo_path = os.path.join(assets_dir, "TON2.png")
 star_logo_path = os.path.join(assets_dir, "star.png")
 font_path = os.path.join(script_dir, "Typekiln - EloquiaDisplay-ExtraBold.otf")
 
+# Final sizes of the shared static assets
+CARD_SIZE = (1600, 1000)
+GIFT_IMAGE_SIZE = (150, 150)
+
 # API endpoints (kept as fallback)
 GIFTS_API = "https://giftcharts-api.onrender.com/gifts"
 CHART_API = "https://giftcharts-api.onrender.com/weekChart?name="
 
+# Card data caches: expired entries are served immediately while refreshing in the background
+CARD_DATA_TTL = 60  # Seconds before a background refresh is triggered
+CARD_DATA_MAX_STALENESS = 15 * 60  # Older data makes the card wait for upstream
+_gift_data_cache = SWRCache("gift_data", ttl=CARD_DATA_TTL, max_staleness=CARD_DATA_MAX_STALENESS)
+_chart_data_cache = SWRCache("chart_data", ttl=CARD_DATA_TTL, max_staleness=CARD_DATA_MAX_STALENESS)
+
 # Create output directory if it doesn't exist
 os.makedirs(output_dir, exist_ok=True)
 os.makedirs(backgrounds_dir, exist_ok=True)  # Ensure backgrounds directory exists
 
 # Function to get dominant color from an image
 def get_dominant_color(image_path):
-    try:
-        img = Image.open(image_path)
-        
-        # Convert to RGBA if not already
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        # Create a smaller version of the image to speed up processing
-        img.thumbnail((100, 100))
-        
-        # Get color data
-        pixels = np.array(img)
-        
-        # Remove transparent pixels (alpha < 128)
-        pixels = pixels[pixels[:,:,3] > 128]
-        
-        if len(pixels) == 0:
-            return (128, 128, 128)  # Default to gray if all pixels are transparent
-        
-        # Remove alpha channel for clustering
-        pixels = pixels[:,:3]
-        
-        # Simple average color (mean of all non-transparent pixels)
-        avg_color = pixels.mean(axis=0).astype(int)
-        
-        # Enhance saturation a bit for better visual appeal
-        h, s, v = colorsys.rgb_to_hsv(avg_color[0]/255, avg_color[1]/255, avg_color[2]/255)
-        s = min(s * 1.5, 1.0)  # Increase saturation by 50%, but not above 1.0
-        r, g, b = colorsys.hsv_to_rgb(h, s, v)
-        
-        return (int(r*255), int(g*255), int(b*255))
-    except Exception as e:
-        print(f"Error getting dominant color from {image_path}: {e}")
-        return (128, 128, 128)  # Default to gray on error
+    """Saturation-boosted average color, served from the shared color index."""
+    return color_index.get_dominant_color(image_path, color_index.SATURATED)
+
+def preload_static_assets():
+    """Decode the shared card assets (background, white box, logos) before the first card."""
+    loaded = preload_assets([
+        (background_path, CARD_SIZE),
+        (white_box_path, CARD_SIZE),
+        (ton_logo_path, None),
+        (star_logo_path, None),
+    ])
+    logger.info(f"Preloaded {loaded} static card assets")
+    return loaded
 
 # Function to apply color to the background
 def apply_color_to_background(background_img, color):
     try:
-        # Create a gradient background instead of solid color
+        # Radial gradient from the shared engine (cached per size and color)
         width, height = background_img.size
-        
-        # Create a new image with the same size and mode
-        gradient_bg = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
-        
-        # Extract the base color components
-        r, g, b = color
-        
-        # Create a darker shade for the edges
-        darker_r = max(0, int(r * 0.65))
-        darker_g = max(0, int(g * 0.65))
-        darker_b = max(0, int(b * 0.65))
-        darker_color = (darker_r, darker_g, darker_b, 255)
-        
-        # Create a lighter shade for the center
-        lighter_r = min(255, int(r * 1.15))
-        lighter_g = min(255, int(g * 1.15))
-        lighter_b = min(255, int(b * 1.15))
-        lighter_color = (lighter_r, lighter_g, lighter_b, 255)
-        
-        # Create a slightly different hue for added depth
-        h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-        h = (h + 0.05) % 1.0  # Shift hue slightly
-        s = min(1.0, s * 1.2)  # Increase saturation
-        accent_r, accent_g, accent_b = colorsys.hsv_to_rgb(h, s, v)
-        accent_color = (int(accent_r*255), int(accent_g*255), int(accent_b*255), 255)
-        
-        # Create a radial gradient using a more efficient method
-        # First create a small gradient image and then resize it
-        small_size = (200, 200)  # Increased for smoother gradient
-        small_gradient = Image.new('RGBA', small_size, (0, 0, 0, 0))
-        small_draw = ImageDraw.Draw(small_gradient)
-        
-        # Draw concentric circles with decreasing radius
-        center = (small_size[0] // 2, small_size[1] // 2)
-        max_radius = int(((small_size[0] // 2) ** 2 + (small_size[1] // 2) ** 2) ** 0.5)
-        
-        # Draw from outside in with more gradual transitions
-        num_steps = 40  # More steps for smoother gradient
-        for i in range(num_steps):
-            # Calculate radius for this step
-            radius = max_radius * (1 - (i / num_steps))
-            
-            # Calculate interpolation factor (0 at edge, 1 at center)
-            factor = i / num_steps
-            
-            # Create multi-point gradient with darker outer edges and lighter center
-            if factor < 0.25:  # Outer 25% transitions from darker to base
-                t = factor / 0.25
-                r_val = int(darker_color[0] * (1-t) + color[0] * t)
-                g_val = int(darker_color[1] * (1-t) + color[1] * t)
-                b_val = int(darker_color[2] * (1-t) + color[2] * t)
-            elif factor < 0.5:  # Next 25% transitions from base to accent
-                t = (factor - 0.25) / 0.25
-                r_val = int(color[0] * (1-t) + accent_color[0] * t)
-                g_val = int(color[1] * (1-t) + accent_color[1] * t)
-                b_val = int(color[2] * (1-t) + accent_color[2] * t)
-            else:  # Inner 50% transitions from accent to lighter
-                t = (factor - 0.5) / 0.5
-                r_val = int(accent_color[0] * (1-t) + lighter_color[0] * t)
-                g_val = int(accent_color[1] * (1-t) + lighter_color[1] * t)
-                b_val = int(accent_color[2] * (1-t) + lighter_color[2] * t)
-            
-            current_color = (r_val, g_val, b_val, 255)
-            
-            # Draw a filled circle
-            bbox = (center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
-            small_draw.ellipse(bbox, fill=current_color)
-        
-        # Resize the small gradient to the full size
-        gradient_bg = small_gradient.resize(background_img.size, Image.BICUBIC)
+        gradient_bg = radial_gradient(width, height, color)
         
         # Use the original background's alpha channel as a mask
         if background_img.mode == 'RGBA':
-            r, g, b, a = background_img.split()
-            gradient_bg.putalpha(a)
+            gradient_bg.putalpha(background_img.getchannel('A'))
             
         return gradient_bg
     except Exception as e:
@@ -174,6 +103,21 @@ def apply_color_to_background(background_img, color):
 
 # Function to fetch gift price data - updated to use Tonnel API for premarket gifts, Portal API for others
 async def fetch_gift_data(gift_name, force_fresh=False):
+    """
+    Fetch gift data, stale-while-revalidate: a previously fetched value is returned
+    immediately (refreshed in the background once expired), and concurrent callers
+    for the same gift share one upstream request. force_fresh always waits for upstream.
+    """
+    if force_fresh:
+        gift_data = await request_coalescer.coalesce(
+            "gift_data_fresh", gift_name, lambda: _fetch_gift_data_from_api(gift_name, force_fresh=True)
+        )
+        if gift_data:
+            _gift_data_cache.set(gift_name, gift_data)
+        return gift_data
+    return await _gift_data_cache.get(gift_name, lambda: _fetch_gift_data_from_api(gift_name))
+
+async def _fetch_gift_data_from_api(gift_name, force_fresh=False):
     """Fetch gift data using appropriate API based on gift type: MRKT/Quant for plus premarket, Tonnel for premarket, Portal for regular."""
     try:
         # Check if this is a plus premarket gift first
@@ -208,14 +152,25 @@ async def fetch_gift_data(gift_name, force_fresh=False):
             else:
                 print(f"[Premarket] Using Tonnel API for {gift_name} (key: {premarket_key})")
             
-            # Use Tonnel API for premarket gifts
-            price_ton = await tonnel_api.get_tonnel_gift_price(premarket_key, force_fresh=force_fresh)
+            # Use Tonnel API for premarket gifts, unless it is known to be down
+            tonnel_breaker = circuit_breaker.get_breaker("tonnel")
+            price_ton = None
+            if tonnel_breaker.allow_request():
+                # Only errors count against the breaker; an empty answer just means no listing
+                try:
+                    price_ton = await tonnel_api.get_tonnel_gift_price(premarket_key, force_fresh=force_fresh)
+                    tonnel_breaker.record_success()
+                except Exception as e:
+                    tonnel_breaker.record_failure()
+                    print(f"[Premarket] Tonnel API error for {gift_name}: {e}")
+            else:
+                print(f"[Premarket] Tonnel circuit open, skipping Tonnel API for {gift_name}")
             if price_ton:
                 # Convert Tonnel API price to proper format
                 # Get real TON price from CoinMarketCap
                 try:
-                    from ton_price_utils import get_ton_price_usd
-                    ton_price_usd = get_ton_price_usd()
+                    from ton_price_utils import get_ton_price_usd_async
+                    ton_price_usd = await get_ton_price_usd_async()
                 except ImportError:
                     ton_price_usd = 2.10  # Fallback value
                 price_usd = price_ton * ton_price_usd
@@ -246,6 +201,19 @@ async def fetch_gift_data(gift_name, force_fresh=False):
 
 # Function to fetch chart data for a gift - updated to use Legacy API for premarket gifts, Portal API for others
 async def fetch_chart_data(gift_name, force_fresh=False):
+    """Fetch chart data with the same stale-while-revalidate and coalescing behaviour as fetch_gift_data."""
+    async def load(fresh=False):
+        # Empty results are failures and must not be cached
+        return await _fetch_chart_data_from_api(gift_name, force_fresh=fresh) or None
+
+    if force_fresh:
+        chart_data = await request_coalescer.coalesce("chart_data_fresh", gift_name, lambda: load(fresh=True))
+        if chart_data:
+            _chart_data_cache.set(gift_name, chart_data)
+        return chart_data or []
+    return await _chart_data_cache.get(gift_name, load) or []
+
+async def _fetch_chart_data_from_api(gift_name, force_fresh=False):
     """Fetch chart data using appropriate API based on gift type: MRKT/Quant for plus premarket, Legacy API for premarket, Portal API for regular."""
     try:
         # Check if this is a plus premarket gift first
@@ -283,8 +251,19 @@ async def fetch_chart_data(gift_name, force_fresh=False):
             else:
                 print(f"[Premarket] Using Legacy API for {gift_name} chart data (key: {premarket_key})")
             
-            # Use Legacy API for premarket gifts
-            chart_data = await tonnel_api.get_tonnel_chart_data(premarket_key, force_fresh=force_fresh)
+            # Use Legacy API for premarket gifts, unless Tonnel is known to be down
+            tonnel_breaker = circuit_breaker.get_breaker("tonnel")
+            chart_data = None
+            if tonnel_breaker.allow_request():
+                # Only errors count against the breaker; an empty answer just means no listing
+                try:
+                    chart_data = await tonnel_api.get_tonnel_chart_data(premarket_key, force_fresh=force_fresh)
+                    tonnel_breaker.record_success()
+                except Exception as e:
+                    tonnel_breaker.record_failure()
+                    print(f"[Premarket] Tonnel chart error for {gift_name}: {e}")
+            else:
+                print(f"[Premarket] Tonnel circuit open, skipping Tonnel chart for {gift_name}")
             if chart_data:
                 return chart_data
             else:
@@ -368,26 +347,10 @@ def calculate_percentage_change_from_points(start_point, end_point):
         return 0
 
 # Function to colorize an icon with the gift's color
-def colorize_icon(icon_path, color):
+def colorize_icon(icon_path, color, size=None):
     try:
-        # Open the icon image
-        icon = Image.open(icon_path)
-        
-        # Convert to RGBA if needed
-        if icon.mode != 'RGBA':
-            icon = icon.convert('RGBA')
-        
-        # Create a colored layer
-        colored_layer = Image.new('RGBA', icon.size, color + (0,))  # Transparent color
-        
-        # Create a mask from the icon's alpha channel
-        r, g, b, a = icon.split()
-        
-        # Create a new image with the colored layer and the original alpha
-        colored_icon = Image.new('RGBA', icon.size, (0, 0, 0, 0))
-        colored_icon.paste(color, (0, 0, icon.width, icon.height), a)
-        
-        return colored_icon
+        # Shared (icon, size, color) cache; recolors through the alpha channel
+        return get_icon(icon_path, size=size, color=color)
     except Exception as e:
         print(f"Error colorizing icon {icon_path}: {e}")
         return None
@@ -424,12 +387,12 @@ def draw_supply_badge(img, supply_count, position=(20, 20), max_width=150):
         
         # Load font for the badge (using a smaller size than the main text)
         try:
-            badge_font = ImageFont.truetype(font_path, 24)
+            badge_font = get_font(font_path, 24)
         except:
             badge_font = ImageFont.load_default()
         
         # Calculate text size
-        text_bbox = draw.textbbox((0, 0), badge_text, font=badge_font)
+        text_bbox = get_text_bbox(badge_text, badge_font)
         text_width = text_bbox[2] - text_bbox[0]
         text_height = text_bbox[3] - text_bbox[1]
         
@@ -553,7 +516,7 @@ def generate_chart_image(width, height, chart_data, color=(46, 204, 113)):
         
         # Add time labels if we have real data
         if chart_data:
-            font = ImageFont.truetype(font_path, 18)
+            font = get_font(font_path, 18)
             label_color = (120, 120, 120)
             
             # Select a few data points for labels
@@ -565,12 +528,12 @@ def generate_chart_image(width, height, chart_data, color=(46, 204, 113)):
                     x = points[idx][0]
                     
                     # Center the text on position
-                    text_width = draw.textlength(time_str, font=font)
+                    text_width = get_text_length(time_str, font)
                     draw.text((x - text_width/2, height - 20), time_str, fill=label_color, font=font)
         
         # Add price labels on the right side
         if len(prices) > 0:
-            price_font = ImageFont.truetype(font_path, 24)
+            price_font = get_font(font_path, 24)
             price_label_color = (120, 120, 120)
             
             # Define number of price labels (around 6-8 is good)
@@ -623,7 +586,7 @@ def generate_chart_image(width, height, chart_data, color=(46, 204, 113)):
                     price_label = f"{int(price_value)}"
                 
                 # Draw the label on the right side
-                text_width = draw.textlength(price_label, font=price_font)
+                text_width = get_text_length(price_label, price_font)
                 draw.text((width - text_width - 5, y_pos - 12), price_label, fill=price_label_color, font=price_font)
         
         return chart_img, price_increased, price_change
@@ -634,6 +597,97 @@ def generate_chart_image(width, height, chart_data, color=(46, 204, 113)):
         return Image.new('RGBA', (width, height), (255, 255, 255, 0)), True, 0
 
 # Function to create a gift card
+# Card layout version for cached gift base layers; bump when the base drawing changes
+GIFT_LAYER_VERSION = 1
+
+# Shadow under the white box
+SHADOW_OFFSET = 5
+SHADOW_BLUR = 10
+SHADOW_OPACITY = 40
+
+@lru_cache(maxsize=8)
+def _box_shadow(canvas_size, box_rect):
+    """Blurred white-box shadow for a canvas size and box rectangle (shared, read-only)."""
+    shadow = Image.new('RGBA', canvas_size, (0, 0, 0, 0))
+    shadow_draw = ImageDraw.Draw(shadow)
+    x0, y0, x1, y1 = box_rect
+    shadow_draw.rectangle(
+        (x0 + SHADOW_OFFSET, y0 + SHADOW_OFFSET, x1 + SHADOW_OFFSET, y1 + SHADOW_OFFSET),
+        fill=(0, 0, 0, SHADOW_OPACITY)
+    )
+    return shadow.filter(ImageFilter.GaussianBlur(SHADOW_BLUR))
+
+def draw_watermark(draw, card_width):
+    """Draw the multiline bot watermark centered at the top of a card."""
+    watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
+    watermark_font = get_font(font_path, 32)
+    watermark_color = (255, 255, 255, 200)  # Semi-transparent white
+    line_height = get_text_bbox("A", watermark_font)[3] + 5
+    watermark_y = 30  # Start position
+    
+    # Draw each line centered
+    for i, line in enumerate(watermark_lines):
+        line_width = get_text_length(line, watermark_font)
+        watermark_x = card_width // 2 - line_width // 2
+        line_y = watermark_y + (i * line_height)
+        draw.text((watermark_x, line_y), line, fill=watermark_color, font=watermark_font)
+
+def compose_gift_base(gift_name, gift_img_path, dominant_color, pregenerated_bg_path):
+    """Render the colored background, shadowed white box, gift image and gift name."""
+    background_img = get_asset(background_path, CARD_SIZE)
+    white_box_img = get_asset(white_box_path, CARD_SIZE)
+    
+    if os.path.exists(pregenerated_bg_path):
+        # Use the pre-generated background
+        colored_background = get_asset(pregenerated_bg_path, background_img.size)
+    else:
+        # Apply color to the background (fallback)
+        colored_background = apply_color_to_background(background_img, dominant_color)
+    
+    # Create a new blank canvas with the same size
+    card = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
+    
+    # Paste the colored background
+    card.paste(colored_background, (0, 0), colored_background if colored_background.mode == 'RGBA' else None)
+    
+    # Calculate center position for white box
+    box_width, box_height = white_box_img.size
+    x_center = (background_img.width - box_width) // 2
+    y_center = (background_img.height - box_height) // 2
+    
+    # Composite the (cached) blurred shadow onto the card
+    shadow = _box_shadow(background_img.size, (x_center, y_center, x_center + box_width, y_center + box_height))
+    card = Image.alpha_composite(card, shadow)
+    
+    # Paste the white box on top at the center position
+    card.paste(white_box_img, (x_center, y_center), white_box_img if white_box_img.mode == 'RGBA' else None)
+    
+    # Shared gift image fitted to the card slot, with a subtle highlight
+    gift_img = get_asset(gift_img_path, GIFT_IMAGE_SIZE, thumbnail=True)
+    gift_img = ImageEnhance.Brightness(gift_img).enhance(1.05)
+    card.paste(gift_img, (x_center + 150, y_center + 130), gift_img)
+    
+    # Draw gift name with independent positioning
+    draw = ImageDraw.Draw(card)
+    name_font = get_font(font_path, 100)
+    name_color = (60, 60, 60)
+    draw.text((x_center + 310, y_center + 150), gift_name, fill=name_color, font=name_font)
+    return card
+
+def render_gift_base_layer(gift_name, gift_img_path, dominant_color, pregenerated_bg_path):
+    """Render the static layer of a gift card: compose_gift_base plus the TON logo and watermark."""
+    card = compose_gift_base(gift_name, gift_img_path, dominant_color, pregenerated_bg_path)
+    white_box_img = get_asset(white_box_path, CARD_SIZE)
+    x_center = (card.width - white_box_img.width) // 2
+    y_center = (card.height - white_box_img.height) // 2
+    
+    # TON logo sits at a fixed position; the Star logo moves with the TON price width
+    ton_logo_colored = colorize_icon(ton_logo_path, dominant_color, size=(70, 70))
+    card.paste(ton_logo_colored, (x_center + 180, y_center + 480 - 15), ton_logo_colored)
+    
+    draw_watermark(ImageDraw.Draw(card), card.width)
+    return card
+
 async def create_gift_card(gift_name, output_path=None, force_fresh=False):
     """
     Create a gift card for the specified gift name with the new design.
@@ -682,6 +736,25 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
             fetch_chart_data(gift_name, force_fresh=force_fresh)
         )
         
+        return render_gift_card(gift_name, gift_data, chart_data, output_path)
+    
+    except Exception as e:
+        print(f"Error creating card for {gift_name}: {e}")
+        return None
+
+def render_gift_card(gift_name, gift_data, chart_data, output_path=None):
+    """
+    Render a regular gift card from already fetched gift and chart data.
+    
+    Makes no network calls, so it can run in a worker process.
+    
+    Args:
+        gift_name: The name of the gift to create a card for
+        gift_data: Price data from fetch_gift_data (None for unknown)
+        chart_data: Chart points from fetch_chart_data
+        output_path: Optional path to save the card to
+    """
+    try:
         # Check if files exist
         if not os.path.exists(background_path):
             print(f"Error: Background file not found at {background_path}")
@@ -695,14 +768,9 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
             print(f"Error: Font file not found at {font_path}")
             return None
             
-        # Load background and white box images
-        background_img = Image.open(background_path).convert("RGBA")
-        white_box_img = Image.open(white_box_path).convert("RGBA")
-        
-        # Make sure both images are the same size (1600x1000)
-        target_size = (1600, 1000)
-        background_img = background_img.resize(target_size)
-        white_box_img = white_box_img.resize(target_size)
+        # Shared background and white box, decoded once at 1600x1000 (read-only)
+        background_img = get_asset(background_path, CARD_SIZE)
+        white_box_img = get_asset(white_box_path, CARD_SIZE)
         
         # Find the gift image file
         # Handle special characters in filenames - normalize consistently
@@ -741,90 +809,28 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
         safe_name = gift_name.replace(' ', '_').replace('-', '_').replace("'", '')
         pregenerated_bg_path = os.path.join(backgrounds_dir, f"{safe_name}_background.png")
         
-        if os.path.exists(pregenerated_bg_path):
-            # Use the pre-generated background
-            colored_background = Image.open(pregenerated_bg_path).convert("RGBA")
-            if colored_background.size != background_img.size:
-                colored_background = colored_background.resize(background_img.size)
-        else:
-            # Apply color to the background (fallback)
-            colored_background = apply_color_to_background(background_img, dominant_color)
-        
-        # Create a new blank canvas with the same size
-        card = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
-        
-        # Paste the colored background
-        card.paste(colored_background, (0, 0), colored_background if colored_background.mode == 'RGBA' else None)
-        
-        # Create shadow for white box
-        shadow_offset = 5
-        shadow_blur = 10
-        shadow_opacity = 40
-        
-        # Create a shadow layer
-        shadow = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
-        shadow_draw = ImageDraw.Draw(shadow)
+        # Static base layer (background, shadowed white box, gift image, name, TON logo, watermark),
+        # built once per gift and source version; only the dynamic layer is drawn below
+        card = card_compositor.get_base_layer(
+            "gift", GIFT_LAYER_VERSION, gift_name,
+            (gift_name, tuple(dominant_color), gift_img_path, file_version(gift_img_path),
+             file_version(pregenerated_bg_path), file_version(background_path), file_version(white_box_path),
+             ton_logo_path, file_version(ton_logo_path), font_path, file_version(font_path)),
+            lambda: render_gift_base_layer(gift_name, gift_img_path, dominant_color, pregenerated_bg_path),
+        )
         
         # Calculate center position for white box
         box_width, box_height = white_box_img.size
         x_center = (background_img.width - box_width) // 2
         y_center = (background_img.height - box_height) // 2
         
-        # Create a blurred black rectangle for the shadow
-        shadow_rect = (
-            x_center + shadow_offset, 
-            y_center + shadow_offset, 
-            x_center + box_width + shadow_offset, 
-            y_center + box_height + shadow_offset
-        )
-        shadow_draw.rectangle(shadow_rect, fill=(0, 0, 0, shadow_opacity))
-        
-        # Apply blur to the shadow
-        shadow = shadow.filter(ImageFilter.GaussianBlur(shadow_blur))
-        
-        # Ensure card is RGBA before alpha_composite
-        if card.mode != 'RGBA':
-            card = card.convert('RGBA')
-        if shadow.mode != 'RGBA':
-            shadow = shadow.convert('RGBA')
-            
-        # Composite the shadow onto the card
-        card = Image.alpha_composite(card, shadow)
-        
-        # Paste the white box on top at the center position
-        card.paste(white_box_img, (x_center, y_center), white_box_img if white_box_img.mode == 'RGBA' else None)
-        
-        # Open the gift image
-        gift_img = Image.open(gift_img_path)
-        
-        # Convert to RGBA if needed
-        if gift_img.mode != 'RGBA':
-            gift_img = gift_img.convert('RGBA')
-            
-        # Resize gift image to match reference (slightly larger)
-        gift_img.thumbnail((150, 150))  # Increased size for better visibility
-        
-        # Position for the gift image - adjusting to be properly inside the white box
-        gift_x = x_center + 150  # Moved 5px to the right
-        gift_y = y_center + 130  # Better centered in the white box
-        
-        # Apply a subtle highlight effect to the gift image
-        enhancer = ImageEnhance.Brightness(gift_img)
-        gift_img = enhancer.enhance(1.05)  # Subtle brightness boost
-        
-        # Paste the gift image onto the card
-        card.paste(gift_img, (gift_x, gift_y), gift_img)
+        # Position of the gift image (matches render_gift_base_layer)
+        gift_x = x_center + 150
+        gift_y = y_center + 130
         
         # Prepare for drawing text
         draw = ImageDraw.Draw(card)
         
-        # Draw gift name with independent positioning
-        name_font = ImageFont.truetype(font_path, 100)
-        name_color = (60, 60, 60)
-        name_x = x_center + 310
-        name_y = y_center + 150
-        draw.text((name_x, name_y), gift_name, fill=name_color, font=name_font)
-        
         # Get price from API data or handle unavailable prices
         current_price_usd = 0
         current_price_ton = 0
@@ -872,16 +878,16 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
             change_color = (231, 76, 60)  # Vibrant red
         
         # Draw percentage change at fixed position independent of gift image
-        pct_font = ImageFont.truetype(font_path, 70)
+        pct_font = get_font(font_path, 70)
         pct_text = f"{change_sign}{int(change_pct)}%"
-        pct_width = draw.textlength(pct_text, font=pct_font)
+        pct_width = get_text_length(pct_text, pct_font)
         # Fixed position at top right of white box
         pct_x = x_center + box_width - pct_width - 140
         pct_y = y_center + 155  # Moved down by 5px from 150
         draw.text((pct_x, pct_y), pct_text, fill=change_color, font=pct_font)
         
         # Draw dollar sign and USD price at exact position from reference
-        price_font = ImageFont.truetype(font_path, 140)
+        price_font = get_font(font_path, 140)
         dollar_color = dominant_color  # Use the gift's dominant color for the dollar sign
         price_color = (20, 20, 20)
         
@@ -895,64 +901,32 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
             draw.text((dollar_x + 100, dollar_y), f"{current_price_usd:,.0f}".replace(",", " "), fill=price_color, font=price_font)
         else:
             # Show "Price unavailable" message instead
-            unavailable_font = ImageFont.truetype(font_path, 80)
+            unavailable_font = get_font(font_path, 80)
             unavailable_text = "Price unavailable"
             unavailable_color = (150, 150, 150)  # Gray color
             draw.text((dollar_x, dollar_y + 30), unavailable_text, fill=unavailable_color, font=unavailable_font)
         
-        # Load and colorize TON logo
-        ton_logo = Image.open(ton_logo_path)
-        if ton_logo.mode != 'RGBA':
-            ton_logo = ton_logo.convert('RGBA')
-        
-        # Resize TON logo to match reference - making it larger
-        ton_logo.thumbnail((70, 70))  # Increased from 50x50
-        
-        # Colorize TON logo with gift's dominant color
-        ton_logo_colored = Image.new('RGBA', ton_logo.size, (0, 0, 0, 0))
-        for y in range(ton_logo.height):
-            for x in range(ton_logo.width):
-                r, g, b, a = ton_logo.getpixel((x, y))
-                if a > 0:  # If not fully transparent
-                    # Replace black with the dominant color, keeping alpha
-                    ton_logo_colored.putpixel((x, y), dominant_color + (a,))
-        
-        # Load and colorize Star logo
-        star_logo = Image.open(star_logo_path)
-        if star_logo.mode != 'RGBA':
-            star_logo = star_logo.convert('RGBA')
-        
-        # Resize Star logo to match reference - making it larger
-        star_logo.thumbnail((70, 70))  # Increased from 50x50
-        
-        # Colorize Star logo with gift's dominant color
-        star_logo_colored = Image.new('RGBA', star_logo.size, (0, 0, 0, 0))
-        for y in range(star_logo.height):
-            for x in range(star_logo.width):
-                r, g, b, a = star_logo.getpixel((x, y))
-                if a > 0:  # If not fully transparent
-                    # Replace black with the dominant color, keeping alpha
-                    star_logo_colored.putpixel((x, y), dominant_color + (a,))
+        # TON and Star logos colorized with the gift's dominant color (cached per size and color)
+        ton_logo_colored = colorize_icon(ton_logo_path, dominant_color, size=(70, 70))
+        star_logo_colored = colorize_icon(star_logo_path, dominant_color, size=(70, 70))
         
         # Position and draw TON, Star logos and prices at exact positions from reference
         ton_y = y_center + 480  # Moved up by 5px from 500
         
         # Increase font size for currency values
-        ton_price_font = ImageFont.truetype(font_path, 50)  # Increased from 60
+        ton_price_font = get_font(font_path, 50)  # Increased from 60
         
         # TON logo and price - vertically center the value with logo
         # Calculate logo center point
-        ton_logo_center_y = (ton_y - 15) + (ton_logo.height // 2)
+        ton_logo_center_y = (ton_y - 15) + (ton_logo_colored.height // 2)
         # Move text up more to properly center with logo
         text_center_offset = ton_price_font.size // 2  # Increased offset to move text up
         
         # Position text to align with the center of the logo
         ton_text_y = ton_logo_center_y - text_center_offset
         
-        card.paste(ton_logo_colored, (dollar_x, ton_y - 15), ton_logo_colored)
-        
         # Get the width of the TON value text for centering
-        ton_text_width = draw.textlength(f"{current_price_ton:.1f}".replace(".", ",").replace(",0", ""), font=ton_price_font)
+        ton_text_width = get_text_length(f"{current_price_ton:.1f}".replace(".", ",").replace(",0", ""), ton_price_font)
         
         # Position TON value closer to the logo and vertically centered (only if price available)
         if not price_unavailable:
@@ -989,11 +963,11 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
         
         # Add timestamp under the chart
         current_time = datetime.datetime.now().strftime("%d %b %Y • %H:%M UTC")
-        timestamp_font = ImageFont.truetype(font_path, 24)
+        timestamp_font = get_font(font_path, 24)
         timestamp_color = (120, 120, 120)
         
         # Calculate text width for centering
-        timestamp_width = draw.textlength(current_time, font=timestamp_font)
+        timestamp_width = get_text_length(current_time, timestamp_font)
         timestamp_x = chart_x + (chart_width - timestamp_width) // 2
         timestamp_y = chart_y + chart_height + 15  # Position below the chart
         
@@ -1026,13 +1000,8 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
                 
                 # If gift image exists, add badge to it
                 if os.path.exists(gift_image_path):
-                    # Load gift image
-                    gift_img = Image.open(gift_image_path).convert("RGBA")
-                    
-                    # Calculate gift image size
-                    gift_size = 150  # Based on the thumbnail size
-                    if gift_img.width > gift_size or gift_img.height > gift_size:
-                        gift_img.thumbnail((gift_size, gift_size))
+                    # Same shared, already fitted image as the card itself
+                    gift_img = get_asset(gift_image_path, GIFT_IMAGE_SIZE, thumbnail=True)
                     
                     # Create badge with supply count
                     gift_img_with_badge = draw_supply_badge(gift_img, supply_count, 
@@ -1047,25 +1016,11 @@ async def create_gift_card(gift_name, output_path=None, force_fresh=False):
             except Exception as e:
                 print(f"Error adding supply badge: {e}")
         
-        # Add watermark at top center (multiline)
-        watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(font_path, 32)
-        watermark_color = (255, 255, 255, 200)  # Semi-transparent white
-        line_height = watermark_font.getbbox("A")[3] + 5
-        watermark_y = 30  # Start position
-        
-        # Draw each line centered
-        for i, line in enumerate(watermark_lines):
-            line_width = draw.textlength(line, font=watermark_font)
-            watermark_x = card.width // 2 - line_width // 2
-            line_y = watermark_y + (i * line_height)
-            draw.text((watermark_x, line_y), line, fill=watermark_color, font=watermark_font)
-        
         # Save the card if output path is provided
         if output_path:
             # Create directory if it doesn't exist
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            card.save(output_path)
+            save_card(card, output_path)
             
         return card
     
@@ -1154,14 +1109,9 @@ def generate_template_card(gift_name):
             print(f"Template already exists for {gift_name}")
             return template_path
             
-        # Load background and white box images
-        background_img = Image.open(background_path).convert("RGBA")
-        white_box_img = Image.open(white_box_path).convert("RGBA")
-        
-        # Make sure both images are the same size (1600x1000)
-        target_size = (1600, 1000)
-        background_img = background_img.resize(target_size)
-        white_box_img = white_box_img.resize(target_size)
+        # Shared background and white box, decoded once at 1600x1000 (read-only)
+        background_img = get_asset(background_path, CARD_SIZE)
+        white_box_img = get_asset(white_box_path, CARD_SIZE)
         
         # Find the gift image file
         gift_img_path = os.path.join(input_dir, f"{normalized_name}.png")
@@ -1183,115 +1133,20 @@ def generate_template_card(gift_name):
         # Check if we have a pre-generated background
         pregenerated_bg_path = os.path.join(backgrounds_dir, f"{normalized_name}_background.png")
         
-        if os.path.exists(pregenerated_bg_path):
-            # Use the pre-generated background
-            colored_background = Image.open(pregenerated_bg_path).convert("RGBA")
-            if colored_background.size != background_img.size:
-                colored_background = colored_background.resize(background_img.size)
-        else:
-            # Apply color to the background (fallback)
-            colored_background = apply_color_to_background(background_img, dominant_color)
-        
-        # Create a new blank canvas with the same size
-        template = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
-        
-        # Paste the colored background
-        template.paste(colored_background, (0, 0), colored_background if colored_background.mode == 'RGBA' else None)
-        
-        # Create shadow for white box
-        shadow_offset = 5
-        shadow_blur = 10
-        shadow_opacity = 40
-        
-        # Create a shadow layer
-        shadow = Image.new('RGBA', background_img.size, (0, 0, 0, 0))
-        shadow_draw = ImageDraw.Draw(shadow)
+        # Background, shadowed white box, gift image and name (shared with create_gift_card)
+        template = compose_gift_base(gift_name, gift_img_path, dominant_color, pregenerated_bg_path)
         
         # Calculate center position for white box
         box_width, box_height = white_box_img.size
         x_center = (background_img.width - box_width) // 2
         y_center = (background_img.height - box_height) // 2
         
-        # Create a blurred black rectangle for the shadow
-        shadow_rect = (
-            x_center + shadow_offset, 
-            y_center + shadow_offset, 
-            x_center + box_width + shadow_offset, 
-            y_center + box_height + shadow_offset
-        )
-        shadow_draw.rectangle(shadow_rect, fill=(0, 0, 0, shadow_opacity))
-        
-        # Apply blur to the shadow
-        shadow = shadow.filter(ImageFilter.GaussianBlur(shadow_blur))
-        
-        # Composite the shadow onto the template
-        template = Image.alpha_composite(template, shadow)
-        
-        # Paste the white box on top at the center position
-        template.paste(white_box_img, (x_center, y_center), white_box_img if white_box_img.mode == 'RGBA' else None)
-        
-        # Open the gift image
-        gift_img = Image.open(gift_img_path)
-        
-        # Convert to RGBA if needed
-        if gift_img.mode != 'RGBA':
-            gift_img = gift_img.convert('RGBA')
-            
-        # Resize gift image to match reference
-        gift_img.thumbnail((150, 150))
-        
-        # Position for the gift image
-        gift_x = x_center + 150
-        gift_y = y_center + 130
-        
-        # Apply a subtle highlight effect to the gift image
-        enhancer = ImageEnhance.Brightness(gift_img)
-        gift_img = enhancer.enhance(1.05)
-        
-        # Paste the gift image onto the template
-        template.paste(gift_img, (gift_x, gift_y), gift_img)
-        
         # Prepare for drawing text
         draw = ImageDraw.Draw(template)
         
-        # Draw gift name with independent positioning
-        name_font = ImageFont.truetype(font_path, 100)
-        name_color = (60, 60, 60)
-        name_x = x_center + 310
-        name_y = y_center + 150
-        draw.text((name_x, name_y), gift_name, fill=name_color, font=name_font)
-        
-        # Load and colorize TON logo
-        ton_logo = Image.open(ton_logo_path)
-        if ton_logo.mode != 'RGBA':
-            ton_logo = ton_logo.convert('RGBA')
-        
-        # Resize TON logo
-        ton_logo.thumbnail((70, 70))
-        
-        # Colorize TON logo with gift's dominant color
-        ton_logo_colored = Image.new('RGBA', ton_logo.size, (0, 0, 0, 0))
-        for y in range(ton_logo.height):
-            for x in range(ton_logo.width):
-                r, g, b, a = ton_logo.getpixel((x, y))
-                if a > 0:
-                    ton_logo_colored.putpixel((x, y), dominant_color + (a,))
-        
-        # Load and colorize Star logo
-        star_logo = Image.open(star_logo_path)
-        if star_logo.mode != 'RGBA':
-            star_logo = star_logo.convert('RGBA')
-        
-        # Resize Star logo
-        star_logo.thumbnail((70, 70))
-        
-        # Colorize Star logo with gift's dominant color
-        star_logo_colored = Image.new('RGBA', star_logo.size, (0, 0, 0, 0))
-        for y in range(star_logo.height):
-            for x in range(star_logo.width):
-                r, g, b, a = star_logo.getpixel((x, y))
-                if a > 0:
-                    star_logo_colored.putpixel((x, y), dominant_color + (a,))
+        # TON and Star logos colorized with the gift's dominant color (cached per size and color)
+        ton_logo_colored = colorize_icon(ton_logo_path, dominant_color, size=(70, 70))
+        star_logo_colored = colorize_icon(star_logo_path, dominant_color, size=(70, 70))
         
         # Position for TON logo
         ton_y = y_center + 480
@@ -1301,11 +1156,11 @@ def generate_template_card(gift_name):
         template.paste(ton_logo_colored, (dollar_x, ton_y - 15), ton_logo_colored)
         
         # Position for Star logo
-        dot_y = (ton_y - 15) + (ton_logo.height // 2)
+        dot_y = (ton_y - 15) + (ton_logo_colored.height // 2)
         ton_text_x = dollar_x + 80
-        ton_price_font = ImageFont.truetype(font_path, 50)
+        ton_price_font = get_font(font_path, 50)
         dummy_ton_text = "999.9"  # Placeholder for width calculation
-        ton_text_width = draw.textlength(dummy_ton_text, font=ton_price_font)
+        ton_text_width = get_text_length(dummy_ton_text, ton_price_font)
         dot_x = int(ton_text_x + ton_text_width + 30)
         star_x = int(dot_x + 20)
         
@@ -1313,18 +1168,7 @@ def generate_template_card(gift_name):
         template.paste(star_logo_colored, (star_x, ton_y - 15), star_logo_colored)
         
         # Add watermark at top center (multiline)
-        watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(font_path, 32)
-        watermark_color = (255, 255, 255, 200)  # Semi-transparent white
-        line_height = watermark_font.getbbox("A")[3] + 5
-        watermark_y = 30  # Start position
-        
-        # Draw each line centered
-        for i, line in enumerate(watermark_lines):
-            line_width = draw.textlength(line, font=watermark_font)
-            watermark_x = template.width // 2 - line_width // 2
-            line_y = watermark_y + (i * line_height)
-            draw.text((watermark_x, line_y), line, fill=watermark_color, font=watermark_font)
+        draw_watermark(draw, template.width)
         
         # Save the template
         template.save(template_path)
@@ -1341,9 +1185,9 @@ def generate_template_card(gift_name):
             "dollar_x": dollar_x,
             "dollar_y": y_center + 280,
             "ton_logo_pos": (dollar_x, ton_y - 15),
-            "ton_text_pos": (ton_text_x, (ton_y - 15) + (ton_logo.height // 2) - ton_price_font.size // 2),
+            "ton_text_pos": (ton_text_x, (ton_y - 15) + (ton_logo_colored.height // 2) - ton_price_font.size // 2),
             "star_logo_pos": (star_x, ton_y - 15),
-            "star_text_pos": (star_x + 80, (ton_y - 15) + (ton_logo.height // 2) - ton_price_font.size // 2),
+            "star_text_pos": (star_x + 80, (ton_y - 15) + (ton_logo_colored.height // 2) - ton_price_font.size // 2),
             "chart_pos": (x_center + 150, y_center + 590),
             "chart_size": (1300, 240)
         }
@@ -1459,26 +1303,26 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
         draw = ImageDraw.Draw(card)
         
         # Draw percentage change
-        pct_font = ImageFont.truetype(font_path, 70)
+        pct_font = get_font(font_path, 70)
         pct_text = f"{change_sign}{int(change_pct)}%"
-        pct_width = draw.textlength(pct_text, font=pct_font)
+        pct_width = get_text_length(pct_text, pct_font)
         pct_x = x_center + box_width - pct_width - 140
         pct_y = y_center + 155
         draw.text((pct_x, pct_y), pct_text, fill=change_color, font=pct_font)
         
         # Draw dollar sign and USD price
-        price_font = ImageFont.truetype(font_path, 140)
+        price_font = get_font(font_path, 140)
         if not price_unavailable:
             draw.text((dollar_x, dollar_y), "$", fill=dominant_color, font=price_font)
             draw.text((dollar_x + 100, dollar_y), f"{current_price_usd:,.0f}".replace(",", " "), fill=(20, 20, 20), font=price_font)
             
             # Draw TON and Stars prices
-            ton_price_font = ImageFont.truetype(font_path, 50)
+            ton_price_font = get_font(font_path, 50)
             draw.text(metadata["ton_text_pos"], f"{current_price_ton:.1f}".replace(".", ",").replace(",0", ""), fill=(20, 20, 20), font=ton_price_font)
             
             # Draw dot separator
             dot_y = metadata["ton_logo_pos"][1] + 35  # Center of logo
-            ton_text_width = draw.textlength(f"{current_price_ton:.1f}".replace(".", ",").replace(",0", ""), font=ton_price_font)
+            ton_text_width = get_text_length(f"{current_price_ton:.1f}".replace(".", ",").replace(",0", ""), ton_price_font)
             dot_x = int(metadata["ton_text_pos"][0] + ton_text_width + 30)
             draw.ellipse((dot_x - 7, dot_y - 7, dot_x + 8, dot_y + 8), fill=(100, 100, 100))
             
@@ -1486,12 +1330,12 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
             draw.text(metadata["star_text_pos"], f"{stars_price:,}".replace(",", " "), fill=(20, 20, 20), font=ton_price_font)
         else:
             # Show "Price unavailable" message
-            unavailable_font = ImageFont.truetype(font_path, 80)
+            unavailable_font = get_font(font_path, 80)
             unavailable_text = "Price unavailable"
             unavailable_color = (150, 150, 150)  # Gray color
             
             # Center the text where the price would be
-            unavailable_width = draw.textlength(unavailable_text, font=unavailable_font)
+            unavailable_width = get_text_length(unavailable_text, unavailable_font)
             unavailable_x = dollar_x + ((metadata["star_text_pos"][0] + 200 - dollar_x) - unavailable_width) // 2
             unavailable_y = dollar_y + 30  # Slightly lower than main price
             
@@ -1507,9 +1351,9 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
         
         # Add timestamp
         current_time = datetime.datetime.now().strftime("%d %b %Y • %H:%M UTC")
-        timestamp_font = ImageFont.truetype(font_path, 24)
+        timestamp_font = get_font(font_path, 24)
         timestamp_color = (120, 120, 120)
-        timestamp_width = draw.textlength(current_time, font=timestamp_font)
+        timestamp_width = get_text_length(current_time, timestamp_font)
         timestamp_x = chart_x + (chart_width - timestamp_width) // 2
         timestamp_y = chart_y + chart_height + 15
         draw.text((timestamp_x, timestamp_y), current_time, fill=timestamp_color, font=timestamp_font)
@@ -1536,13 +1380,8 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
                 
                 # If gift image exists, add badge to it
                 if os.path.exists(gift_image_path):
-                    # Load gift image
-                    gift_img = Image.open(gift_image_path).convert("RGBA")
-                    
-                    # Calculate gift image size
-                    gift_size = 150  # Based on the thumbnail size in generate_template_card
-                    if gift_img.width > gift_size or gift_img.height > gift_size:
-                        gift_img.thumbnail((gift_size, gift_size))
+                    # Shared gift image fitted as in generate_template_card
+                    gift_img = get_asset(gift_image_path, GIFT_IMAGE_SIZE, thumbnail=True)
                     
                     # Create badge with supply count (only if available)
                     gift_img_with_badge = draw_supply_badge(gift_img, supply_count, 
@@ -1559,14 +1398,14 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
         
         # Add watermark at top center (multiline)
         watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(font_path, 32)
+        watermark_font = get_font(font_path, 32)
         watermark_color = (255, 255, 255, 200)  # Semi-transparent white
-        line_height = watermark_font.getbbox("A")[3] + 5
+        line_height = get_text_bbox("A", watermark_font)[3] + 5
         watermark_y = 30  # Start position
         
         # Draw each line centered
         for i, line in enumerate(watermark_lines):
-            line_width = draw.textlength(line, font=watermark_font)
+            line_width = get_text_length(line, watermark_font)
             watermark_x = card.width // 2 - line_width // 2
             line_y = watermark_y + (i * line_height)
             draw.text((watermark_x, line_y), line, fill=watermark_color, font=watermark_font)
@@ -1574,7 +1413,7 @@ async def add_dynamic_elements(gift_name, template_path=None, output_path=None):
         # Save the final card
         if output_path:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            card.save(output_path)
+            save_card(card, output_path)
             
         return card
         
@@ -1600,10 +1439,8 @@ def create_custom_card(image_path, output_path, name, price_usd, price_ton, chan
     """
     try:
         # Open template elements
-        background = Image.open(background_path).convert("RGBA")
-        white_box = Image.open(white_box_path).convert("RGBA")
-        ton_logo = Image.open(ton_logo_path).convert("RGBA")
-        star_logo = Image.open(star_logo_path).convert("RGBA")
+        background = get_asset(background_path)
+        white_box = get_asset(white_box_path)
         
         # Load the gift image
         if os.path.exists(image_path):
@@ -1663,10 +1500,10 @@ def create_custom_card(image_path, output_path, name, price_usd, price_ton, chan
         small_font_size = 20
         
         try:
-            price_font = ImageFont.truetype(font_path, price_font_size)
-            title_font = ImageFont.truetype(font_path, title_font_size)
-            regular_font = ImageFont.truetype(font_path, regular_font_size)
-            small_font = ImageFont.truetype(font_path, small_font_size)
+            price_font = get_font(font_path, price_font_size)
+            title_font = get_font(font_path, title_font_size)
+            regular_font = get_font(font_path, regular_font_size)
+            small_font = get_font(font_path, small_font_size)
         except Exception:
             # Fallback to default font
             price_font = ImageFont.load_default()
@@ -1692,7 +1529,7 @@ def create_custom_card(image_path, output_path, name, price_usd, price_ton, chan
         
         # Add TON logo
         ton_logo_size = (50, 50)
-        ton_logo_resized = ton_logo.resize(ton_logo_size)
+        ton_logo_resized = get_icon(ton_logo_path, size=ton_logo_size, exact=True)
         ton_logo_pos = (ton_price_x - 90, ton_price_y - 25)
         card.paste(ton_logo_resized, ton_logo_pos, ton_logo_resized)
         
@@ -1720,20 +1557,20 @@ def create_custom_card(image_path, output_path, name, price_usd, price_ton, chan
         
         # Add watermark at top center (multiline)
         watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(font_path, 32)
+        watermark_font = get_font(font_path, 32)
         watermark_color = (255, 255, 255, 200)  # Semi-transparent white
-        line_height = watermark_font.getbbox("A")[3] + 5
+        line_height = get_text_bbox("A", watermark_font)[3] + 5
         watermark_y = 30  # Start position
         
         # Draw each line centered
         for i, line in enumerate(watermark_lines):
-            line_width = draw.textlength(line, font=watermark_font)
+            line_width = get_text_length(line, watermark_font)
             watermark_x = card_width // 2 - line_width // 2
             line_y = watermark_y + (i * line_height)
             draw.text((watermark_x, line_y), line, fill=watermark_color, font=watermark_font)
         
         # Save the card
-        card.save(output_path)
+        save_card(card, output_path)
         print(f"Custom card created: {output_path}")
         return output_path
     except Exception as e:
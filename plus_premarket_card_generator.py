@@ -13,7 +13,14 @@ import io
 import re
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
-import colorsys
+from gradient_engine import radial_gradient
+from icon_cache import get_icon
+from asset_store import get_asset
+import color_index
+from font_registry import get_font, get_text_length, get_text_bbox
+import card_compositor
+from card_compositor import file_version
+from card_encoder import save_card
 from plus_premarket_gifts import (
     PLUS_PREMARKET_GIFTS, get_gift_supply, get_first_sale_price_stars, 
     STAR_TO_USD, get_gift_id, calculate_days_since_release
@@ -59,28 +66,12 @@ WHITE_BOX_WIDTH = 1400
 WHITE_BOX_HEIGHT = 800
 WHITE_BOX_RADIUS = 40
 
+# Layout version for cached plus premarket base layers; bump when the base drawing changes
+PLUS_PREMARKET_LAYER_VERSION = 1
+
 def get_dominant_color(image_path):
-    """Get the dominant color from an image"""
-    try:
-        img = Image.open(image_path)
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        img.thumbnail((100, 100))
-        pixels = list(img.getdata())
-        pixels = [p for p in pixels if p[3] > 128]
-        
-        if not pixels:
-            return (128, 128, 128)
-        
-        r_sum = sum(p[0] for p in pixels)
-        g_sum = sum(p[1] for p in pixels)
-        b_sum = sum(p[2] for p in pixels)
-        count = len(pixels)
-        return (r_sum // count, g_sum // count, b_sum // count)
-    except Exception as e:
-        logger.error(f"Error getting dominant color: {e}")
-        return (128, 128, 128)
+    """Get the dominant color from an image (via the shared color index)"""
+    return color_index.get_dominant_color(image_path, color_index.AVERAGE)
 
 def load_svg_icon(svg_filename, size=(60, 60), color=(81, 81, 81)):
     """Load SVG icon, colorize it, and convert to PIL Image"""
@@ -131,59 +122,7 @@ def create_rounded_rectangle(draw, xy, radius, fill):
 
 def create_gradient_background(width, height, color):
     """Create a radial gradient background based on the dominant color"""
-    background = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    r, g, b = color
-    
-    darker_r = max(0, int(r * 0.65))
-    darker_g = max(0, int(g * 0.65))
-    darker_b = max(0, int(b * 0.65))
-    darker_color = (darker_r, darker_g, darker_b, 255)
-    
-    lighter_r = min(255, int(r * 1.15))
-    lighter_g = min(255, int(g * 1.15))
-    lighter_b = min(255, int(b * 1.15))
-    lighter_color = (lighter_r, lighter_g, lighter_b, 255)
-    
-    h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-    h = (h + 0.05) % 1.0
-    s = min(1.0, s * 1.2)
-    accent_r, accent_g, accent_b = colorsys.hsv_to_rgb(h, s, v)
-    accent_color = (int(accent_r*255), int(accent_g*255), int(accent_b*255), 255)
-    
-    small_size = (200, 200)
-    small_gradient = Image.new('RGBA', small_size, (0, 0, 0, 0))
-    small_draw = ImageDraw.Draw(small_gradient)
-    
-    center = (small_size[0] // 2, small_size[1] // 2)
-    max_radius = int(((small_size[0] // 2) ** 2 + (small_size[1] // 2) ** 2) ** 0.5)
-    
-    num_steps = 40
-    for i in range(num_steps):
-        radius = max_radius * (1 - (i / num_steps))
-        factor = i / num_steps
-        
-        if factor < 0.25:
-            t = factor / 0.25
-            r_val = int(darker_color[0] * (1-t) + color[0] * t)
-            g_val = int(darker_color[1] * (1-t) + color[1] * t)
-            b_val = int(darker_color[2] * (1-t) + color[2] * t)
-        elif factor < 0.5:
-            t = (factor - 0.25) / 0.25
-            r_val = int(color[0] * (1-t) + accent_color[0] * t)
-            g_val = int(color[1] * (1-t) + accent_color[1] * t)
-            b_val = int(color[2] * (1-t) + accent_color[2] * t)
-        else:
-            t = (factor - 0.5) / 0.5
-            r_val = int(accent_color[0] * (1-t) + lighter_color[0] * t)
-            g_val = int(accent_color[1] * (1-t) + lighter_color[1] * t)
-            b_val = int(accent_color[2] * (1-t) + lighter_color[2] * t)
-        
-        current_color = (r_val, g_val, b_val, 255)
-        bbox = (center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
-        small_draw.ellipse(bbox, fill=current_color)
-    
-    gradient_bg = small_gradient.resize((width, height), Image.BICUBIC)
-    return gradient_bg
+    return radial_gradient(width, height, color)
 
 def find_gift_image(gift_name):
     """Find the gift image in downloaded_images directory"""
@@ -211,6 +150,85 @@ def find_gift_image(gift_name):
     
     return None
 
+def load_card_fonts():
+    """Return the (title, price, TON price, date) fonts, falling back to the default font."""
+    try:
+        return (
+            get_font(FONT_PATH, 80),  # For gift name
+            get_font(FONT_PATH, 180),  # For USD price
+            get_font(FONT_PATH, 50),  # For TON/Star prices
+            get_font(FONT_PATH, 30),  # For date
+        )
+    except Exception as e:
+        logger.error(f"Error loading font: {e}")
+        default_font = ImageFont.load_default()
+        return (default_font,) * 4
+
+def card_layout(title_font, price_font):
+    """Positions shared by the base layer and the per-card dynamic layer."""
+    white_box_x = (CARD_WIDTH - WHITE_BOX_WIDTH) // 2
+    white_box_y = (CARD_HEIGHT - WHITE_BOX_HEIGHT) // 2
+    collection_x = white_box_x + 60
+    collection_y = white_box_y + 60
+    dollar_x = collection_x + 20
+    dollar_y = collection_y + get_text_bbox("A", title_font)[3] + 50
+    return {
+        "white_box_x": white_box_x,
+        "white_box_y": white_box_y,
+        "collection_x": collection_x,
+        "collection_y": collection_y,
+        "dollar_x": dollar_x,
+        "dollar_y": dollar_y,
+        "price_x": dollar_x + get_text_bbox("$", price_font)[2] + 10,
+        "line_y": dollar_y + get_text_bbox("$", price_font)[3] + 15,
+    }
+
+def render_plus_premarket_base_layer(gift_name, dominant_color):
+    """Render the static layer of a plus premarket card: everything that doesn't depend on the price."""
+    title_font, price_font, _, _ = load_card_fonts()
+    layout = card_layout(title_font, price_font)
+    white_box_x, white_box_y = layout["white_box_x"], layout["white_box_y"]
+    collection_x = layout["collection_x"]
+    
+    # Create gradient background
+    card = create_gradient_background(CARD_WIDTH, CARD_HEIGHT, dominant_color)
+    draw = ImageDraw.Draw(card)
+    
+    # Draw white rounded rectangle
+    create_rounded_rectangle(
+        draw,
+        (white_box_x, white_box_y, white_box_x + WHITE_BOX_WIDTH, white_box_y + WHITE_BOX_HEIGHT),
+        WHITE_BOX_RADIUS,
+        (255, 255, 255, 255)
+    )
+    
+    # Draw bot watermark at top center (multiline)
+    watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
+    watermark_font = get_font(FONT_PATH, 32) if os.path.exists(FONT_PATH) else ImageFont.load_default()
+    line_height = get_text_bbox("A", watermark_font)[3] + 5
+    watermark_y = 30  # Start position
+    
+    # Draw each line centered
+    for i, line in enumerate(watermark_lines):
+        line_bbox = get_text_bbox(line, watermark_font)
+        line_width = line_bbox[2] - line_bbox[0]
+        watermark_x = (CARD_WIDTH - line_width) // 2
+        line_y = watermark_y + (i * line_height)
+        draw.text((watermark_x, line_y), line, fill=(255, 255, 255, 200), font=watermark_font)
+    
+    # Draw gift name
+    draw.text((collection_x, layout["collection_y"]), gift_name, fill=(20, 20, 20), font=title_font)
+    
+    # Draw dollar sign
+    dollar_color = (*dominant_color[:3], 150)
+    draw.text((layout["dollar_x"], layout["dollar_y"]), "$", fill=dollar_color, font=price_font)
+    
+    # Draw horizontal line
+    line_y = layout["line_y"]
+    line_width = (white_box_x + WHITE_BOX_WIDTH - 60 - collection_x) // 2
+    draw.line([(collection_x, line_y), (collection_x + line_width, line_y)], fill=(200, 200, 200), width=3)
+    return card
+
 def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
     """Generate a price card for a plus premarket gift using sticker card design"""
     try:
@@ -261,85 +279,36 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
             logger.warning(f"Gift image not found for {gift_name}, using default color")
             dominant_color = (148, 68, 143)  # Default purple
         
-        # Create gradient background
-        card = create_gradient_background(CARD_WIDTH, CARD_HEIGHT, dominant_color)
-        draw = ImageDraw.Draw(card)
-        
-        # Calculate center position for white box
-        white_box_x = (CARD_WIDTH - WHITE_BOX_WIDTH) // 2
-        white_box_y = (CARD_HEIGHT - WHITE_BOX_HEIGHT) // 2
-        
-        # Draw white rounded rectangle
-        create_rounded_rectangle(
-            draw,
-            (white_box_x, white_box_y, white_box_x + WHITE_BOX_WIDTH, white_box_y + WHITE_BOX_HEIGHT),
-            WHITE_BOX_RADIUS,
-            (255, 255, 255, 255)
+        # Static base layer (gradient, white box, watermark, name, "$" and divider), built once
+        # per gift and color; only prices, supply info and the date are drawn per card
+        card = card_compositor.get_base_layer(
+            "plus_premarket", PLUS_PREMARKET_LAYER_VERSION, gift_name,
+            (gift_name, tuple(dominant_color), FONT_PATH, file_version(FONT_PATH)),
+            lambda: render_plus_premarket_base_layer(gift_name, dominant_color),
         )
+        draw = ImageDraw.Draw(card)
         
-        # Load fonts
-        try:
-            title_font = ImageFont.truetype(FONT_PATH, 80)  # For gift name
-            price_font = ImageFont.truetype(FONT_PATH, 180)  # For USD price
-            ton_price_font = ImageFont.truetype(FONT_PATH, 50)  # For TON/Star prices
-            date_font = ImageFont.truetype(FONT_PATH, 30)  # For date
-            watermark_font = ImageFont.truetype(FONT_PATH, 40)  # For watermark
-        except Exception as e:
-            logger.error(f"Error loading font: {e}")
-            title_font = ImageFont.load_default()
-            price_font = ImageFont.load_default()
-            ton_price_font = ImageFont.load_default()
-            date_font = ImageFont.load_default()
-            watermark_font = ImageFont.load_default()
-        
-        # Draw bot watermark at top center (multiline)
-        watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(FONT_PATH, 32) if os.path.exists(FONT_PATH) else ImageFont.load_default()
-        line_height = watermark_font.getbbox("A")[3] + 5
-        watermark_y = 30  # Start position
-        
-        # Draw each line centered
-        for i, line in enumerate(watermark_lines):
-            line_bbox = draw.textbbox((0, 0), line, font=watermark_font)
-            line_width = line_bbox[2] - line_bbox[0]
-            watermark_x = (CARD_WIDTH - line_width) // 2
-            line_y = watermark_y + (i * line_height)
-            draw.text((watermark_x, line_y), line, fill=(255, 255, 255, 200), font=watermark_font)
-        
-        # Draw gift name
-        collection_x = white_box_x + 60
-        collection_y = white_box_y + 60
-        draw.text((collection_x, collection_y), gift_name, fill=(20, 20, 20), font=title_font)
-        
-        # Draw dollar sign and USD price
-        dollar_color = (*dominant_color[:3], 150)
-        dollar_x = collection_x + 20
-        dollar_y = collection_y + title_font.getbbox("A")[3] + 50
-        draw.text((dollar_x, dollar_y), "$", fill=dollar_color, font=price_font)
+        title_font, price_font, ton_price_font, date_font = load_card_fonts()
+        layout = card_layout(title_font, price_font)
+        white_box_x, white_box_y = layout["white_box_x"], layout["white_box_y"]
+        collection_x = layout["collection_x"]
+        dollar_y, line_y = layout["dollar_y"], layout["line_y"]
         
+        # Draw USD price
         price_text = f"{price_usd:,.0f}".replace(",", " ")
-        price_x = dollar_x + price_font.getbbox("$")[2] + 10
+        price_x = layout["price_x"]
         draw.text((price_x, dollar_y), price_text, fill=(20, 20, 20), font=price_font)
         
-        # Draw horizontal line
-        line_y = dollar_y + price_font.getbbox("$")[3] + 15
-        line_width = (white_box_x + WHITE_BOX_WIDTH - 60 - collection_x) // 2
-        draw.line([(collection_x, line_y), (collection_x + line_width, line_y)], fill=(200, 200, 200), width=3)
-        
         # Draw TON price with TON logo
         ton_text = f"{price_ton:.1f}".replace(".", ",").replace(",0", "")
-        usd_price_width = draw.textlength(price_text, font=price_font)
+        usd_price_width = get_text_length(price_text, price_font)
         ton_x = price_x + usd_price_width + 30
-        ton_y = dollar_y + price_font.getbbox("$")[3] - ton_price_font.getbbox("A")[3] - 10
+        ton_y = dollar_y + get_text_bbox("$", price_font)[3] - get_text_bbox("A", ton_price_font)[3] - 10
         
         # Add TON logo
         try:
-            ton_logo = Image.open(TON_LOGO_PATH).convert("RGBA")
-            ton_logo = ton_logo.resize((60, 60))
-            r, g, b, alpha = ton_logo.split()
-            colored_ton_logo = Image.new('RGBA', ton_logo.size, (*dominant_color, 255))
-            colored_ton_logo.putalpha(alpha)
-            text_height = ton_price_font.getbbox("0")[3]
+            colored_ton_logo = get_icon(TON_LOGO_PATH, size=(60, 60), color=dominant_color, exact=True)
+            text_height = get_text_bbox("0", ton_price_font)[3]
             icon_y_offset = (80 - text_height) // 2
             card.paste(colored_ton_logo, (int(ton_x), int(ton_y - icon_y_offset)), colored_ton_logo)
             ton_x += 70
@@ -355,7 +324,7 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
             
             # Calculate proper vertical alignment for icons
             # Get the actual text height for proper centering
-            text_bbox = ton_price_font.getbbox("0")
+            text_bbox = get_text_bbox("0", ton_price_font)
             text_height = text_bbox[3] - text_bbox[1]
             text_top_offset = abs(text_bbox[1])  # Distance from baseline to top
             
@@ -375,22 +344,18 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
             # Display supply
             supply_text = f"{supply:,}".replace(",", " ")
             draw.text((current_x, info_y), supply_text, fill=(81, 81, 81), font=ton_price_font)
-            current_x += draw.textlength(supply_text, font=ton_price_font) + 10
+            current_x += get_text_length(supply_text, ton_price_font) + 10
             
             # Add first sale price in stars if available
             if first_sale_price_stars:
                 separator_text = "|"
                 draw.text((current_x, info_y), separator_text, fill=(150, 150, 150), font=ton_price_font)
-                current_x += draw.textlength(separator_text, font=ton_price_font) + 10
+                current_x += get_text_length(separator_text, ton_price_font) + 10
                 
                 # Add star icon for first sale price (PNG)
                 try:
                     if os.path.exists(STAR_LOGO_PATH):
-                        first_star_logo = Image.open(STAR_LOGO_PATH).convert("RGBA")
-                        first_star_logo = first_star_logo.resize((icon_size, icon_size))
-                        r, g, b, alpha = first_star_logo.split()
-                        colored_first_star = Image.new('RGBA', first_star_logo.size, (*dominant_color, 255))
-                        colored_first_star.putalpha(alpha)
+                        colored_first_star = get_icon(STAR_LOGO_PATH, size=(icon_size, icon_size), color=dominant_color, exact=True)
                         card.paste(colored_first_star, (int(current_x), int(info_y + icon_y_offset)), colored_first_star)
                         current_x += icon_size + 10
                 except Exception as e:
@@ -399,7 +364,7 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
                 # Display first sale price in stars
                 first_sale_text = f"{first_sale_price_stars:,}".replace(",", " ")
                 draw.text((current_x, info_y), first_sale_text, fill=(81, 81, 81), font=ton_price_font)
-                current_x += draw.textlength(first_sale_text, font=ton_price_font) + 10
+                current_x += get_text_length(first_sale_text, ton_price_font) + 10
                 
                 # Add days since release with time icon
                 days_since_release = calculate_days_since_release(gift_name)
@@ -407,7 +372,7 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
                     # Add separator
                     separator_text = "|"
                     draw.text((current_x, info_y), separator_text, fill=(150, 150, 150), font=ton_price_font)
-                    current_x += draw.textlength(separator_text, font=ton_price_font) + 10
+                    current_x += get_text_length(separator_text, ton_price_font) + 10
                     
                     # Add time icon (SVG)
                     try:
@@ -427,7 +392,7 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
         # Add gift image on the right side
         if gift_image_path:
             try:
-                gift_img = Image.open(gift_image_path).convert("RGBA")
+                gift_img = get_asset(gift_image_path)
                 max_width = 560
                 max_height = 490
                 width, height = gift_img.size
@@ -439,7 +404,7 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
                 
                 new_width = int(width * ratio)
                 new_height = int(height * ratio)
-                gift_img = gift_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                gift_img = get_asset(gift_image_path, (new_width, new_height), resample=Image.Resampling.LANCZOS)
                 
                 gift_x = white_box_x + WHITE_BOX_WIDTH - gift_img.width - 20
                 gift_y = white_box_y + (WHITE_BOX_HEIGHT - gift_img.height) // 2
@@ -451,14 +416,14 @@ def generate_plus_premarket_card(gift_name, gift_data, output_path=None):
         
         # Add generation date at bottom
         current_date = datetime.datetime.now().strftime("%d %b %Y • %H:%M UTC")
-        date_text_width = draw.textlength(current_date, font=date_font)
+        date_text_width = get_text_length(current_date, date_font)
         date_x = CARD_WIDTH // 2 - date_text_width // 2
         date_y = white_box_y + WHITE_BOX_HEIGHT - 50
         draw.text((date_x, date_y), current_date, fill=(100, 100, 100), font=date_font)
         
         # Save the card
         final_output_path = os.path.join(output_dir, output_filename)
-        card.save(final_output_path)
+        save_card(card, final_output_path)
         
         logger.info(f"Generated plus premarket card: {final_output_path}")
         return card
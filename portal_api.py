@@ -13,7 +13,11 @@ import json
 import time
 import asyncio
 import logging
-import requests
+import http_client
+import credential_manager
+import request_coalescer
+import upstream_limiter
+import circuit_breaker
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
@@ -41,14 +45,16 @@ API_HASH = "7ab906fc6d065a2047a84411c1697593"
 
 # Portal API token management
 PORTAL_TOKEN_FILE = os.path.join(script_dir, "portal_auth_token.txt")
-_portal_auth_token = None
-_token_last_refreshed = 0
 TOKEN_REFRESH_INTERVAL = 1920  # 32 minutes in seconds
+TOKEN_REFRESH_MARGIN = 5 * 60  # Refresh in the background 5 minutes before expiry
 
-# Rate limiting management
-_last_request_time = 0
-MIN_REQUEST_INTERVAL = 0.5  # 500ms between requests
-_rate_limit_until = 0  # Timestamp until which we should wait due to rate limiting
+# Rate limiting management (token bucket shared with other Portal callers)
+portal_limiter = upstream_limiter.get_limiter("portal")
+giftcharts_limiter = upstream_limiter.get_limiter("giftcharts")
+
+# Circuit breakers: skip straight to fallbacks while an upstream is known bad
+portal_breaker = circuit_breaker.get_breaker("portal")
+giftcharts_breaker = circuit_breaker.get_breaker("giftcharts")
 
 # Try to import Portal API library
 try:
@@ -62,23 +68,39 @@ except ImportError as e:
     logger.error(f"Portal API (aportalsmp) not available: {e}")
     logger.error("Please install with: pip install aportalsmp")
 
-# Supply data cache for legacy API
-_supply_data_cache = {}
+# Transport-level failures (Portal unreachable); aportalsmp talks to Portal through curl_cffi
+PORTAL_TRANSPORT_ERRORS = (OSError, asyncio.TimeoutError)
+try:
+    from curl_cffi import CurlError
+    PORTAL_TRANSPORT_ERRORS += (CurlError,)
+except ImportError:
+    pass
+try:
+    import httpx
+    PORTAL_TRANSPORT_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+# Bulk floor prices (older aportalsmp releases do not ship giftsFloors)
+try:
+    from aportalsmp.gifts import giftsFloors as portal_gifts_floors
+    PORTAL_FLOORS_AVAILABLE = True
+except ImportError:
+    PORTAL_FLOORS_AVAILABLE = False
+
+# Shared cache of the legacy /gifts catalogue (supply, price and fallback data)
+_legacy_catalogue_index = {}  # Normalized name -> gift dict
 _cache_timestamp = 0
-CACHE_DURATION = 10 * 60  # 10 minutes
+CACHE_DURATION = 10 * 60  # 10 minutes; older entries are served while refreshing
+CACHE_MAX_STALENESS = 60 * 60  # 1 hour; older entries block on a refresh
+_background_tasks = set()
 
-async def load_stored_token() -> Optional[str]:
-    """Load Portal API token from file if available."""
-    try:
-        if os.path.exists(PORTAL_TOKEN_FILE):
-            with open(PORTAL_TOKEN_FILE, 'r') as f:
-                token = f.read().strip()
-                if token:
-                    api_logger.info("[Portal Auth] Loaded stored authentication token")
-                    return token
-    except Exception as e:
-        api_logger.warning(f"[Portal Auth] Failed to load stored token: {e}")
-    return None
+# Bulk Portal floor price snapshot (short name -> floor price in TON)
+USE_PRICE_SNAPSHOT = True
+_price_snapshot = {}
+_price_snapshot_timestamp = 0
+PRICE_SNAPSHOT_DURATION = 5 * 60  # 5 minutes
+PRICE_SNAPSHOT_MAX_AGE = 15 * 60  # Ignore the snapshot if refreshes keep failing
 
 async def save_token(token: str) -> None:
     """Save Portal API token to file."""
@@ -91,15 +113,11 @@ async def save_token(token: str) -> None:
 
 async def get_fresh_auth_token() -> str:
     """Get a fresh authentication token from Portal API."""
-    global _portal_auth_token, _token_last_refreshed
-    
     try:
         api_logger.info("[Portal Auth] Requesting fresh authentication token...")
         token = await update_auth(api_id=API_ID, api_hash=API_HASH)
         
         if token:
-            _portal_auth_token = token
-            _token_last_refreshed = time.time()
             await save_token(token)
             api_logger.info("[Portal Auth] Successfully obtained fresh authentication token")
             return token
@@ -110,56 +128,32 @@ async def get_fresh_auth_token() -> str:
         api_logger.error(f"[Portal Auth] Failed to get fresh auth token: {e}")
         raise
 
+def register_credentials() -> None:
+    """Hand Portal auth to the background credential refresher, seeded from the token file (idempotent)."""
+    if not PORTAL_API_AVAILABLE:
+        return
+    credential_manager.register("portal", get_fresh_auth_token, ttl=TOKEN_REFRESH_INTERVAL,
+                                refresh_margin=TOKEN_REFRESH_MARGIN)
+    try:
+        if os.path.exists(PORTAL_TOKEN_FILE):
+            with open(PORTAL_TOKEN_FILE, 'r') as f:
+                token = f.read().strip()
+            if token:
+                credential_manager.seed("portal", token, os.path.getmtime(PORTAL_TOKEN_FILE))
+                api_logger.info("[Portal Auth] Loaded stored authentication token")
+    except Exception as e:
+        api_logger.warning(f"[Portal Auth] Failed to load stored token: {e}")
+
 async def get_auth_token() -> str:
-    """Get Portal API authentication token with automatic refresh."""
-    global _portal_auth_token, _token_last_refreshed
-    
-    current_time = time.time()
-    
-    # Check if we need to refresh the token
-    if (_portal_auth_token is None or 
-        current_time - _token_last_refreshed > TOKEN_REFRESH_INTERVAL):
-        # Try to load from file first
-        if _portal_auth_token is None:
-            _portal_auth_token = await load_stored_token()
-            if _portal_auth_token:
-                _token_last_refreshed = current_time - TOKEN_REFRESH_INTERVAL + 300  # Give 5 minutes grace
-        # If still no token or it's expired, get fresh one
-        if (_portal_auth_token is None or 
-            current_time - _token_last_refreshed > TOKEN_REFRESH_INTERVAL):
-            logger.info("[Portal Auth] Token expired or not found, refreshing token now...")
-            _portal_auth_token = await get_fresh_auth_token()
-    return _portal_auth_token
-
-async def handle_rate_limiting(delay_seconds: int = 2):
-    """Handle rate limiting by waiting and updating global rate limit state."""
-    global _rate_limit_until
-    
-    wait_until = time.time() + delay_seconds
-    _rate_limit_until = wait_until
-    
-    api_logger.warning(f"[Portal API] Rate limited! Waiting {delay_seconds} seconds...")
-    await asyncio.sleep(delay_seconds)
-
-async def apply_request_rate_limiting():
-    """Apply rate limiting between requests."""
-    global _last_request_time, _rate_limit_until
-    
-    current_time = time.time()
-    
-    # Check if we're still under rate limit punishment
-    if current_time < _rate_limit_until:
-        wait_time = _rate_limit_until - current_time
-        api_logger.info(f"[Portal API] Still under rate limit, waiting {wait_time:.1f} more seconds")
-        await asyncio.sleep(wait_time)
-    
-    # Apply minimum interval between requests
-    time_since_last = current_time - _last_request_time
-    if time_since_last < MIN_REQUEST_INTERVAL:
-        wait_time = MIN_REQUEST_INTERVAL - time_since_last
-        await asyncio.sleep(wait_time)
-    
-    _last_request_time = time.time()
+    """Get the current Portal API authentication token (refreshed in the background)."""
+    token = await credential_manager.get_async("portal")
+    if not token:
+        raise Exception("No Portal authentication token available")
+    return token
+
+def invalidate_auth_token() -> None:
+    """Discard a token Portal rejected so a replacement is fetched."""
+    credential_manager.invalidate("portal")
 
 def parse_portal_error(error_msg: str) -> Dict[str, Any]:
     """Parse Portal API error message to determine error type and appropriate response."""
@@ -183,53 +177,116 @@ def parse_portal_error(error_msg: str) -> Dict[str, Any]:
         }
     
     # Temporary server errors
-    if any(keyword in error_lower for keyword in ['500', '502', '503', '504', 'server error', 'timeout']):
+    if any(keyword in error_lower for keyword in ['500', '502', '503', '504', 'server error', 'timeout', 'timed out']):
         return {
             'type': 'server_error',
             'retry_after': 3,
             'should_retry': True
         }
     
-    # Permanent errors (400, 404, etc.)
+    # Request errors (400, 404, etc.); Portal answered, so it is up
+    if any(keyword in error_lower for keyword in ['400', '403', '404', 'bad request', 'forbidden', 'not found']):
+        return {
+            'type': 'client_error',
+            'retry_after': 0,
+            'should_retry': False
+        }
+    
+    # Anything else (unrecognised failures)
     return {
         'type': 'permanent_error',
         'retry_after': 0,
         'should_retry': False
     }
 
-async def get_supply_from_legacy_api(gift_name: str) -> Any:
-    """Get upgradedSupply data from legacy API for a specific gift, robust to case/whitespace mismatches."""
-    global _supply_data_cache, _cache_timestamp
+def classify_portal_exception(error: Exception) -> Dict[str, Any]:
+    """Like parse_portal_error, but treats network failures as server errors by exception type."""
+    if isinstance(error, PORTAL_TRANSPORT_ERRORS):
+        return {
+            'type': 'server_error',
+            'retry_after': 3,
+            'should_retry': True
+        }
+    return parse_portal_error(str(error))
+
+def record_portal_error(error_info: Dict[str, Any]) -> None:
+    """
+    Report a failed Portal call to the breaker.
+    
+    Outages, auth failures and unrecognised errors count against it; 429s and
+    4xx responses mean Portal is up, so they leave it untouched.
+    """
+    if error_info['type'] not in ('rate_limit', 'client_error'):
+        portal_breaker.record_failure()
+
+def _normalize_gift_name(name: str) -> str:
+    """Normalize a gift name for case/whitespace-insensitive catalogue lookups."""
+    return name.strip().lower().replace(' ', '')
+
+async def refresh_legacy_catalogue() -> bool:
+    """
+    Download the legacy /gifts catalogue once and rebuild the normalized-name index.
+    
+    Returns:
+        bool: True if the catalogue was refreshed
+    """
+    global _legacy_catalogue_index, _cache_timestamp
     
     try:
-        # Check if cache is still valid
-        current_time = time.time()
-        if current_time - _cache_timestamp > CACHE_DURATION:
-            # Refresh cache
-            logger.info("Refreshing supply data cache...")
-            response = requests.get(GIFTS_API, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                # Cache all supply data at once
-                _supply_data_cache = {}
-                for gift in data:
-                    name = gift.get("name", "")
-                    supply = gift.get("upgradedSupply", 0)
-                    if name:
-                        _supply_data_cache[name] = supply
-                _cache_timestamp = current_time
-                logger.info(f"Cached supply data for {len(_supply_data_cache)} gifts")
-            else:
-                api_logger.error(f"[Supply API] Failed to refresh cache | Status: {response.status_code}")
+        logger.info("Refreshing legacy gift catalogue cache...")
+        response = await http_client.get_cached(GIFTS_API, timeout=10, limiter=giftcharts_limiter,
+                                                breaker=giftcharts_breaker)
+        if response.status_code != 200:
+            api_logger.error(f"[Legacy API] Failed to refresh catalogue | Status: {response.status_code}")
+            return False
         
-        # Look for gift in cache with robust matching
-        norm = lambda s: s.strip().lower().replace(' ', '')
-        target = norm(gift_name)
+        index = {}
+        for gift in response.json():
+            name = gift.get("name", "")
+            if name:
+                index[_normalize_gift_name(name)] = gift
         
-        for cached_name, supply in _supply_data_cache.items():
-            if norm(cached_name) == target:
-                api_logger.info(f"[Supply API] Gift: {gift_name} | Found supply: {supply}")
-                return supply
+        _legacy_catalogue_index = index
+        _cache_timestamp = time.time()
+        logger.info(f"Cached legacy catalogue for {len(index)} gifts")
+        return True
+        
+    except Exception as e:
+        api_logger.error(f"[Legacy API] Catalogue refresh exception: {e}")
+        return False
+
+def _refresh_legacy_catalogue_in_background() -> None:
+    """Schedule a catalogue refresh without waiting for it (one at a time)."""
+    task = asyncio.get_running_loop().create_task(
+        request_coalescer.coalesce("legacy_catalogue", "gifts", refresh_legacy_catalogue)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def get_legacy_gift(gift_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a gift in the shared legacy catalogue cache.
+    
+    Fresh entries are returned directly. Stale entries are returned immediately
+    while a background refresh runs, unless they exceed CACHE_MAX_STALENESS.
+    """
+    age = time.time() - _cache_timestamp
+    
+    if not _legacy_catalogue_index or age > CACHE_MAX_STALENESS:
+        await request_coalescer.coalesce("legacy_catalogue", "gifts", refresh_legacy_catalogue)
+    elif age > CACHE_DURATION:
+        _refresh_legacy_catalogue_in_background()
+    
+    return _legacy_catalogue_index.get(_normalize_gift_name(gift_name))
+
+async def get_supply_from_legacy_api(gift_name: str) -> Any:
+    """Get upgradedSupply data from legacy API for a specific gift, robust to case/whitespace mismatches."""
+    try:
+        gift = await get_legacy_gift(gift_name)
+        if gift is not None:
+            supply = gift.get("upgradedSupply", 0)
+            api_logger.info(f"[Supply API] Gift: {gift_name} | Found supply: {supply}")
+            return supply
                 
         api_logger.warning(f"[Supply API] Gift: {gift_name} | Not found in legacy API gifts list!")
         return "N/A"
@@ -252,9 +309,13 @@ async def fetch_gift_data_with_retry(gift_name: str, max_retries: int = 3, is_pr
     """
     
     for attempt in range(max_retries + 1):
+        if not portal_breaker.allow_request():
+            api_logger.warning(f"[Portal API] Gift: {gift_name} | Circuit open, skipping Portal")
+            break
+        
         try:
             # Apply rate limiting
-            await apply_request_rate_limiting()
+            await portal_limiter.acquire()
             
             # Get auth token (refreshes automatically if needed)
             auth_token = await get_auth_token()
@@ -263,6 +324,8 @@ async def fetch_gift_data_with_retry(gift_name: str, max_retries: int = 3, is_pr
             
             # Make Portal API request (premarket parameter not supported yet)
             results = await portal_search(gift_name=gift_name, authData=auth_token, sort="price_asc", limit=5)
+            portal_limiter.record_success()
+            portal_breaker.record_success()
             
             api_logger.info(f"[Portal API] Gift: {gift_name} | Raw results type: {type(results)}")
             
@@ -302,8 +365,8 @@ async def fetch_gift_data_with_retry(gift_name: str, max_retries: int = 3, is_pr
                 
                 # Get real TON price from CoinMarketCap
                 try:
-                    from ton_price_utils import get_ton_price_usd
-                    ton_price_usd = get_ton_price_usd()
+                    from ton_price_utils import get_ton_price_usd_async
+                    ton_price_usd = await get_ton_price_usd_async()
                 except ImportError:
                     ton_price_usd = 2.10  # Fallback value
                 
@@ -327,20 +390,19 @@ async def fetch_gift_data_with_retry(gift_name: str, max_retries: int = 3, is_pr
             api_logger.error(f"[Portal API] Gift: {gift_name} | Attempt {attempt + 1} Exception: {error_msg}")
             
             # Parse error type
-            error_info = parse_portal_error(error_msg)
+            error_info = classify_portal_exception(e)
+            record_portal_error(error_info)
             
             if error_info['should_retry'] and attempt < max_retries:
                 # Handle specific error types
                 if error_info['type'] == 'rate_limit':
-                    api_logger.warning(f"[Portal API] Gift: {gift_name} | Rate limited, waiting {error_info['retry_after']} seconds")
-                    await handle_rate_limiting(error_info['retry_after'])
+                    api_logger.warning(f"[Portal API] Gift: {gift_name} | Rate limited, backing off {error_info['retry_after']} seconds")
+                    portal_limiter.penalize(error_info['retry_after'])
                 
                 elif error_info['type'] == 'auth_error':
                     api_logger.warning(f"[Portal API] Gift: {gift_name} | Auth error, refreshing token")
                     # Force token refresh
-                    global _portal_auth_token, _token_last_refreshed
-                    _portal_auth_token = None
-                    _token_last_refreshed = 0
+                    invalidate_auth_token()
                     await asyncio.sleep(error_info['retry_after'])
                 
                 elif error_info['type'] == 'server_error':
@@ -358,6 +420,97 @@ async def fetch_gift_data_with_retry(gift_name: str, max_retries: int = 3, is_pr
     api_logger.info(f"[Portal API] Gift: {gift_name} | All attempts failed, falling back to legacy API")
     return await _fetch_from_legacy_api(gift_name)
 
+def _portal_short_name(gift_name: str) -> str:
+    """Convert a gift display name to the short name Portal uses for floor keys."""
+    return gift_name.replace(" ", "").replace("'", "").replace("’", "").replace("-", "").lower()
+
+async def refresh_price_snapshot() -> bool:
+    """
+    Fetch floor prices for the whole gift catalogue in a single Portal call.
+    
+    Returns:
+        bool: True if the snapshot was refreshed
+    """
+    global _price_snapshot, _price_snapshot_timestamp
+    
+    if not (PORTAL_API_AVAILABLE and PORTAL_FLOORS_AVAILABLE):
+        return False
+    
+    if not portal_breaker.allow_request():
+        api_logger.warning("[Portal Snapshot] Circuit open, keeping previous snapshot")
+        return False
+    
+    try:
+        await portal_limiter.acquire()
+        auth_token = await get_auth_token()
+        floors = await portal_gifts_floors(authData=auth_token)
+        portal_limiter.record_success()
+        portal_breaker.record_success()
+        
+        snapshot = {}
+        for short_name, price in floors.toDict().items():
+            try:
+                snapshot[short_name] = float(price)
+            except (ValueError, TypeError):
+                continue
+        
+        if not snapshot:
+            api_logger.warning("[Portal Snapshot] Empty floor price response, keeping previous snapshot")
+            return False
+        
+        _price_snapshot = snapshot
+        _price_snapshot_timestamp = time.time()
+        api_logger.info(f"[Portal Snapshot] Refreshed floor prices for {len(snapshot)} gifts")
+        return True
+        
+    except Exception as e:
+        error_info = classify_portal_exception(e)
+        api_logger.error(f"[Portal Snapshot] Refresh failed: {e!r}")
+        record_portal_error(error_info)
+        if error_info['type'] == 'rate_limit':
+            portal_limiter.penalize(error_info['retry_after'])
+        elif error_info['type'] == 'auth_error':
+            invalidate_auth_token()
+        return False
+
+async def get_snapshot_price(gift_name: str) -> Optional[float]:
+    """Get a gift's floor price in TON from the bulk snapshot, refreshing it when stale."""
+    if time.time() - _price_snapshot_timestamp > PRICE_SNAPSHOT_DURATION:
+        # Concurrent callers share a single refresh
+        await request_coalescer.coalesce("portal_snapshot", "floors", refresh_price_snapshot)
+    
+    if time.time() - _price_snapshot_timestamp > PRICE_SNAPSHOT_MAX_AGE:
+        return None
+    
+    price = _price_snapshot.get(_portal_short_name(gift_name))
+    return price if price else None
+
+async def _fetch_from_price_snapshot(gift_name: str) -> Optional[Dict[str, Any]]:
+    """Build gift data from the bulk floor price snapshot, or None if the gift is not in it."""
+    price_val = await get_snapshot_price(gift_name)
+    if price_val is None:
+        return None
+    
+    supply_data = await get_supply_from_legacy_api(gift_name)
+    
+    try:
+        from ton_price_utils import get_ton_price_usd_async
+        ton_price_usd = await get_ton_price_usd_async()
+    except ImportError:
+        ton_price_usd = 2.10  # Fallback value
+    
+    api_logger.info(f"[Portal Snapshot] Gift: {gift_name} | Floor: {price_val} TON")
+    return {
+        "name": gift_name,
+        "priceUsd": price_val * ton_price_usd,
+        "priceTon": price_val,
+        "changePercentage": 0,  # Not available from Portal API
+        "model": "",
+        "backdrop": "",
+        "symbol": "",
+        "upgradedSupply": supply_data if isinstance(supply_data, (int, float)) else "N/A"
+    }
+
 async def fetch_gift_data(gift_name: str, is_premarket: bool = False) -> Optional[Dict[str, Any]]:
     """
     Fetch gift data using Portal API, with auth refresh and cache fallback.
@@ -373,25 +526,22 @@ async def fetch_gift_data(gift_name: str, is_premarket: bool = False) -> Optiona
         logger.warning("Portal API not available, falling back to legacy API")
         return await _fetch_from_legacy_api(gift_name)
     
+    # Serve from the bulk floor snapshot; per-gift search only for gifts missing from it
+    if USE_PRICE_SNAPSHOT:
+        snapshot_data = await _fetch_from_price_snapshot(gift_name)
+        if snapshot_data:
+            return snapshot_data
+    
     return await fetch_gift_data_with_retry(gift_name, is_premarket=is_premarket)
 
 async def _fetch_from_legacy_api(gift_name: str) -> Optional[Dict[str, Any]]:
     """Fetch gift data from legacy API as fallback."""
     try:
-        response = requests.get(GIFTS_API, timeout=10)
-        api_logger.info(f"[Legacy API] Gift: {gift_name} | Status: {response.status_code} | Response: {response.text[:500]}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            for gift in data:
-                if gift["name"] == gift_name:
-                    # Ensure upgradedSupply is properly extracted from the legacy API
-                    upgraded_supply = gift.get("upgradedSupply", 0)
-                    api_logger.info(f"[Legacy API] Gift: {gift_name} | Selected: {json.dumps(gift, default=str)}")
-                    return gift
-            api_logger.warning(f"[Legacy API] Gift: {gift_name} | Not found in response data.")
-        else:
-            api_logger.error(f"[Legacy API] Gift: {gift_name} | HTTP {response.status_code}")
+        gift = await get_legacy_gift(gift_name)
+        if gift is not None:
+            api_logger.info(f"[Legacy API] Gift: {gift_name} | Selected: {json.dumps(gift, default=str)}")
+            return gift
+        api_logger.warning(f"[Legacy API] Gift: {gift_name} | Not found in cached catalogue.")
             
     except Exception as e:
         api_logger.error(f"[Legacy API] Gift: {gift_name} | Exception: {e}")
@@ -419,7 +569,8 @@ async def fetch_chart_data(gift_name: str) -> Optional[list]:
         encoded_name = quote(gift_name)
         url = f"{CHART_API}{encoded_name}"
         
-        response = requests.get(url, timeout=10)
+        response = await http_client.get_cached(url, timeout=10, limiter=giftcharts_limiter,
+                                                breaker=giftcharts_breaker)
         api_logger.info(f"[Chart API] Gift: {gift_name} | Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -429,24 +580,27 @@ async def fetch_chart_data(gift_name: str) -> Optional[list]:
             elif len(data) > 0:
                 return data
             else:
-                return _generate_mock_chart_data(gift_name)
+                return await _generate_mock_chart_data(gift_name)
         else:
             api_logger.warning(f"[Chart API] Gift: {gift_name} | HTTP {response.status_code}, using mock data")
-            return _generate_mock_chart_data(gift_name)
+            return await _generate_mock_chart_data(gift_name)
             
+    except circuit_breaker.CircuitOpenError as e:
+        api_logger.warning(f"[Chart API] Gift: {gift_name} | {e}, using mock data")
+        return await _generate_mock_chart_data(gift_name)
     except Exception as e:
         api_logger.error(f"[Chart API] Gift: {gift_name} | Exception: {e}")
         logger.error(f"Error fetching chart data for {gift_name}: {e}")
-        return _generate_mock_chart_data(gift_name)
+        return await _generate_mock_chart_data(gift_name)
 
-def _generate_mock_gift_data(gift_name: str) -> Dict[str, Any]:
+async def _generate_mock_gift_data(gift_name: str) -> Dict[str, Any]:
     """Generate realistic mock gift data for new premarket gifts."""
     # Generate deterministic but varied pricing based on gift name
     base_price = (hash(gift_name) % 500 + 100) / 100  # 1.00 to 6.00 TON
     # Get real TON price from CoinMarketCap
     try:
-        from ton_price_utils import get_ton_price_usd
-        ton_price_usd = get_ton_price_usd()
+        from ton_price_utils import get_ton_price_usd_async
+        ton_price_usd = await get_ton_price_usd_async()
     except ImportError:
         ton_price_usd = 2.10  # Fallback value
     usd_price = base_price * ton_price_usd
@@ -479,7 +633,7 @@ def _generate_mock_gift_data(gift_name: str) -> Dict[str, Any]:
     api_logger.info(f"[Mock Data] Gift: {gift_name} | Generated mock data: {base_price:.2f} TON, {usd_price:.2f} USD")
     return mock_data
 
-def _generate_mock_chart_data(gift_name: str) -> list:
+async def _generate_mock_chart_data(gift_name: str) -> list:
     """Generate realistic mock chart data for a gift."""
     # Generate 24 data points with some variation
     base_value = hash(gift_name) % 1000 + 500  # Deterministic but varied base
@@ -487,8 +641,8 @@ def _generate_mock_chart_data(gift_name: str) -> list:
     
     # Get real TON price from CoinMarketCap (once, outside the loop for efficiency)
     try:
-        from ton_price_utils import get_ton_price_usd
-        ton_price_usd = get_ton_price_usd()
+        from ton_price_utils import get_ton_price_usd_async
+        ton_price_usd = await get_ton_price_usd_async()
     except ImportError:
         ton_price_usd = 2.10  # Fallback value
     
@@ -538,6 +692,7 @@ def initialize_portal_api():
     """Initialize Portal API module."""
     logger.info("Portal API module initialized")
     if PORTAL_API_AVAILABLE:
+        register_credentials()
         logger.info("Portal API ready for use")
     else:
         logger.warning("Portal API not available, legacy fallback only")
@@ -588,9 +743,7 @@ async def refresh_market_auth_token() -> Dict[str, Any]:
     """
     try:
         # Force refresh of Portal auth token
-        global _portal_auth_token, _token_last_refreshed
-        _portal_auth_token = None
-        _token_last_refreshed = 0
+        invalidate_auth_token()
         
         # Create new market token
         return await create_market_auth_token()
@@ -658,16 +811,14 @@ async def validate_and_refresh_portal_connection():
         
     except Exception as e:
         error_msg = str(e)
-        error_info = parse_portal_error(error_msg)
+        error_info = classify_portal_exception(e)
         
         if error_info['type'] == 'auth_error':
             api_logger.warning("[Portal Validation] Auth error detected, refreshing token...")
             try:
                 # Force token refresh
-                global _portal_auth_token, _token_last_refreshed
-                _portal_auth_token = None
-                _token_last_refreshed = 0
-                await get_fresh_auth_token()
+                invalidate_auth_token()
+                await get_auth_token()
                 api_logger.info("[Portal Validation] Token refreshed successfully")
                 return True
             except Exception as refresh_e:
@@ -681,18 +832,21 @@ async def validate_and_refresh_portal_connection():
 async def log_portal_api_status():
     """Log current Portal API status for debugging."""
     try:
-        global _portal_auth_token, _token_last_refreshed, _rate_limit_until
-        
         current_time = time.time()
-        token_age = current_time - _token_last_refreshed if _token_last_refreshed > 0 else "Never"
-        rate_limit_remaining = max(0, _rate_limit_until - current_time) if _rate_limit_until > 0 else 0
+        credential_stats = credential_manager.get_credential_stats().get("portal", {})
+        limiter_stats = portal_limiter.stats()
         
         status_info = {
             "portal_api_available": PORTAL_API_AVAILABLE,
-            "has_auth_token": _portal_auth_token is not None,
-            "token_age_seconds": token_age,
-            "rate_limit_remaining_seconds": rate_limit_remaining,
-            "supply_cache_entries": len(_supply_data_cache),
+            "has_auth_token": credential_stats.get("has_value", False),
+            "token_age_seconds": credential_stats.get("age_seconds") or "Never",
+            "token_expires_in_seconds": credential_stats.get("expires_in"),
+            "rate_limit_remaining_seconds": limiter_stats["paused_for"],
+            "rate_limiter": limiter_stats,
+            "circuit_breakers": circuit_breaker.get_breaker_stats(),
+            "legacy_catalogue_entries": len(_legacy_catalogue_index),
+            "price_snapshot_entries": len(_price_snapshot),
+            "price_snapshot_age_seconds": current_time - _price_snapshot_timestamp if _price_snapshot_timestamp > 0 else "Never",
             "cache_age_seconds": current_time - _cache_timestamp if _cache_timestamp > 0 else "Never"
         }
         
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Parallel Card Pregeneration Engine
+
+Refreshes gift, plus premarket and sticker cards in two overlapping stages:
+an async stage fetches prices and charts concurrently (through the shared
+HTTP client, rate limiters and caches), and every fetched item is handed to
+a process pool sized to the CPU count for PIL rendering and PNG encoding.
+A failing item is logged and counted without stopping the others, and
+progress is reported as cards complete.
+
+Runs are incremental: each card's render inputs (prices, change %, supply,
+chart, renderer version) are fingerprinted and a card is only re-rendered
+when its fingerprint differs from the one stored after its last render.
+Cards without a Telegram file_id are then pre-uploaded to the storage
+chat (see card_uploader), so user-facing sends never pay for the upload.
+The generation time printed on a card is deliberately not part of the
+fingerprint, so unchanged cards keep the time of their last real change.
+
+Usage:
+    python pregeneration_engine.py [--workers N] [--skip-gifts] [--skip-stickers] [--full] [--no-upload]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from card_compositor import file_version
+from card_encoder import get_encoder_stats, merge_encoder_stats
+
+logger = logging.getLogger("pregeneration_engine")
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+GIFT_CARDS_DIR = os.path.join(script_dir, "new_gift_cards")
+STICKER_CARDS_DIR = os.path.join(script_dir, "Sticker_Price_Cards")
+STICKER_PRICE_FILE = os.path.join(script_dir, "sticker_price_results.json")
+TIMESTAMP_FILE = os.path.join(script_dir, "last_generation_time.txt")
+FINGERPRINT_FILE = os.path.join(script_dir, "card_fingerprints.json")
+
+# Bump to force every card to be re-rendered once
+FINGERPRINT_VERSION = 1
+
+# Renderer source per card kind; editing it invalidates that kind's fingerprints
+RENDERER_MODULES = {
+    "gift": os.path.join(script_dir, "new_card_design.py"),
+    "plus_premarket": os.path.join(script_dir, "plus_premarket_card_generator.py"),
+    "sticker": os.path.join(script_dir, "sticker_price_card_generator.py"),
+}
+
+# Fetch-time bookkeeping fields that are not drawn on the card
+VOLATILE_KEYS = frozenset({"timestamp", "last_updated", "updated_at", "fetched_at"})
+
+# Upstream fetches in flight at once (the per-host token buckets still apply)
+FETCH_CONCURRENCY = 16
+
+# Log progress every N completed cards
+PROGRESS_EVERY = 10
+
+def card_filename(gift_name: str) -> str:
+    """Normalized card file stem, matching telegram_bot.normalize_gift_filename."""
+    if gift_name == "Jack-in-the-Box":
+        return "Jack_in_the_Box"
+    elif gift_name == "Durov's Cap":
+        return "Durovs_Cap"
+    elif gift_name == "Swag Bag":
+        return "SwagBag"
+    elif gift_name == "West Sign":
+        return "WestsideSign"
+    elif gift_name == "B-Day Candle":
+        return "B_Day_Candle"
+    else:
+        return gift_name.replace(" ", "_").replace("-", "_").replace("'", "")
+
+class Progress:
+    """Counts finished cards and logs throughput as they complete."""
+
+    def __init__(self, total: int, report_every: int = PROGRESS_EVERY):
+        self.total = total
+        self.report_every = report_every
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.encoding: Dict[str, Dict[str, Any]] = {}
+        self.failures: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+
+    def record(self, result: Dict[str, Any]) -> None:
+        self.done += 1
+        merge_encoder_stats(self.encoding, result.get("encoding", {}))
+        if result.get("skipped"):
+            self.skipped += 1
+        elif not result["ok"]:
+            self.failed += 1
+            self.failures.append(result)
+            logger.warning(f"[Pregeneration] {result['kind']} {result['name']} failed: {result['error']}")
+        if self.done % self.report_every == 0 or self.done == self.total:
+            elapsed = time.time() - self.started_at
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            logger.info(f"[Pregeneration] {self.done}/{self.total} cards done, {self.failed} failed, "
+                        f"{self.skipped} unchanged ({rate:.1f} cards/s)")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "succeeded": self.done - self.failed,
+            "rendered": self.done - self.failed - self.skipped,
+            "skipped": self.skipped,
+            "encoding": self.encoding,
+            "failed": self.failed,
+            "elapsed": time.time() - self.started_at,
+            "failures": [f"{r['kind']} {r['name']}: {r['error']}" for r in self.failures],
+        }
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+def card_fingerprint(job: Dict[str, Any]) -> str:
+    """Hash of everything drawn on a card except the generation time."""
+    kind = job["kind"]
+    if kind == "sticker":
+        # The USD figure is drawn rounded to whole dollars, so TON rate jitter below that doesn't count
+        inputs = {
+            "price": job["price"],
+            "price_usd": round(job["price"] * (job["ton_price_usd"] or 0)),
+            "price_info": _strip_volatile(job["price_info"]),
+        }
+    else:
+        inputs = {"gift_data": _strip_volatile(job["gift_data"])}
+        if kind == "gift":
+            inputs["chart"] = _strip_volatile(job["chart_data"])
+
+    inputs["template"] = (FINGERPRINT_VERSION, file_version(RENDERER_MODULES.get(kind)))
+    inputs["output_path"] = job["output_path"]
+    raw = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def load_fingerprints(path: str = FINGERPRINT_FILE) -> Dict[str, str]:
+    """Fingerprints of the last successful render per card; empty if missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"[Pregeneration] Ignoring unreadable fingerprint file {path}: {e}")
+        return {}
+
+def save_fingerprints(fingerprints: Dict[str, str], path: str = FINGERPRINT_FILE) -> None:
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(fingerprints, f, sort_keys=True)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"[Pregeneration] Failed to save fingerprints: {e}")
+
+def render_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Render one card in a worker process from already fetched data.
+
+    Never raises: errors are returned in the result so one bad item
+    doesn't affect the rest of the batch.
+    """
+    kind, name = job["kind"], job["name"]
+    try:
+        if kind == "gift":
+            import new_card_design
+            card = new_card_design.render_gift_card(name, job["gift_data"], job["chart_data"], job["output_path"])
+        elif kind == "plus_premarket":
+            from plus_premarket_card_generator import generate_plus_premarket_card
+            card = generate_plus_premarket_card(name, job["gift_data"], job["output_path"])
+        elif kind == "sticker":
+            import sticker_price_card_generator
+            card = sticker_price_card_generator.render_price_card(
+                job["collection"], job["sticker"], job["price"], job["price_info"],
+                job["ton_price_usd"], job["output_dir"]
+            )
+        else:
+            raise ValueError(f"Unknown card kind: {kind}")
+    except Exception as e:
+        return {"kind": kind, "name": name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # Encode metrics live in the worker process, so hand them back with each result
+    encoding = get_encoder_stats(reset=True)
+    if card is None:
+        return {"kind": kind, "name": name, "ok": False, "error": "renderer returned no card", "encoding": encoding}
+    return {"kind": kind, "name": name, "ok": True, "error": None, "encoding": encoding}
+
+async def fetch_gift_job(gift_name: str, output_path: Optional[str] = None, force_fresh: bool = False) -> Dict[str, Any]:
+    """
+    Fetch everything a gift card needs and describe its render job.
+
+    Args:
+        gift_name: Gift display name
+        output_path: Card path; defaults to the standard file in GIFT_CARDS_DIR
+        force_fresh: Bypass cached gift and chart data (regular gifts)
+    """
+    from plus_premarket_gifts import is_plus_premarket_gift
+
+    if is_plus_premarket_gift(gift_name):
+        output_path = output_path or os.path.join(GIFT_CARDS_DIR, f"{card_filename(gift_name)}.png")
+        import mrkt_quant_api
+        gift_data = await mrkt_quant_api.fetch_gift_data(gift_name)
+        if not gift_data:
+            raise ValueError("no price data")
+        return {"kind": "plus_premarket", "name": gift_name, "gift_data": gift_data, "output_path": output_path}
+
+    import new_card_design
+    gift_data, chart_data = await asyncio.gather(
+        new_card_design.fetch_gift_data(gift_name, force_fresh=force_fresh),
+        new_card_design.fetch_chart_data(gift_name, force_fresh=force_fresh)
+    )
+    output_path = output_path or os.path.join(GIFT_CARDS_DIR, f"{card_filename(gift_name)}_card.png")
+    return {"kind": "gift", "name": gift_name, "gift_data": gift_data, "chart_data": chart_data,
+            "output_path": output_path}
+
+async def fetch_sticker_job(item: Dict[str, Any], ton_price_usd: float, output_dir: str) -> Dict[str, Any]:
+    """Fetch a sticker's price info and describe its render job."""
+    import stickers_tools_api as sticker_api
+    from sticker_price_card_generator import normalize_name
+    collection, sticker = item["collection"], item["sticker"]
+    price_info = await asyncio.to_thread(sticker_api.get_sticker_price, collection, sticker, force_refresh=True)
+    if not price_info:
+        raise ValueError("no price info")
+    return {"kind": "sticker", "name": f"{collection} - {sticker}", "collection": collection,
+            "sticker": sticker, "price": item["price"], "price_info": price_info,
+            "ton_price_usd": ton_price_usd, "output_dir": output_dir,
+            "output_path": os.path.join(output_dir, f"{normalize_name(collection)}_{normalize_name(sticker)}_price_card.png")}
+
+async def pregenerate(gift_names: List[str], stickers: List[Dict[str, Any]], workers: Optional[int] = None,
+                      fetch_concurrency: int = FETCH_CONCURRENCY,
+                      sticker_output_dir: str = STICKER_CARDS_DIR, incremental: bool = True,
+                      upload: bool = True) -> Dict[str, Any]:
+    """
+    Fetch and render cards for the given gifts and stickers.
+
+    Rendering of each item starts as soon as its fetch completes, so the
+    network and CPU stages overlap. With incremental=True, cards whose
+    fingerprint matches their last render (and whose file still exists)
+    are skipped.
+
+    Args:
+        gift_names: Gift display names (plus premarket gifts are detected automatically)
+        stickers: Items with "collection", "sticker" and "price" (TON) keys
+        workers: Render processes (defaults to the CPU count)
+        fetch_concurrency: Maximum upstream fetches in flight
+        sticker_output_dir: Directory for sticker cards
+        incremental: Skip cards whose inputs are unchanged since their last render
+        upload: Pre-upload cards to the Telegram storage chat afterwards
+
+    Returns:
+        dict: Totals (rendered, skipped, failed), upload counts, elapsed seconds and failure descriptions
+    """
+    os.makedirs(GIFT_CARDS_DIR, exist_ok=True)
+    os.makedirs(sticker_output_dir, exist_ok=True)
+
+    ton_price_usd = None
+    if stickers:
+        from ton_price_utils import get_ton_price_usd_async
+        ton_price_usd = await get_ton_price_usd_async()
+
+    fingerprints = load_fingerprints()
+    card_paths: List[str] = []
+    progress = Progress(len(gift_names) + len(stickers))
+    semaphore = asyncio.Semaphore(fetch_concurrency)
+    loop = asyncio.get_running_loop()
+
+    # Spawned workers don't inherit the event loop, HTTP pools or lock state of this process
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=mp_context) as pool:
+        async def run(kind, name, fetch):
+            try:
+                async with semaphore:
+                    job = await fetch()
+                key = f"{kind}:{name}"
+                fingerprint = card_fingerprint(job)
+                if incremental and fingerprints.get(key) == fingerprint and os.path.exists(job["output_path"]):
+                    result = {"kind": kind, "name": name, "ok": True, "skipped": True, "error": None}
+                else:
+                    result = await loop.run_in_executor(pool, render_job, job)
+                    if result["ok"]:
+                        fingerprints[key] = fingerprint
+                if result["ok"]:
+                    card_paths.append(job["output_path"])
+            except Exception as e:
+                result = {"kind": kind, "name": name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+            progress.record(result)
+
+        tasks = [run("gift", name, lambda name=name: fetch_gift_job(name)) for name in gift_names]
+        tasks += [
+            run("sticker", f"{item['collection']} - {item['sticker']}",
+                lambda item=item: fetch_sticker_job(item, ton_price_usd, sticker_output_dir))
+            for item in stickers
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            save_fingerprints(fingerprints)
+
+    summary = progress.summary()
+    if upload and card_paths:
+        # Unchanged cards already have a file_id for their content and are skipped cheaply
+        from card_uploader import upload_cards
+        try:
+            summary["uploads"] = await upload_cards(card_paths)
+        except Exception as e:
+            logger.error(f"[Pregeneration] Card pre-upload failed: {e}")
+    return summary
+
+def load_gift_names() -> List[str]:
+    """All gift names: regular gifts from main.names plus the plus premarket gifts."""
+    from plus_premarket_gifts import PLUS_PREMARKET_GIFT_NAMES
+    try:
+        from main import names
+    except ImportError:
+        from gift_matcher import FALLBACK_GIFT_NAMES as names
+    return list(dict.fromkeys(list(names) + PLUS_PREMARKET_GIFT_NAMES))
+
+def load_stickers(price_file: str = STICKER_PRICE_FILE) -> List[Dict[str, Any]]:
+    """Stickers with prices from the extracted price data file."""
+    try:
+        with open(price_file, 'r') as f:
+            return json.load(f).get("stickers_with_prices", [])
+    except Exception as e:
+        logger.error(f"Error loading sticker price data from {price_file}: {e}")
+        return []
+
+async def _close_connections() -> None:
+    try:
+        import http_client
+        await http_client.close()
+    except Exception as e:
+        logger.warning(f"Error closing upstream HTTP connections: {e}")
+
+async def _run(args) -> Dict[str, Any]:
+    gift_names = [] if args.skip_gifts else load_gift_names()
+    stickers = [] if args.skip_stickers else load_stickers(args.price_file)
+    logger.info(f"[Pregeneration] Refreshing {len(gift_names)} gift and {len(stickers)} sticker cards")
+    try:
+        return await pregenerate(gift_names, stickers, workers=args.workers,
+                                 fetch_concurrency=args.fetch_concurrency, incremental=not args.full,
+                                 upload=not args.no_upload)
+    finally:
+        await _close_connections()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pregenerate all gift and sticker cards in parallel")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--fetch-concurrency", type=int, default=FETCH_CONCURRENCY, help="Upstream fetches in flight")
+    parser.add_argument("--skip-gifts", action="store_true", help="Don't regenerate gift cards")
+    parser.add_argument("--skip-stickers", action="store_true", help="Don't regenerate sticker cards")
+    parser.add_argument("--full", action="store_true", help="Re-render every card even if its inputs are unchanged")
+    parser.add_argument("--no-upload", action="store_true", help="Don't pre-upload cards to the Telegram storage chat")
+    parser.add_argument("--price-file", default=STICKER_PRICE_FILE, help="Sticker price data JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    summary = asyncio.run(_run(args))
+    logger.info(f"[Pregeneration] {summary['rendered']} cards rendered, {summary['skipped']} unchanged, "
+                f"{summary['failed']} failed in {summary['elapsed']:.1f}s")
+    for fmt, entry in summary["encoding"].items():
+        logger.info(f"[Pregeneration] {fmt}: {entry['count']} files, avg {entry['avg_ms']} ms, avg {entry['avg_kb']} KB")
+
+    # The bot checks this timestamp to decide whether cards are stale
+    with open(TIMESTAMP_FILE, 'w') as f:
+        f.write(str(int(time.time())))
+
+    return 1 if summary["total"] and not summary["succeeded"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Card Render Service
+
+On-demand card rendering for the bot without blocking its event loop.
+Prices and charts are fetched on the loop (through the shared caches and
+coalescers), and the PIL rendering and encoding run in a bounded process
+pool. Submissions beyond MAX_PENDING wait for a free slot and are rejected
+with RenderServiceBusy after QUEUE_TIMEOUT seconds, so a burst of cache
+misses cannot pile up unbounded work. Identical concurrent requests share
+one render. If a worker dies (OOM kill, crash in PIL) the pool is replaced
+and the job retried once.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+import request_coalescer
+from pregeneration_engine import render_job, fetch_gift_job, fetch_sticker_job, STICKER_CARDS_DIR
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Renders accepted at once (running plus queued in the pool)
+MAX_PENDING = RENDER_WORKERS * 4
+
+# Seconds a submission may wait for a slot before it is rejected
+QUEUE_TIMEOUT = 15.0
+
+class RenderServiceBusy(Exception):
+    """Raised when the render queue stays full for QUEUE_TIMEOUT seconds."""
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_waiting = 0
+_pending = 0
+_stats = {
+    "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+    "pool_restarts": 0, "max_queue_depth": 0, "wait_seconds": 0.0, "render_seconds": 0.0,
+}
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned workers don't inherit the bot's event loop, sockets or lock state
+        _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"[Render Service] Started {RENDER_WORKERS} render workers")
+    return _pool
+
+def _discard_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died so the next submission starts a fresh one."""
+    global _pool
+    # Concurrent jobs on the same broken pool all land here; only the first replaces it
+    if _pool is broken:
+        _pool = None
+        _stats["pool_restarts"] += 1
+        logger.warning("[Render Service] Render worker died, restarting the pool")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+async def _run_in_pool(job: Dict[str, Any]) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            return await loop.run_in_executor(pool, render_job, job)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt:
+                raise
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_PENDING)
+    return _slots
+
+async def submit(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Render a fetched job (see pregeneration_engine.render_job) in the worker pool.
+
+    Returns:
+        dict: The render_job result ("ok", "error", ...)
+
+    Raises:
+        RenderServiceBusy: If no slot frees up within QUEUE_TIMEOUT seconds
+    """
+    global _waiting, _pending
+    slots = _get_slots()
+    _stats["submitted"] += 1
+
+    queued_at = time.perf_counter()
+    _waiting += 1
+    _stats["max_queue_depth"] = max(_stats["max_queue_depth"], _waiting + _pending)
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["rejected"] += 1
+        raise RenderServiceBusy(f"Render queue full ({_pending} pending, {_waiting - 1} waiting)")
+    finally:
+        _waiting -= 1
+
+    _pending += 1
+    started_at = time.perf_counter()
+    _stats["wait_seconds"] += started_at - queued_at
+    try:
+        result = await _run_in_pool(job)
+    except Exception as e:
+        result = {"kind": job.get("kind"), "name": job.get("name"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        _pending -= 1
+        slots.release()
+        _stats["render_seconds"] += time.perf_counter() - started_at
+
+    _stats["completed" if result["ok"] else "failed"] += 1
+    if not result["ok"]:
+        logger.warning(f"[Render Service] {result['kind']} {result['name']} failed: {result['error']}")
+    return result
+
+async def render_gift(gift_name: str, output_path: Optional[str] = None, force_fresh: bool = False) -> Optional[str]:
+    """
+    Fetch and render a gift card (regular or plus premarket).
+
+    Args:
+        gift_name: Gift display name
+        output_path: Card path; defaults to the standard pregenerated card file
+        force_fresh: Bypass cached gift and chart data
+
+    Returns:
+        str: Path of the rendered card, or None on failure
+    """
+    async def run():
+        job = await fetch_gift_job(gift_name, output_path, force_fresh=force_fresh)
+        result = await submit(job)
+        return job["output_path"] if result["ok"] else None
+
+    return await request_coalescer.coalesce("render_gift", f"{gift_name}|{output_path}|{force_fresh}", run)
+
+async def render_sticker(collection: str, sticker: str, price: float,
+                         output_dir: str = STICKER_CARDS_DIR) -> Optional[str]:
+    """
+    Fetch and render a sticker price card.
+
+    Returns:
+        str: Path of the rendered card, or None on failure
+    """
+    async def run():
+        from ton_price_utils import get_ton_price_usd_async
+        item = {"collection": collection, "sticker": sticker, "price": price}
+        job = await fetch_sticker_job(item, await get_ton_price_usd_async(), output_dir)
+        result = await submit(job)
+        return job["output_path"] if result["ok"] else None
+
+    return await request_coalescer.coalesce("render_sticker", f"{collection}|{sticker}|{output_dir}", run)
+
+def get_render_stats() -> Dict[str, Any]:
+    """Return throughput counters, current queue depth and average wait/render times."""
+    finished = _stats["completed"] + _stats["failed"]
+    return {
+        **_stats,
+        "workers": RENDER_WORKERS,
+        "pending": _pending,
+        "waiting": _waiting,
+        "queue_depth": _pending + _waiting,
+        "avg_wait_ms": round(_stats["wait_seconds"] * 1000 / finished, 1) if finished else 0.0,
+        "avg_render_ms": round(_stats["render_seconds"] * 1000 / finished, 1) if finished else 0.0,
+    }
+
+def shutdown() -> None:
+    """Stop the worker processes (blocks until running renders finish)."""
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        logger.info("[Render Service] Stopped render workers")
+    _slots = None
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Request Coalescer
+
+Single-flight de-duplication for upstream price/chart fetches. When several
+users ask for the same gift at once, only the first caller hits the upstream
+API; everyone else awaits the same in-flight task and receives its result.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# In-flight tasks keyed by (source, key)
+_in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+# Per-source counters: total calls, calls that started a fetch, calls that joined one
+_stats: Dict[str, Dict[str, int]] = {}
+
+def _record(source: str, joined: bool) -> None:
+    stats = _stats.setdefault(source, {"requests": 0, "fetches": 0, "joined": 0})
+    stats["requests"] += 1
+    stats["joined" if joined else "fetches"] += 1
+
+async def coalesce(source: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run fetch() once per (source, key) at a time and share the result.
+
+    Args:
+        source: Logical upstream/data kind (e.g. "gift_data", "chart_data")
+        key: Item identifier, usually the gift name
+        fetch: Zero-argument callable returning the coroutine to run
+
+    Returns:
+        The result of the shared fetch. Callers must treat it as read-only,
+        since every joined caller receives the same object.
+    """
+    loop = asyncio.get_running_loop()
+    flight_key = (source, key)
+    task = _in_flight.get(flight_key)
+
+    # Tasks belong to one event loop; never join a flight from another loop
+    if task is not None and not task.done() and task.get_loop() is loop:
+        _record(source, joined=True)
+        logger.debug(f"[Coalesce] {source} | {key} | Joined in-flight request")
+        return await asyncio.shield(task)
+
+    _record(source, joined=False)
+    task = loop.create_task(fetch())
+    _in_flight[flight_key] = task
+
+    def _cleanup(finished: asyncio.Task) -> None:
+        if _in_flight.get(flight_key) is finished:
+            del _in_flight[flight_key]
+
+    task.add_done_callback(_cleanup)
+    # Shield so a cancelled caller does not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+def get_coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    """Return per-source request/join counters and the join (hit) rate."""
+    report = {}
+    for source, stats in _stats.items():
+        requests = stats["requests"]
+        report[source] = {
+            **stats,
+            "hit_rate": round(stats["joined"] / requests, 4) if requests else 0.0,
+            "in_flight": sum(1 for (s, _), t in _in_flight.items() if s == source and not t.done()),
+        }
+    return report
+
+def log_coalescing_stats() -> None:
+    """Log a one-line summary per source."""
+    for source, stats in get_coalescing_stats().items():
+        logger.info(
+            f"[Coalesce] {source} | Requests: {stats['requests']} | Upstream fetches: {stats['fetches']} | "
+            f"Joined: {stats['joined']} | Hit rate: {stats['hit_rate']:.1%}"
+        )
+
+def reset_coalescing_stats() -> None:
+    """Reset all counters (in-flight requests are unaffected)."""
+    _stats.clear()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP Response Cache
+
+SQLite-backed cache for upstream API responses, shared between the bot and
+the pregeneration processes so a freshly started process starts warm.
+Each endpoint has its own TTL; expired entries are revalidated with
+If-None-Match / If-Modified-Since when the upstream supplies validators.
+Async callers reach the database through worker threads (see
+http_client.get_cached), never on the event loop.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Get script directory for cross-platform compatibility
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_DB_PATH = os.path.join(script_dir, "http_response_cache.db")
+
+# Per-endpoint TTLs in seconds, matched by URL substring (first match wins)
+ENDPOINT_TTLS = [
+    ("giftcharts-api.onrender.com/gifts", 10 * 60),
+    ("giftcharts-api.onrender.com/weekChart", 10 * 60),
+    ("api.tgmrkt.io/api/v1/gifts/collections", 60),
+    ("quant-marketplace.com/api/gifts", 60),
+    ("coinmarketcap.com/currencies/toncoin", 5 * 60),
+]
+
+# Seconds to wait for a write lock held by the other process; a locked
+# database is treated as a cache miss rather than stalling the caller
+BUSY_TIMEOUT = 0.5
+
+# Entries older than this are purged on startup
+MAX_ENTRY_AGE = 7 * 24 * 60 * 60
+
+_local = threading.local()
+
+class CachedResponse:
+    """Minimal response object mirroring the requests/httpx attributes callers use."""
+
+    def __init__(self, url: str, status_code: int, text: str, headers: Dict[str, str], from_cache: bool = True):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.from_cache = from_cache
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+def _connect() -> sqlite3.Connection:
+    """Get this thread's connection, creating the schema on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - MAX_ENTRY_AGE,))
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def ttl_for(url: str) -> int:
+    """Return the TTL configured for a URL, or 0 if it should not be cached."""
+    for pattern, ttl in ENDPOINT_TTLS:
+        if pattern in url:
+            return ttl
+    return 0
+
+def lookup(url: str) -> Optional[Dict[str, Any]]:
+    """Return the stored entry for a URL (fresh or not), or None."""
+    try:
+        row = _connect().execute(
+            "SELECT status, body, headers, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[Response Cache] Lookup failed for {url}: {e}")
+        return None
+    if row is None:
+        return None
+    status, body, headers, etag, last_modified, fetched_at = row
+    return {
+        "status": status,
+        "body": body,
+        "headers": json.loads(headers),
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": fetched_at,
+    }
+
+def is_fresh(entry: Optional[Dict[str, Any]], url: str) -> bool:
+    """Check whether an entry is still within its endpoint TTL."""
+    return entry is not None and time.time() - entry["fetched_at"] < ttl_for(url)
+
+def conditional_headers(entry: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Add revalidation headers for a stored entry to a request's headers."""
+    headers = dict(headers or {})
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def store(url: str, response) -> None:
+    """Persist a successful response."""
+    if response.status_code != 200 or ttl_for(url) <= 0:
+        return
+    headers = {k.lower(): v for k, v in response.headers.items() if k.lower() in ("content-type", "etag", "last-modified")}
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (url, status, body, headers, etag, last_modified, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, response.status_code, response.text, json.dumps(headers),
+             headers.get("etag"), headers.get("last-modified"), time.time()),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[Response Cache] Store failed for {url}: {e}")
+
+def touch(url: str) -> None:
+    """Mark a stored entry as revalidated (after a 304 Not Modified)."""
+    try:
+        conn = _connect()
+        conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"[Response Cache] Touch failed for {url}: {e}")
+
+def to_response(url: str, entry: Dict[str, Any]) -> CachedResponse:
+    """Build a response object from a stored entry."""
+    return CachedResponse(url, entry["status"], entry["body"], entry["headers"])
+
+def resolve(url: str, entry: Optional[Dict[str, Any]], response):
+    """
+    Combine a network response with the stored entry.
+
+    Stores 200 responses, serves the stored body on 304, and otherwise
+    returns the network response unchanged.
+    """
+    if response.status_code == 304 and entry is not None:
+        touch(url)
+        logger.debug(f"[Response Cache] Revalidated {url}")
+        return to_response(url, entry)
+    store(url, response)
+    return response
+
+def cached_get_sync(get, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10,
+                    limiter=None, breaker=None):
+    """
+    Blocking cached GET for synchronous callers (requests, cloudscraper sessions).
+
+    Args:
+        get: A requests-style get(url, headers=..., timeout=...) callable
+        limiter: Optional upstream_limiter.TokenBucket applied to network requests
+        breaker: Optional circuit_breaker.CircuitBreaker for the upstream
+
+    Raises:
+        circuit_breaker.CircuitOpenError: If the breaker is open and nothing is cached
+    """
+    entry = lookup(url)
+    if is_fresh(entry, url):
+        return to_response(url, entry)
+
+    if breaker is not None and not breaker.allow_request():
+        if entry is not None:
+            logger.info(f"[Response Cache] {breaker.name} circuit open, serving stale copy of {url}")
+            return to_response(url, entry)
+        from circuit_breaker import CircuitOpenError
+        raise CircuitOpenError(f"{breaker.name} circuit open and no cached copy of {url}")
+
+    try:
+        if limiter is not None:
+            limiter.acquire_sync()
+        response = get(url, headers=conditional_headers(entry, headers), timeout=timeout)
+        if limiter is not None:
+            if response.status_code == 429:
+                import upstream_limiter
+                limiter.penalize(upstream_limiter.parse_retry_after(response))
+            elif response.status_code < 500:
+                limiter.record_success()
+    except Exception:
+        if breaker is not None:
+            breaker.record_failure()
+        if entry is not None:
+            logger.warning(f"[Response Cache] Upstream error, serving stale copy of {url}")
+            return to_response(url, entry)
+        raise
+
+    if breaker is not None:
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    if response.status_code >= 500 and entry is not None:
+        logger.warning(f"[Response Cache] Upstream HTTP {response.status_code}, serving stale copy of {url}")
+        return to_response(url, entry)
+    return resolve(url, entry, response)
+
+def clear() -> None:
+    """Remove all stored responses."""
+    try:
+        conn = _connect()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+        logger.info("[Response Cache] Cleared")
+    except sqlite3.Error as e:
+        logger.warning(f"[Response Cache] Clear failed: {e}")
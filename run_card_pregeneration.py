@@ -38,7 +38,7 @@ else:
 
 # Get the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
-pregenerate_script = os.path.join(script_dir, "pregenerate_gift_cards.py")
+pregenerate_script = os.path.join(script_dir, "pregeneration_engine.py")
 
 # Time between generations in seconds (32 minutes)
 GENERATION_INTERVAL = 32 * 60
@@ -10,13 +10,15 @@ import os
 import json
 import logging
 import re
+import asyncio
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from difflib import get_close_matches
 from premium_system import premium_system
 from bot_config import DEFAULT_MRKT_LINK, DEFAULT_PALACE_LINK
 import stickers_tools_api as sticker_api
+from file_id_cache import send_cached_photo, edit_cached_media
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -846,8 +848,8 @@ async def send_sticker_card(update: Update, context: ContextTypes.DEFAULT_TYPE,
             await update.message.reply_text(error_msg)
         return
     
-    # Get sticker price info from stickers.tools API
-    price_info = sticker_api.get_sticker_price(collection, sticker)
+    # Get sticker price info from stickers.tools API (blocking client, keep it off the event loop)
+    price_info = await asyncio.to_thread(sticker_api.get_sticker_price, collection, sticker)
     if not price_info:
         await update.message.reply_text(f"No price info for {collection} - {sticker}.")
         return
@@ -891,21 +893,20 @@ async def send_sticker_card(update: Update, context: ContextTypes.DEFAULT_TYPE,
         # Send or edit the message with the photo
         if edit_message_id and chat_id:
             # When editing an existing message
-            with open(card_path, 'rb') as photo_file:
-                await context.bot.edit_message_media(
-                    chat_id=chat_id,
-                    message_id=edit_message_id,
-                    media=InputMediaPhoto(
-                        media=photo_file,
-                        caption=caption,
-                        parse_mode='Markdown'
-                    ),
-                    reply_markup=reply_markup
-                )
+            await edit_cached_media(
+                context.bot.edit_message_media,
+                card_path,
+                caption=caption,
+                parse_mode='Markdown',
+                chat_id=chat_id,
+                message_id=edit_message_id,
+                reply_markup=reply_markup
+            )
         else:
             # When sending a new message
-            sent_message = await update.message.reply_photo(
-                photo=open(card_path, 'rb'),
+            sent_message = await send_cached_photo(
+                update.message.reply_photo,
+                card_path,
                 caption=caption,
                 parse_mode='Markdown',
                 reply_markup=reply_markup
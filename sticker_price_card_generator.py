@@ -12,13 +12,21 @@ import sys
 import json
 import logging
 import argparse
+import asyncio
 import datetime
 import time
 import io
 import re
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageOps
 import numpy as np
-import colorsys
+from gradient_engine import radial_gradient
+from icon_cache import get_icon
+from asset_store import get_asset
+import color_index
+from font_registry import get_font, get_text_length, get_text_bbox
+import card_compositor
+from card_compositor import file_version
+from card_encoder import save_card
 import stickers_tools_api as sticker_api
 
 # Try to import cairosvg for SVG support (optional)
@@ -60,10 +68,6 @@ STAR_LOGO_PATH = os.path.join(ASSETS_DIR, "star.png")  # Star image for sale pri
 FONT_PATH = os.path.join(script_dir, "Typekiln - EloquiaDisplay-ExtraBold.otf")
 CACHE_MAX_AGE = 1920  # 32 minutes in seconds
 
-# Global variables for tracking cache vs live API usage
-cached_usage = 0
-live_api_usage = 0
-
 # Card dimensions
 CARD_WIDTH = 1600
 CARD_HEIGHT = 1000
@@ -71,6 +75,9 @@ WHITE_BOX_WIDTH = 1400
 WHITE_BOX_HEIGHT = 800
 WHITE_BOX_RADIUS = 40
 
+# Layout version for cached sticker base layers; bump when the base drawing changes
+STICKER_LAYER_VERSION = 1
+
 # Import TON price utility
 try:
     from ton_price_utils import get_ton_price_usd
@@ -193,35 +200,8 @@ def load_svg_icon(svg_filename, size=(60, 60), color=(81, 81, 81)):
         return None
 
 def get_dominant_color(image_path):
-    """Get the dominant color from an image"""
-    try:
-        img = Image.open(image_path)
-        # Convert to RGBA if needed
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        # Create a smaller version for faster processing
-        img.thumbnail((100, 100))
-        
-        # Get color data
-        pixels = list(img.getdata())
-        
-        # Filter out transparent pixels
-        pixels = [p for p in pixels if p[3] > 128]
-        
-        if not pixels:
-            return (128, 128, 128)  # Default gray if all pixels are transparent
-        
-        # Simple average color
-        r_sum = sum(p[0] for p in pixels)
-        g_sum = sum(p[1] for p in pixels)
-        b_sum = sum(p[2] for p in pixels)
-        
-        count = len(pixels)
-        return (r_sum // count, g_sum // count, b_sum // count)
-    except Exception as e:
-        logger.error(f"Error getting dominant color: {e}")
-        return (128, 128, 128)  # Default gray on error
+    """Get the dominant color from an image (via the shared color index)"""
+    return color_index.get_dominant_color(image_path, color_index.AVERAGE)
 
 def find_sticker_image(collection_norm, sticker_norm):
     """Find the sticker image in the sticker collections directory"""
@@ -283,80 +263,106 @@ def create_rounded_rectangle(draw, xy, radius, fill):
 
 def create_gradient_background(width, height, color):
     """Create a radial gradient background based on the dominant color (same as gift cards)"""
-    # Create a new image with RGBA mode
-    background = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    
-    # Extract RGB components from the dominant color
-    r, g, b = color
-    
-    # Create a darker shade for the edges
-    darker_r = max(0, int(r * 0.65))
-    darker_g = max(0, int(g * 0.65))
-    darker_b = max(0, int(b * 0.65))
-    darker_color = (darker_r, darker_g, darker_b, 255)
+    return radial_gradient(width, height, color)
+
+def load_card_fonts():
+    """Return the (title, subtitle, price, TON price, date) fonts, falling back to the default font."""
+    try:
+        return (
+            get_font(FONT_PATH, 80),  # For collection name
+            get_font(FONT_PATH, 60),  # For sticker name
+            get_font(FONT_PATH, 180),  # For USD price
+            get_font(FONT_PATH, 50),  # For TON price
+            get_font(FONT_PATH, 30),  # For date at the bottom
+        )
+    except Exception as e:
+        logger.error(f"Error loading font: {e}")
+        default_font = ImageFont.load_default()
+        return (default_font,) * 5
+
+def card_layout(title_font, subtitle_font, price_font):
+    """Positions shared by the base layer and the per-card dynamic layer."""
+    white_box_x = (CARD_WIDTH - WHITE_BOX_WIDTH) // 2
+    white_box_y = (CARD_HEIGHT - WHITE_BOX_HEIGHT) // 2
+    collection_x = white_box_x + 60
+    collection_y = white_box_y + 60
+    sticker_y = collection_y + get_text_bbox("A", title_font)[3] + 10  # Add some spacing
+    dollar_x = collection_x + 20
+    dollar_y = sticker_y + get_text_bbox("A", subtitle_font)[3] + 50  # Add spacing after sticker name
+    return {
+        "white_box_x": white_box_x,
+        "white_box_y": white_box_y,
+        "collection_x": collection_x,
+        "collection_y": collection_y,
+        "sticker_y": sticker_y,
+        "dollar_x": dollar_x,
+        "dollar_y": dollar_y,
+        "price_x": dollar_x + get_text_bbox("$", price_font)[2] + 10,  # Add spacing after dollar sign
+        "line_y": dollar_y + get_text_bbox("$", price_font)[3] + 15,
+    }
+
+def render_sticker_base_layer(collection, sticker, dominant_color):
+    """Render the static layer of a sticker card: everything that doesn't depend on the price."""
+    title_font, subtitle_font, price_font, _, _ = load_card_fonts()
+    layout = card_layout(title_font, subtitle_font, price_font)
+    white_box_x, white_box_y = layout["white_box_x"], layout["white_box_y"]
+    collection_x = layout["collection_x"]
     
-    # Create a lighter shade for the center
-    lighter_r = min(255, int(r * 1.15))
-    lighter_g = min(255, int(g * 1.15))
-    lighter_b = min(255, int(b * 1.15))
-    lighter_color = (lighter_r, lighter_g, lighter_b, 255)
+    # Create a gradient background instead of solid color
+    card = create_gradient_background(CARD_WIDTH, CARD_HEIGHT, dominant_color)
+    draw = ImageDraw.Draw(card)
     
-    # Create a slightly different hue for added depth
-    h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-    h = (h + 0.05) % 1.0  # Shift hue slightly
-    s = min(1.0, s * 1.2)  # Increase saturation
-    accent_r, accent_g, accent_b = colorsys.hsv_to_rgb(h, s, v)
-    accent_color = (int(accent_r*255), int(accent_g*255), int(accent_b*255), 255)
+    # Draw white rounded rectangle
+    create_rounded_rectangle(
+        draw, 
+        (white_box_x, white_box_y, white_box_x + WHITE_BOX_WIDTH, white_box_y + WHITE_BOX_HEIGHT),
+        WHITE_BOX_RADIUS,
+        (255, 255, 255, 255)  # White color
+    )
     
-    # Create a radial gradient using the same method as gift cards
-    # First create a small gradient image and then resize it
-    small_size = (200, 200)  # Increased for smoother gradient
-    small_gradient = Image.new('RGBA', small_size, (0, 0, 0, 0))
-    small_draw = ImageDraw.Draw(small_gradient)
+    # Draw bot watermark at the top center (multiline)
+    watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
+    watermark_font = get_font(FONT_PATH, 32) if os.path.exists(FONT_PATH) else ImageFont.load_default()
+    line_height = get_text_bbox("A", watermark_font)[3] + 5
+    watermark_y = 30  # Start position
     
-    # Draw concentric circles with decreasing radius
-    center = (small_size[0] // 2, small_size[1] // 2)
-    max_radius = int(((small_size[0] // 2) ** 2 + (small_size[1] // 2) ** 2) ** 0.5)
+    # Draw each line centered
+    for i, line in enumerate(watermark_lines):
+        line_bbox = get_text_bbox(line, watermark_font)
+        line_width = line_bbox[2] - line_bbox[0]
+        watermark_x = (CARD_WIDTH - line_width) // 2
+        line_y = watermark_y + (i * line_height)
+        draw.text((watermark_x, line_y), line, fill=(255, 255, 255, 200), font=watermark_font)
     
-    # Draw from outside in with more gradual transitions
-    num_steps = 40  # More steps for smoother gradient
-    for i in range(num_steps):
-        # Calculate radius for this step
-        radius = max_radius * (1 - (i / num_steps))
-        
-        # Calculate interpolation factor (0 at edge, 1 at center)
-        factor = i / num_steps
-        
-        # Create multi-point gradient with darker outer edges and lighter center
-        if factor < 0.25:  # Outer 25% transitions from darker to base
-            t = factor / 0.25
-            r_val = int(darker_color[0] * (1-t) + color[0] * t)
-            g_val = int(darker_color[1] * (1-t) + color[1] * t)
-            b_val = int(darker_color[2] * (1-t) + color[2] * t)
-        elif factor < 0.5:  # Next 25% transitions from base to accent
-            t = (factor - 0.25) / 0.25
-            r_val = int(color[0] * (1-t) + accent_color[0] * t)
-            g_val = int(color[1] * (1-t) + accent_color[1] * t)
-            b_val = int(color[2] * (1-t) + accent_color[2] * t)
-        else:  # Inner 50% transitions from accent to lighter
-            t = (factor - 0.5) / 0.5
-            r_val = int(accent_color[0] * (1-t) + lighter_color[0] * t)
-            g_val = int(accent_color[1] * (1-t) + lighter_color[1] * t)
-            b_val = int(accent_color[2] * (1-t) + lighter_color[2] * t)
-        
-        current_color = (r_val, g_val, b_val, 255)
-        
-        # Draw a filled circle
-        bbox = (center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
-        small_draw.ellipse(bbox, fill=current_color)
+    # Draw collection and sticker names
+    draw.text((collection_x, layout["collection_y"]), prettify_name(collection), fill=(20, 20, 20), font=title_font)
+    draw.text((collection_x, layout["sticker_y"]), prettify_name(sticker), fill=(80, 80, 80), font=subtitle_font)
     
-    # Resize the small gradient to the full size
-    gradient_bg = small_gradient.resize((width, height), Image.BICUBIC)
+    # Draw dollar sign in lighter color (using dominant color with transparency)
+    dollar_color = (*dominant_color[:3], 150)
+    draw.text((layout["dollar_x"], layout["dollar_y"]), "$", fill=dollar_color, font=price_font)
     
-    return gradient_bg
+    # Draw horizontal line - half width on x-axis
+    line_y = layout["line_y"]
+    line_width = (white_box_x + WHITE_BOX_WIDTH - 60 - collection_x) // 2
+    draw.line([(collection_x, line_y), (collection_x + line_width, line_y)], fill=(200, 200, 200), width=3)
+    return card
 
 def generate_price_card(collection, sticker, price, output_dir):
     """Generate a price card for a sticker using the new modern design"""
+    try:
+        # Get price info from stickers.tools API
+        price_info = sticker_api.get_sticker_price(collection, sticker, force_refresh=True)
+        if not price_info:
+            logger.warning(f"No price info for {collection} - {sticker}")
+            return None
+        return render_price_card(collection, sticker, price, price_info, get_ton_price_usd(), output_dir)
+    except Exception as e:
+        logger.error(f"Error generating price card for {collection} - {sticker}: {e}")
+        return None
+
+def render_price_card(collection, sticker, price, price_info, ton_price_usd, output_dir):
+    """Render a sticker price card from already fetched price data (no network calls)"""
     try:
         # Normalize names for file operations
         collection_norm = normalize_name(collection)
@@ -364,11 +370,6 @@ def generate_price_card(collection, sticker, price, output_dir):
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
-        # Get price info from stickers.tools API
-        price_info = sticker_api.get_sticker_price(collection, sticker, force_refresh=True)
-        if not price_info:
-            logger.warning(f"No price info for {collection} - {sticker}")
-            return None
         price_ton = price_info['floor_price_ton']
         price_usd = price_info['floor_price_usd']
         supply = price_info['supply']
@@ -402,109 +403,44 @@ def generate_price_card(collection, sticker, price, output_dir):
             dominant_color = get_dominant_color(sticker_image_path)
             logger.info(f"Using sticker image: {sticker_image_path}")
         
-        # Create a gradient background instead of solid color
-        card = create_gradient_background(CARD_WIDTH, CARD_HEIGHT, dominant_color)
-        draw = ImageDraw.Draw(card)
-        
-        # Calculate center position for white box
-        white_box_x = (CARD_WIDTH - WHITE_BOX_WIDTH) // 2
-        white_box_y = (CARD_HEIGHT - WHITE_BOX_HEIGHT) // 2
-        
-        # Draw white rounded rectangle
-        create_rounded_rectangle(
-            draw, 
-            (white_box_x, white_box_y, white_box_x + WHITE_BOX_WIDTH, white_box_y + WHITE_BOX_HEIGHT),
-            WHITE_BOX_RADIUS,
-            (255, 255, 255, 255)  # White color
+        # Static base layer (gradient, white box, watermark, names, "$" and divider), built once
+        # per sticker and color; only prices, supply and the date are drawn per card
+        card = card_compositor.get_base_layer(
+            "sticker", STICKER_LAYER_VERSION, f"{collection}/{sticker}",
+            (collection, sticker, tuple(dominant_color), FONT_PATH, file_version(FONT_PATH)),
+            lambda: render_sticker_base_layer(collection, sticker, dominant_color),
         )
+        draw = ImageDraw.Draw(card)
         
-        # Load fonts
-        try:
-            title_font = ImageFont.truetype(FONT_PATH, 80)  # For collection name
-            subtitle_font = ImageFont.truetype(FONT_PATH, 60)  # For sticker name
-            price_font = ImageFont.truetype(FONT_PATH, 180)  # For USD price
-            ton_price_font = ImageFont.truetype(FONT_PATH, 50)  # For TON price
-            date_font = ImageFont.truetype(FONT_PATH, 30)  # For date at the bottom
-            watermark_font = ImageFont.truetype(FONT_PATH, 40)  # For bot watermark
-        except Exception as e:
-            logger.error(f"Error loading font: {e}")
-            # Fallback to default font
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            price_font = ImageFont.load_default()
-            ton_price_font = ImageFont.load_default()
-            date_font = ImageFont.load_default()
-            watermark_font = ImageFont.load_default()
-        
-        # Draw bot watermark at the top center (multiline)
-        watermark_lines = ["Tama Gadget", "Join @The01Studio", "Try @CollectibleKITbot"]
-        watermark_font = ImageFont.truetype(FONT_PATH, 32) if os.path.exists(FONT_PATH) else ImageFont.load_default()
-        line_height = watermark_font.getbbox("A")[3] + 5
-        watermark_y = 30  # Start position
-        
-        # Draw each line centered
-        for i, line in enumerate(watermark_lines):
-            line_bbox = draw.textbbox((0, 0), line, font=watermark_font)
-            line_width = line_bbox[2] - line_bbox[0]
-            watermark_x = (CARD_WIDTH - line_width) // 2
-            line_y = watermark_y + (i * line_height)
-            draw.text((watermark_x, line_y), line, fill=(255, 255, 255, 200), font=watermark_font)
-        
-        # Draw collection name
-        display_collection = prettify_name(collection)
-        collection_x = white_box_x + 60
-        collection_y = white_box_y + 60
-        draw.text((collection_x, collection_y), display_collection, fill=(20, 20, 20), font=title_font)
-        
-        # Draw sticker name
-        display_sticker = prettify_name(sticker)
-        sticker_y = collection_y + title_font.getbbox("A")[3] + 10  # Add some spacing
-        draw.text((collection_x, sticker_y), display_sticker, fill=(80, 80, 80), font=subtitle_font)
+        title_font, subtitle_font, price_font, ton_price_font, date_font = load_card_fonts()
+        layout = card_layout(title_font, subtitle_font, price_font)
+        white_box_x, white_box_y = layout["white_box_x"], layout["white_box_y"]
+        collection_x = layout["collection_x"]
+        dollar_y, line_y = layout["dollar_y"], layout["line_y"]
         
-        # Calculate USD price using real TON price
-        ton_price_usd = get_ton_price_usd()
+        # Calculate USD price using the real TON price fetched by the caller
         price_usd = price * ton_price_usd
         
-        # Draw dollar sign in lighter color (using dominant color with transparency)
-        dollar_color = (*dominant_color[:3], 150)  # Use dominant color with transparency
-        dollar_x = collection_x + 20
-        dollar_y = sticker_y + subtitle_font.getbbox("A")[3] + 50  # Add spacing after sticker name
-        draw.text((dollar_x, dollar_y), "$", fill=dollar_color, font=price_font)
-        
         # Draw USD price
         price_text = f"{price_usd:,.0f}".replace(",", " ")
-        price_x = dollar_x + price_font.getbbox("$")[2] + 10  # Add spacing after dollar sign
+        price_x = layout["price_x"]
         draw.text((price_x, dollar_y), price_text, fill=(20, 20, 20), font=price_font)
         
-        # Draw horizontal line - half width on x-axis
-        line_y = dollar_y + price_font.getbbox("$")[3] + 15
-        line_width = (white_box_x + WHITE_BOX_WIDTH - 60 - collection_x) // 2  # Half the width
-        draw.line([(collection_x, line_y), (collection_x + line_width, line_y)], fill=(200, 200, 200), width=3)  # Increased width from 1 to 3
-        
         # Draw TON price with TON logo beside the $ price instead of below it
         ton_text = f"{price_ton:.1f}".replace(".", ",").replace(",0", "")
         
         # Calculate position for TON price (beside the USD price)
-        usd_price_width = draw.textlength(price_text, font=price_font)
+        usd_price_width = get_text_length(price_text, price_font)
         ton_x = price_x + usd_price_width + 30  # Position after USD price with some spacing
-        ton_y = dollar_y + price_font.getbbox("$")[3] - ton_price_font.getbbox("A")[3] - 10  # Align bottom with USD price
+        ton_y = dollar_y + get_text_bbox("$", price_font)[3] - get_text_bbox("A", ton_price_font)[3] - 10  # Align bottom with USD price
         
         # Add TON logo before TON price
         try:
-            ton_logo = Image.open(TON_LOGO_PATH).convert("RGBA")
-            ton_logo = ton_logo.resize((60, 60))  # Same size as supply and star icons
-            
-            # Extract the alpha channel to use as a mask
-            r, g, b, alpha = ton_logo.split()
-            
-            # Create a new image with the background color
-            colored_ton_logo = Image.new('RGBA', ton_logo.size, (*dominant_color, 255))
-            
-            # Apply the alpha mask from the original image
-            colored_ton_logo.putalpha(alpha)
+            # Shared TON logo recolored with the dominant color (same size as supply and star icons)
+            colored_ton_logo = get_icon(TON_LOGO_PATH, size=(60, 60), color=dominant_color, exact=True)
             
             # Calculate vertical position to center the icon with the text
-            text_height = ton_price_font.getbbox("0")[3]
+            text_height = get_text_bbox("0", ton_price_font)[3]
             icon_y_offset = (80 - text_height) // 2  # Center the 60px icon with the text
             
             card.paste(colored_ton_logo, (int(ton_x), int(ton_y - icon_y_offset)), colored_ton_logo)
@@ -525,7 +461,7 @@ def generate_price_card(collection, sticker, price, output_dir):
             
             # Calculate proper vertical alignment for icons
             # Get the actual text height for proper centering
-            text_bbox = ton_price_font.getbbox("0")
+            text_bbox = get_text_bbox("0", ton_price_font)
             text_height = text_bbox[3] - text_bbox[1]
             text_top_offset = abs(text_bbox[1])  # Distance from baseline to top
             
@@ -546,31 +482,31 @@ def generate_price_card(collection, sticker, price, output_dir):
             supply_text = f"{supply:,}".replace(",", " ")
             
             draw.text((current_x, info_y), supply_text, fill=(81, 81, 81), font=ton_price_font)
-            current_x += draw.textlength(supply_text, font=ton_price_font) + 10
+            current_x += get_text_length(supply_text, ton_price_font) + 10
             
             # Add initial USD price on the same line if available
             if init_price_usd and init_price_usd > 0:
                 # Add separator between supply and initial price
                 separator_text = "|"
                 draw.text((current_x, info_y), separator_text, fill=(150, 150, 150), font=ton_price_font)
-                current_x += draw.textlength(separator_text, font=ton_price_font) + 10
+                current_x += get_text_length(separator_text, ton_price_font) + 10
                 
                 # Add dollar sign as text (no icon)
                 dollar_text = "$"
                 draw.text((current_x, info_y), dollar_text, fill=(81, 81, 81), font=ton_price_font)
-                current_x += draw.textlength(dollar_text, font=ton_price_font) + 5
+                current_x += get_text_length(dollar_text, ton_price_font) + 5
                 
                 # Display initial USD price
                 initial_price_text = f"{init_price_usd:.0f}".replace(",", " ")
                 draw.text((current_x, info_y), initial_price_text, fill=(81, 81, 81), font=ton_price_font)
-                current_x += draw.textlength(initial_price_text, font=ton_price_font) + 10
+                current_x += get_text_length(initial_price_text, ton_price_font) + 10
             
             
         
         # Add sticker image on the right side (with fallback for missing images)
         if sticker_image_path:
             try:
-                sticker_img = Image.open(sticker_image_path).convert("RGBA")
+                sticker_img = get_asset(sticker_image_path)
                 
                 # Calculate size for the sticker image (reduced by 30% from previous size)
                 max_width = 560  # Reduced from 800 by 30%
@@ -585,7 +521,7 @@ def generate_price_card(collection, sticker, price, output_dir):
                 
                 new_width = int(width * ratio)
                 new_height = int(height * ratio)
-                sticker_img = sticker_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                sticker_img = get_asset(sticker_image_path, (new_width, new_height), resample=Image.Resampling.LANCZOS)
                 
                 # Calculate position (right side of white box, vertically centered)
                 sticker_x = white_box_x + WHITE_BOX_WIDTH - sticker_img.width - 20  # Reduced from 50 to 20 to move more to the right
@@ -614,7 +550,7 @@ def generate_price_card(collection, sticker, price, output_dir):
             
             # Add placeholder text
             try:
-                placeholder_font = ImageFont.truetype(FONT_PATH, 40)
+                placeholder_font = get_font(FONT_PATH, 40)
             except:
                 placeholder_font = ton_price_font
             
@@ -630,7 +566,7 @@ def generate_price_card(collection, sticker, price, output_dir):
         # Add generation date at the bottom middle of the card
         current_date = datetime.datetime.now().strftime("%d %b %Y • %H:%M UTC")
         date_text = current_date
-        date_text_width = draw.textlength(date_text, font=date_font)
+        date_text_width = get_text_length(date_text, date_font)
         date_x = CARD_WIDTH // 2 - date_text_width // 2
         date_y = white_box_y + WHITE_BOX_HEIGHT - 50  # Position at bottom of white card area
         draw.text((date_x, date_y), date_text, fill=(100, 100, 100), font=date_font)
@@ -638,7 +574,7 @@ def generate_price_card(collection, sticker, price, output_dir):
         # Save the card
         output_filename = f"{collection_norm}_{sticker_norm}_price_card.png"
         output_path = os.path.join(output_dir, output_filename)
-        card.save(output_path)
+        save_card(card, output_path)
         
         logger.info(f"Generated price card: {output_path}")
         return output_path
@@ -647,7 +583,7 @@ def generate_price_card(collection, sticker, price, output_dir):
         return None
 
 def generate_all_price_cards(price_data, output_dir):
-    """Generate price cards for all stickers with prices"""
+    """Generate price cards for all stickers with prices (fetched concurrently, rendered in parallel)"""
     if not price_data or 'stickers_with_prices' not in price_data:
         logger.error("Invalid price data")
         return
@@ -655,31 +591,20 @@ def generate_all_price_cards(price_data, output_dir):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Reset counters
-    global cached_usage, live_api_usage
-    cached_usage = 0
-    live_api_usage = 0
-    
     # Get stickers
     stickers = price_data['stickers_with_prices']
     total_stickers = len(stickers)
     
     logger.info(f"Generating {total_stickers} price cards...")
     
-    # Generate cards for each sticker with price
-    for i, item in enumerate(stickers):
-        collection = item['collection']
-        sticker = item['sticker']
-        price = item['price']
-        
-        logger.info(f"Generating price card for {collection} - {sticker}: {price} TON")
-        
-        result = generate_price_card(collection, sticker, price, output_dir)
-        
-        if not result:
-            safe_print(f"[WARN] WARNING: Could not get live price data for {collection} - {sticker}")
+    from pregeneration_engine import pregenerate
+    summary = asyncio.run(pregenerate([], stickers, sticker_output_dir=output_dir))
+    
+    for failure in summary['failures']:
+        safe_print(f"[WARN] WARNING: Could not generate {failure}")
     
-    logger.info(f"Price card generation complete: {cached_usage} from cache, {live_api_usage} from live API")
+    logger.info(f"Price card generation complete: {summary['rendered']} generated, {summary['skipped']} unchanged, "
+                f"{summary['failed']} failed in {summary['elapsed']:.1f}s")
 
 def main():
     """Main function"""
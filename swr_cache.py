@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Stale-While-Revalidate Cache
+
+Generic async cache for price/chart data. Fresh entries are returned as-is;
+expired entries are returned immediately while one background task refreshes
+them; entries past the hard max-staleness bound (or missing) are loaded
+inline. Loads for the same key are coalesced into a single upstream call.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import request_coalescer
+
+logger = logging.getLogger(__name__)
+
+class SWRCache:
+    """Stale-while-revalidate cache keyed by string (usually the gift name)."""
+
+    def __init__(self, name: str, ttl: float, max_staleness: float):
+        self.name = name
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, loading or refreshing it via loader().
+
+        loader results of None are never cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return entry["value"]
+            if age < self.max_staleness:
+                self.stats["stale_hits"] += 1
+                self._refresh_in_background(key, loader)
+                return entry["value"]
+
+        self.stats["misses"] += 1
+        return await self._load(key, loader)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        async def load_and_store():
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+            return value
+        return await request_coalescer.coalesce(f"swr:{self.name}", key, load_and_store)
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        running = self._refresh_tasks.get(key)
+        if running is not None and not running.done():
+            return
+
+        async def refresh():
+            self.stats["refreshes"] += 1
+            try:
+                if await self._load(key, loader) is None:
+                    self.stats["refresh_failures"] += 1
+            except Exception as e:
+                self.stats["refresh_failures"] += 1
+                logger.warning(f"[SWR] {self.name} | {key} | Background refresh failed: {e}")
+
+        self._refresh_tasks[key] = asyncio.get_running_loop().create_task(refresh())
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value as fresh."""
+        self._entries[key] = {"value": value, "stored_at": time.time()}
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return the stored value regardless of age (None if absent)."""
+        entry = self._entries.get(key)
+        return entry["value"] if entry is not None else None
+
+    def invalidate(self, key: str) -> None:
+        """Drop one entry."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -13,7 +13,6 @@ import subprocess
 import sys
 import threading
 import signal
-from difflib import get_close_matches
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultPhoto, InputMediaPhoto, InlineQueryResultArticle, InputTextMessageContent, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.constants import MessageEntityType, ParseMode
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters, InlineQueryHandler
@@ -21,6 +20,8 @@ from uuid import uuid4
 from telegram.error import TelegramError, NetworkError
 from urllib.parse import quote
 from httpx import HTTPError, ConnectError, ProxyError
+from file_id_cache import send_cached_photo, get_file_id, remember_file_id, content_hash
+from gift_matcher import GiftMatcher, FALLBACK_GIFT_NAMES
 
 # Import premium system functions
 try:
@@ -125,53 +126,11 @@ try:
     from main import names
 except ImportError:
     # Fallback names list if we can't import from main.py
-    names = [
-        "Heart Locket", "Lush Bouquet", "Astral Shard", "B-Day Candle", "Berry Box",
-        "Big Year", "Bonded Ring", "Bow Tie", "Bunny Muffin", "Candy Cane",
-        "Cookie Heart", "Crystal Ball", "Desk Calendar", "Diamond Ring", "Durov's Cap",
-        "Easter Egg", "Electric Skull", "Eternal Candle", "Eternal Rose", "Evil Eye",
-        "Flying Broom", "Gem Signet", "Genie Lamp", "Ginger Cookie", "Hanging Star",
-        "Heroic Helmet", "Hex Pot", "Holiday Drink", "Homemade Cake", "Hypno Lollipop",
-        "Ion Gem", "Jack-in-the-Box", "Jelly Bunny", "Jester Hat", "Jingle Bells",
-        "Kissed Frog", "Light Sword", "Lol Pop", "Loot Bag", "Love Candle",
-        "Love Potion", "Lunar Snake", "Mad Pumpkin", "Magic Potion", "Mini Oscar",
-        "Nail Bracelet", "Neko Helmet", "Party Sparkler", "Perfume Bottle", "Pet Snake",
-        "Plush Pepe", "Precious Peach", "Record Player", "Restless Jar", "Sakura Flower",
-        "Santa Hat", "Scared Cat", "Sharp Tongue", "Signet Ring", "Skull Flower",
-        "Sleigh Bell", "Snake Box", "Snow Globe", "Snow Mittens", "Spiced Wine",
-        "Spy Agaric", "Star Notepad", "Swiss Watch", "Tama Gadget", "Top Hat",
-        "Toy Bear", "Trapped Heart", "Vintage Cigar", "Voodoo Doll", "Winter Wreath",
-        "Witch Hat", "Xmas Stocking"
-    ]
+    names = list(FALLBACK_GIFT_NAMES)
 
-# Create a lowercase and simplified version of each name for better matching
-simplified_names = {}
-# Only exclude these very common words as parts
-exclude_words = ["the", "and", "of", "for", "with", "in", "on", "at", "by"]
-
-for name in names:
-    # Create variations of the name for matching
-    simple_name = name.lower().replace('-', ' ').replace("'", '')
-    simplified_names[simple_name] = name
-    
-    # Add hyphenated variations if applicable
-    if "-" in name:
-        no_hyphen = name.lower().replace("-", " ")
-        simplified_names[no_hyphen] = name
-    
-    # Add apostrophe variations if applicable
-    if "'" in name:
-        no_apostrophe = name.lower().replace("'", "")
-        simplified_names[no_apostrophe] = name
-    
-    # Add individual parts of names for better partial matching
-    parts = simple_name.split()
-    for part in parts:
-        # Only add substantial parts (3+ chars) that aren't common words
-        if len(part) >= 3 and part not in exclude_words:
-            # For ambiguous words (same part in multiple gifts), we'll still add them
-            # This makes matching more inclusive but might lead to multiple matches
-            simplified_names[part] = name
+# Gift name search index, built once; simplified_names maps every alias to its gift
+gift_matcher = GiftMatcher(names)
+simplified_names = gift_matcher.aliases
 
 # Import the callback handler from the external module
 try:
@@ -590,8 +549,8 @@ def get_gift_card_by_name(gift_name):
     # If not, it might be a name we need to generate
     return None
 
-# Get pre-generated gift card (no on-demand generation)
-def generate_gift_card(gift_file_name):
+# Get pre-generated gift card, rendering it in the render service only as a last resort
+async def generate_gift_card(gift_file_name):
     try:
         logger.info(f"generate_gift_card called for: {gift_file_name}")
         
@@ -624,13 +583,13 @@ def generate_gift_card(gift_file_name):
                 if elapsed_minutes >= 32:
                     logging.info("Cards are stale, triggering regeneration")
                     # Run the pregeneration script in the background
-                    subprocess.Popen([sys.executable, os.path.join(script_dir, "pregenerate_gift_cards.py")])
+                    subprocess.Popen([sys.executable, os.path.join(script_dir, "pregeneration_engine.py")])
             except Exception as e:
                 logging.error(f"Error checking timestamp: {e}")
         else:
             # No timestamp file, trigger regeneration
             logging.info("No timestamp file found, triggering regeneration")
-            subprocess.Popen([sys.executable, os.path.join(script_dir, "pregenerate_gift_cards.py")])
+            subprocess.Popen([sys.executable, os.path.join(script_dir, "pregeneration_engine.py")])
         
         # Try one more time to get the card (it might exist now)
         card_path = get_gift_card_by_name(gift_file_name)
@@ -640,8 +599,8 @@ def generate_gift_card(gift_file_name):
             
         # If we still don't have the card, generate it on demand as a fallback
         logging.info(f"Pre-generated card not found for {gift_file_name}, generating on demand")
-        import new_card_design
-        new_card_design.generate_specific_gift(gift_display_name)
+        import render_service
+        await render_service.render_gift(gift_display_name)
         
         # Get the card path using the file_name format
         final_card_path = get_gift_card_by_name(gift_file_name)
@@ -671,108 +630,8 @@ def get_gift_name(filename):
 
 # Enhanced function to find matching gifts with smart context detection
 def find_matching_gifts(query):
-    # Ignore extremely short queries to avoid false matches
-    if len(query.strip()) < 2:
-        return []
-        
-    query = query.lower().replace('-', ' ').replace("'", '')
-    matching_gifts = []
-    
-    # Skip common phrases
-    common_phrases = [
-        "thank you", "hello there", "how are you", "what's up", 
-        "good morning", "good evening", "good night", "see you later"
-    ]
-    
-    if any(phrase in query for phrase in common_phrases):
-        return []
-    
-    # Gift groups for disambiguation
-    gift_groups = {
-        "ring": ["Diamond Ring", "Bonded Ring", "Signet Ring"],
-        "hat": ["Jester Hat", "Santa Hat", "Top Hat", "Witch Hat", "Durov's Cap"],
-        "heart": ["Heart Locket", "Cookie Heart", "Trapped Heart"],
-        "candle": ["B-Day Candle", "Eternal Candle", "Love Candle"],
-        "snake": ["Pet Snake", "Lunar Snake", "Snake Box"],
-        "box": ["Berry Box", "Snake Box", "Loot Bag"],
-        "bunny": ["Bunny Muffin", "Jelly Bunny"],
-        "signet": ["Gem Signet", "Signet Ring"],
-        "bell": ["Jingle Bells", "Sleigh Bell"],
-        "pad": ["Star Notepad"],
-        "pepe": ["Plush Pepe"],
-        "peach": ["Precious Peach"],
-        "plush": ["Plush Pepe"]
-    }
-    
-    # Check if query exactly matches a gift group
-    if query.lower() in gift_groups:
-        return gift_groups[query.lower()]  # Return the whole group for disambiguation
-    
-    # Check for exact matches in simplified names first
-    if query in simplified_names:
-        matching_gifts.append(simplified_names[query])
-        return matching_gifts
-    
-    # First try exact gift name matches (case insensitive)
-    for simple_name, original_name in simplified_names.items():
-        if query == simple_name:
-            if original_name not in matching_gifts:
-                matching_gifts.append(original_name)
-            return matching_gifts  # Return immediately for exact matches
-    
-    # Special prioritized partial matches (more accurate)
-    special_matches = {
-        "pepe": "Plush Pepe",
-        "peach": "Precious Peach",
-        "plush": "Plush Pepe",
-        "precious": "Precious Peach",
-        "pad": "Star Notepad",
-        "notepad": "Star Notepad",
-        "gadget": "Tama Gadget",
-        "tama": "Tama Gadget",
-        "diamond": "Diamond Ring",
-        "locket": "Heart Locket",
-        "jack": "Jack-in-the-Box",
-        "durov": "Durov's Cap",
-        "cap": "Durov's Cap"
-    }
-    
-    # Check for special partial matches
-    for keyword, gift in special_matches.items():
-        if query == keyword or (len(query) >= 3 and keyword.startswith(query)):
-            if gift not in matching_gifts:
-                matching_gifts.append(gift)
-    
-    # If we found special matches, return them first
-    if matching_gifts:
-        return matching_gifts
-    
-    # Then try partial word matching
-    for simple_name, original_name in simplified_names.items():
-        # Skip if we already have this gift in our matches
-        if original_name in matching_gifts:
-            continue
-            
-        # Check if query is contained in the gift name
-        if query in simple_name.lower():
-            if original_name not in matching_gifts:
-                matching_gifts.append(original_name)
-    
-    # If still no matches, try fuzzy matching with a moderate threshold
-    if not matching_gifts and len(query) >= 3:
-        # Get all simplified names as a list
-        all_simple_names = list(simplified_names.keys())
-        
-        # Find close matches
-        close_matches = get_close_matches(query, all_simple_names, n=3, cutoff=0.75)
-        
-        # Add the corresponding original names
-        for match in close_matches:
-            if match in simplified_names and simplified_names[match] not in matching_gifts:
-                matching_gifts.append(simplified_names[match])
-    
-    # Remove any duplicates and limit to 5 results to avoid overwhelming the user
-    return list(dict.fromkeys(matching_gifts))[:5]
+    """Gift names matching a chat message or inline query (see gift_matcher)."""
+    return gift_matcher.match(query)
 
 # Create a keyboard with gift categories
 def get_category_keyboard():
@@ -861,27 +720,16 @@ def get_gift_keyboard(category=None, page=0):
     return InlineKeyboardMarkup(keyboard)
 
 # Generate a timestamped card for refresh functionality
-def generate_timestamped_card(gift_file_name):
+async def generate_timestamped_card(gift_file_name):
     try:
         # Convert file_name to display name for the card generator
         gift_display_name = gift_file_name.replace("_", " ")
         
-        # Normalize the filename for file system compatibility
-        # First, fix specific problematic gift names
-        if gift_file_name == "Jack-in-the-Box":
-            normalized_filename = "Jack_in_the_Box"
-        elif gift_file_name == "Durov's Cap":
-            normalized_filename = "Durovs_Cap"
-        else:
-            # General normalization for other names
-            normalized_filename = gift_file_name.replace("-", "_").replace("'", "")
-        
-        # Generate with timestamp suffix to ensure it's fresh
-        import new_card_design
+        # Generate fresh data with timestamp suffix to ensure it's a new file
+        import render_service
         timestamp = int(time.time())
-        output_path = new_card_design.generate_specific_gift(gift_display_name, f"_{timestamp}")
-        
-        return output_path
+        output_path = os.path.join(GIFT_CARDS_DIR, f"{normalize_gift_filename(gift_display_name)}_{timestamp}_card.png")
+        return await render_service.render_gift(gift_display_name, output_path, force_fresh=True)
     except Exception as e:
         logging.error(f"Error generating timestamped card for {gift_file_name}: {e}")
         return None
@@ -891,10 +739,10 @@ async def generate_gift_price_card(gift_file_name, refresh=False):
     """Generate a price card for a gift with option to refresh."""
     if refresh:
         # Generate with timestamp to ensure it's fresh
-        return generate_timestamped_card(gift_file_name)
+        return await generate_timestamped_card(gift_file_name)
     else:
         # Use standard generation
-        return generate_gift_card(gift_file_name)
+        return await generate_gift_card(gift_file_name)
 
 # Function to refresh a price card
 async def refresh_price_card(update: Update, context: ContextTypes.DEFAULT_TYPE, gift_name):
@@ -920,7 +768,7 @@ async def send_gift_card(update: Update, context: ContextTypes.DEFAULT_TYPE, gif
     reply_markup = get_gift_price_card_keyboard(is_premium, mrkt_link, tonnel_link, portal_link, palace_link, update.effective_user.id)
 
     logger.info(f"Attempting to send gift card for: {gift_name}")
-    card_path = generate_gift_card(gift_name)
+    card_path = await generate_gift_card(gift_name)
     logger.info(f"Card path returned for {gift_name}: {card_path}")
     
     if card_path and os.path.exists(card_path):
@@ -933,8 +781,9 @@ async def send_gift_card(update: Update, context: ContextTypes.DEFAULT_TYPE, gif
             # Non-premium groups: show gift name + promotional text + sticker promotion
             caption = f"{gift_name}\n\nJoin @The01Studio\nTry @CollectibleKITbot"
         
-        sent_message = await update.message.reply_photo(
-            photo=open(card_path, 'rb'),
+        sent_message = await send_cached_photo(
+            update.message.reply_photo,
+            card_path,
             caption=caption,
             parse_mode='Markdown',
             reply_markup=reply_markup
@@ -2194,6 +2043,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Check if we're in a group chat
     is_group = update.effective_chat.type in ["group", "supergroup"]
     
+    # Group messages are only ever used for gift matching; drop the ones that can't
+    # match any gift before the mention, group-settings and matching work below
+    if is_group and not gift_matcher.prefilter(message_text, chat_id):
+        return
+    
     # Check if the bot was mentioned or replied to
     is_mentioned = False
     is_reply_to_bot = False
@@ -2725,27 +2579,27 @@ async def configure_done_handler(update: Update, context: ContextTypes.DEFAULT_T
         except Exception as e2:
             logger.error(f"Error sending done error message: {e2}", exc_info=True)
 
-# Dictionary to cache uploaded photos (gift_name -> file_id)
-photo_cache = {}
-
 # Helper function to ensure a card is generated and uploaded
 async def ensure_uploaded_card(context, gift_name):
     """Ensure a gift card is generated and uploaded to Telegram servers."""
-    global photo_cache
-    
-    # Check if we already have the file_id cached
-    if gift_name in photo_cache:
-        return photo_cache[gift_name]
-    
     # Generate the card
-    card_path = generate_gift_card(gift_name)
+    card_path = await generate_gift_card(gift_name)
     
     if card_path and os.path.exists(card_path):
+        # Reuse the persisted file_id while the card's content is unchanged
+        # Hash what is about to be sent; pregeneration may replace the card mid-upload
+        digest = await asyncio.to_thread(content_hash, card_path)
+        file_id = await asyncio.to_thread(get_file_id, card_path, digest)
+        if file_id:
+            return file_id
+        
         try:
-            # Upload the photo to Telegram servers
+            # Upload the photo to Telegram servers (the card storage chat, if configured)
+            from card_uploader import get_uploader_config
+            storage_chat_id = get_uploader_config()[1] or context.bot.id
             with open(card_path, 'rb') as photo_file:
                 message = await context.bot.send_photo(
-                    chat_id=context.bot.id,  # Send to the bot itself
+                    chat_id=storage_chat_id,
                     photo=photo_file,
                     caption=f"🎁 {gift_name} (Cached for inline mode)"
                 )
@@ -2754,7 +2608,7 @@ async def ensure_uploaded_card(context, gift_name):
                 file_id = message.photo[-1].file_id
                 
                 # Cache the file_id for future use
-                photo_cache[gift_name] = file_id
+                await asyncio.to_thread(remember_file_id, card_path, file_id, digest)
                 
                 return file_id
         except Exception as e:
@@ -3117,6 +2971,49 @@ def signal_handler(signum, frame):
     stop_integrated_backup_system()
     sys.exit(0)
 
+async def start_credential_refresh(application) -> None:
+    """Authenticate with the price APIs at startup and keep their tokens fresh in the background."""
+    try:
+        import credential_manager
+        import portal_api
+        import mrkt_quant_api
+        portal_api.register_credentials()
+        mrkt_quant_api.register_credentials()
+        credential_manager.start()
+    except Exception as e:
+        logger.error(f"Error starting credential refresher: {e}")
+
+async def preload_card_assets(application) -> None:
+    """Decode the static card assets off the event loop so the first card doesn't pay for it."""
+    try:
+        import new_card_design
+        await asyncio.to_thread(new_card_design.preload_static_assets)
+    except Exception as e:
+        logger.error(f"Error preloading card assets: {e}")
+
+async def on_startup(application) -> None:
+    """Run startup tasks: credential refresh and card asset preloading."""
+    await start_credential_refresh(application)
+    await preload_card_assets(application)
+
+async def close_upstream_connections(application) -> None:
+    """Close pooled upstream API connections, stop the credential refresher and render workers on shutdown."""
+    try:
+        import http_client
+        await http_client.close()
+    except Exception as e:
+        logger.error(f"Error closing upstream HTTP connections: {e}")
+    try:
+        import credential_manager
+        await asyncio.to_thread(credential_manager.stop)
+    except Exception as e:
+        logger.error(f"Error stopping credential refresher: {e}")
+    try:
+        import render_service
+        await asyncio.to_thread(render_service.shutdown)
+    except Exception as e:
+        logger.error(f"Error stopping render workers: {e}")
+
 def main() -> None:
     """Start the bot."""
     # Initialize rate limiter database
@@ -3170,6 +3067,8 @@ def main() -> None:
     
     # Build the application with base settings
     builder = Application.builder().token(token).pool_timeout(30.0).connection_pool_size(8)
+    builder.post_init(on_startup)
+    builder.post_shutdown(close_upstream_connections)
     
     # Build the application
     application = builder.build()
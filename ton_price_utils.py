@@ -10,6 +10,7 @@ import re
 import json
 import logging
 import requests
+import response_cache
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -20,16 +21,61 @@ _ton_price_timestamp: float = 0
 TON_PRICE_CACHE_DURATION: int = 300  # Cache TON price for 5 minutes
 FALLBACK_TON_PRICE: float = 2.10  # Fallback value (updated to current approximate)
 
+TON_PRICE_URL = "https://coinmarketcap.com/currencies/toncoin/"
+
+def _parse_ton_price(response) -> Optional[float]:
+    """Extract the TON price from a CoinMarketCap page response, or None."""
+    if response.status_code != 200:
+        logger.warning(f"CoinMarketCap request failed: {response.status_code}")
+        return None
+    
+    content = response.text
+    
+    # Extract price from statistics JSON
+    match = re.search(r'"statistics":(\{.*?\})', content)
+    if match:
+        try:
+            statistics_json = match.group(1)
+            statistics_dict = json.loads(statistics_json)
+            price = statistics_dict.get("price", None)
+            
+            if price and price != "N/A" and price != 0:
+                try:
+                    return float(price)
+                except (ValueError, TypeError):
+                    logger.warning(f"Invalid TON price format: {price}")
+        except json.JSONDecodeError:
+            logger.warning("Error parsing TON statistics JSON from CoinMarketCap")
+    return None
+
+def _store_ton_price(ton_price: float, fetched_at: float) -> float:
+    """Store a freshly fetched TON price in the shared cache."""
+    global _ton_price_cache, _ton_price_timestamp
+    _ton_price_cache = ton_price
+    _ton_price_timestamp = fetched_at
+    logger.info(f"Fetched TON price from CoinMarketCap: ${ton_price:.2f}")
+    return ton_price
+
+def _cached_or_fallback_price() -> float:
+    """Return the last known TON price, or the fallback value."""
+    if _ton_price_cache:
+        logger.info(f"Using cached TON price: ${_ton_price_cache:.2f}")
+        return _ton_price_cache
+    
+    logger.warning(f"Using fallback TON price: ${FALLBACK_TON_PRICE:.2f}")
+    return FALLBACK_TON_PRICE
+
 def get_ton_price_usd() -> float:
     """
     Fetch real-time TON price from CoinMarketCap.
     Returns cached value if available and fresh, otherwise fetches new price.
     
+    Blocking version for synchronous callers (card generators, scripts).
+    Async code should use get_ton_price_usd_async() instead.
+    
     Returns:
         float: TON price in USD
     """
-    global _ton_price_cache, _ton_price_timestamp
-    
     # Check cache first
     current_time = time.time()
     if _ton_price_cache and (current_time - _ton_price_timestamp) < TON_PRICE_CACHE_DURATION:
@@ -37,43 +83,40 @@ def get_ton_price_usd() -> float:
     
     try:
         # Fetch TON price from CoinMarketCap
-        ton_url = "https://coinmarketcap.com/currencies/toncoin/"
-        response = requests.get(ton_url, timeout=10)
-        
-        if response.status_code == 200:
-            content = response.text
-            
-            # Extract price from statistics JSON
-            match = re.search(r'"statistics":(\{.*?\})', content)
-            if match:
-                try:
-                    statistics_json = match.group(1)
-                    statistics_dict = json.loads(statistics_json)
-                    price = statistics_dict.get("price", None)
-                    
-                    if price and price != "N/A" and price != 0:
-                        try:
-                            ton_price = float(price)
-                            _ton_price_cache = ton_price
-                            _ton_price_timestamp = current_time
-                            logger.info(f"Fetched TON price from CoinMarketCap: ${ton_price:.2f}")
-                            return ton_price
-                        except (ValueError, TypeError):
-                            logger.warning(f"Invalid TON price format: {price}")
-                except json.JSONDecodeError:
-                    logger.warning("Error parsing TON statistics JSON from CoinMarketCap")
-        else:
-            logger.warning(f"CoinMarketCap request failed: {response.status_code}")
+        response = response_cache.cached_get_sync(requests.get, TON_PRICE_URL, timeout=10)
+        ton_price = _parse_ton_price(response)
+        if ton_price is not None:
+            return _store_ton_price(ton_price, current_time)
     except Exception as e:
         logger.warning(f"Error fetching TON price from CoinMarketCap: {e}")
     
     # Return cached value or fallback
-    if _ton_price_cache:
-        logger.info(f"Using cached TON price: ${_ton_price_cache:.2f}")
+    return _cached_or_fallback_price()
+
+async def get_ton_price_usd_async() -> float:
+    """
+    Fetch real-time TON price from CoinMarketCap without blocking the event loop.
+    Shares its cache with get_ton_price_usd().
+    
+    Returns:
+        float: TON price in USD
+    """
+    import http_client
+    
+    # Check cache first
+    current_time = time.time()
+    if _ton_price_cache and (current_time - _ton_price_timestamp) < TON_PRICE_CACHE_DURATION:
         return _ton_price_cache
     
-    logger.warning(f"Using fallback TON price: ${FALLBACK_TON_PRICE:.2f}")
-    return FALLBACK_TON_PRICE
+    try:
+        response = await http_client.get_cached(TON_PRICE_URL, timeout=10)
+        ton_price = _parse_ton_price(response)
+        if ton_price is not None:
+            return _store_ton_price(ton_price, current_time)
+    except Exception as e:
+        logger.warning(f"Error fetching TON price from CoinMarketCap: {e}")
+    
+    return _cached_or_fallback_price()
 
 def clear_ton_price_cache():
     """Clear the TON price cache to force a fresh fetch"""
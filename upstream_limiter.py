@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Upstream Rate Limiter
+
+Token-bucket limiter with per-upstream budgets, shared by portal_api,
+mrkt_quant_api and mrkt_api_improved. Each bucket allows short bursts up to
+its capacity and refills at a steady rate. 429 responses trigger adaptive
+backoff: the bucket pauses for the Retry-After period and halves its refill
+rate, then recovers gradually as requests succeed.
+
+Usable from both async code (await limiter.acquire()) and synchronous code
+(limiter.acquire_sync()); state is guarded by a thread lock that is never
+held while waiting.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Per-upstream budgets: (requests per second, burst capacity)
+UPSTREAM_BUDGETS = {
+    "portal": (3.0, 6),
+    "mrkt": (2.0, 5),
+    "quant": (1.0, 3),
+    "giftcharts": (5.0, 10),
+}
+DEFAULT_BUDGET = (1.0, 2)
+
+# Adaptive backoff configuration
+BASE_BACKOFF = 2.0  # Seconds to pause on a 429 without Retry-After
+MAX_BACKOFF = 60.0
+MIN_RATE_FACTOR = 0.125  # Never slow below 1/8 of the configured rate
+RECOVERY_STEP = 0.1  # Fraction of the configured rate regained per success
+
+class TokenBucket:
+    """Thread- and coroutine-safe token bucket for one upstream."""
+
+    def __init__(self, name: str, rate: float, capacity: int):
+        self.name = name
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.total_waited = 0.0
+        self.total_429 = 0
+
+    def _refill(self, now: float) -> None:
+        """Credit tokens earned since the last update (caller holds the lock)."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+            self.total_requests += 1
+            self.total_waited += wait
+            return wait
+
+    async def acquire(self) -> None:
+        """Wait (without blocking the event loop) until a request may be sent."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self) -> None:
+        """Blocking variant of acquire() for synchronous callers."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """
+        Record a 429 response: pause the bucket and halve its refill rate.
+
+        Returns:
+            float: Seconds the bucket is paused for
+        """
+        with self._lock:
+            self._consecutive_429 += 1
+            self.total_429 += 1
+            backoff = retry_after if retry_after else BASE_BACKOFF * (2 ** (self._consecutive_429 - 1))
+            backoff = min(backoff, MAX_BACKOFF)
+            now = time.monotonic()
+            self._refill(now)
+            self._paused_until = max(self._paused_until, now + backoff)
+            self.rate = max(self.base_rate * MIN_RATE_FACTOR, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+        logger.warning(f"[Rate Limit] {self.name} | 429 received, pausing {backoff:.1f}s, rate now {self.rate:.2f}/s")
+        return backoff
+
+    def record_success(self) -> None:
+        """Record a successful response and gradually restore the refill rate."""
+        with self._lock:
+            self._consecutive_429 = 0
+            if self.rate < self.base_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current limiter state for status reporting."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "rate": round(self.rate, 3),
+                "base_rate": self.base_rate,
+                "capacity": self.capacity,
+                "tokens": round(min(self.capacity, self._tokens + (now - self._updated) * self.rate), 2),
+                "paused_for": round(max(0.0, self._paused_until - now), 2),
+                "requests": self.total_requests,
+                "total_waited": round(self.total_waited, 2),
+                "rate_limited": self.total_429,
+            }
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def get_limiter(name: str) -> TokenBucket:
+    """Get the shared bucket for an upstream, creating it from UPSTREAM_BUDGETS."""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            rate, capacity = UPSTREAM_BUDGETS.get(name, DEFAULT_BUDGET)
+            bucket = TokenBucket(name, rate, capacity)
+            _buckets[name] = bucket
+        return bucket
+
+def parse_retry_after(response) -> Optional[float]:
+    """Read a Retry-After header (seconds form) from a response, if present."""
+    try:
+        value = response.headers.get("Retry-After")
+        return float(value) if value else None
+    except (AttributeError, ValueError, TypeError):
+        return None
+
+def get_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Return stats for every upstream bucket in use."""
+    with _buckets_lock:
+        buckets = list(_buckets.values())
+    return {bucket.name: bucket.stats() for bucket in buckets}